@@ -1,12 +1,34 @@
 import os
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import asyncio
+import json
+import threading
+import zipfile
+from typing import List, Optional
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Header, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import tempfile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
-from database import init_db, insert_record, get_all_records
-from pdf_processor import process_sbc_pdf
-from s3_service import upload_to_s3, delete_from_s3
+from database import (
+    RECORD_COLUMNS, RECORD_STATS_GROUPS, RECORD_SUMMARY_COLUMNS, init_db, close_db_pool, get_db_pool_stats,
+    decode_records_cursor, get_records_version, iter_record_batches
+)
+from async_db import (
+    delete_record as db_delete_record, get_job, get_record_by_id, get_record_stats, get_s3_outbox_stats,
+    list_records, run_db, search_records, shutdown_db_executor
+)
+from explanations import record_explanations
+from extraction_service import EXTRACTION_WORKERS, get_extraction_stats, shutdown_extraction_pool
+from s3_service import close_s3_client, delete_from_s3, get_s3_stats
+from text_backends import TEXT_BACKENDS
+from upload_service import SpooledUpload, UploadTooLarge, UPLOAD_CHUNK_SIZE, process_pdf_upload, spool_upload
+from jobs import enqueue_upload, start_job_workers, stop_job_workers
+from s3_outbox import discard_spooled, start_s3_outbox_workers, stop_s3_outbox_workers
+from rule_stats import flush_rule_stats, rule_stats_report
+from response_cache import ResponseCache, http_date, is_not_modified, make_etag, version_settled
+from search import SEARCH_MODES
+from export import EXPORT_BATCH_SIZE, EXPORT_FORMATS, RecordEncoder, export_filename
 
 # Load environment variables
 load_dotenv()
@@ -42,9 +64,37 @@ async def options_handler(full_path: str):
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf'}
 
+# Batch upload limits
+MAX_BATCH_FILES = int(os.getenv('MAX_BATCH_FILES', '500'))
+MAX_ZIP_UNCOMPRESSED_BYTES = int(os.getenv('MAX_ZIP_UNCOMPRESSED_MB', '2048')) * 1024 * 1024
+# Largest ZIP archive accepted, checked while it streams in
+MAX_ZIP_UPLOAD_BYTES = int(os.getenv('MAX_ZIP_UPLOAD_MB', '512')) * 1024 * 1024
+# Files of one batch submitted to the extraction pool at the same time
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', str(EXTRACTION_WORKERS)))
+
+# When set, /api/admin endpoints require it in the X-Admin-Token header
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@app.on_event("startup")
+async def startup_event():
+    """Start the background job workers and S3 uploaders for this worker"""
+    start_job_workers()
+    start_s3_outbox_workers()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the job workers, S3 uploaders, extraction processes, database connections and S3 client owned by this worker"""
+    await stop_job_workers()
+    await stop_s3_outbox_workers()
+    shutdown_extraction_pool()
+    flush_rule_stats()
+    shutdown_db_executor()
+    close_db_pool()
+    close_s3_client()
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -54,8 +104,12 @@ async def root():
         "endpoints": {
             "health": "/api/health",
             "records": "/api/records",
+            "record_explanation": "/api/records/{record_id}/explanation",
             "upload": "/api/upload",
-            "delete_record": "/api/records/{record_id}"
+            "upload_batch": "/api/upload/batch",
+            "job_status": "/api/jobs/{job_id}",
+            "delete_record": "/api/records/{record_id}",
+            "rule_stats": "/api/admin/rule-stats"
         },
         "docs": "/docs"
     }
@@ -63,84 +117,284 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "message": "SBC Processor API is running"}
+    return {
+        "status": "healthy",
+        "message": "SBC Processor API is running",
+        "extraction": get_extraction_stats(),
+        "database_pool": get_db_pool_stats(),
+        "s3": get_s3_stats(),
+        "s3_outbox": await get_s3_outbox_stats(),
+        "records_cache": records_cache.stats()
+    }
+
+# Page size of /api/records when no limit is given, and the largest allowed
+RECORDS_PAGE_SIZE = int(os.getenv('RECORDS_PAGE_SIZE', '50'))
+RECORDS_MAX_PAGE_SIZE = int(os.getenv('RECORDS_MAX_PAGE_SIZE', '500'))
+
+records_cache = ResponseCache()
+
+def parse_fields(fields: Optional[str]) -> tuple:
+    """Columns named by a comma-separated ``fields`` parameter, or the summary columns"""
+    if not fields:
+        return RECORD_SUMMARY_COLUMNS
+    columns = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = [field for field in columns if field not in RECORD_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(RECORD_COLUMNS)}"
+        )
+    return columns
 
 @app.get("/api/records")
-async def get_records():
-    """Get all processed SBC records"""
+async def get_records(
+    request: Request,
+    limit: int = Query(RECORDS_PAGE_SIZE, ge=1, le=RECORDS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    penalty_a: Optional[str] = None,
+    penalty_b: Optional[str] = None,
+    group_name: Optional[str] = None,
+    date_from: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    date_to: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    fields: Optional[str] = None
+):
+    """Get a page of processed SBC records, newest first
+
+    Pass the returned next_cursor as ``cursor`` to get the following page.
+    ``fields`` is a comma-separated list of columns; by default the listing
+    leaves out the explanation columns and plan facts.
+    
+    Responses carry an ETag and Last-Modified derived from the records
+    version, which every write to sbc_records bumps. A matching
+    If-None-Match is answered with 304 after reading only the version, and
+    unchanged pages are served from this worker's cache. Last-Modified is
+    left out during the second of the last change, as a later write in that
+    second would get the same date.
+    """
+    version = await run_db(get_records_version)
+    cache_key = '&'.join(f'{name}={value}' for name, value in sorted(request.query_params.multi_items()))
+    etag = make_etag(version, cache_key)
+    headers = {
+        'ETag': etag,
+        # Let browsers keep the listing but revalidate it on every load
+        'Cache-Control': 'private, no-cache'
+    }
+    if version_settled(version):
+        headers['Last-Modified'] = http_date(version)
+    
+    if is_not_modified(etag, version, request.headers.get('if-none-match'), request.headers.get('if-modified-since')):
+        records_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    
+    body = records_cache.get(cache_key, version)
+    if body is not None:
+        return Response(content=body, media_type='application/json', headers=headers)
+    
+    columns = parse_fields(fields)
+    
     try:
-        records = get_all_records()
-        return {
+        after = decode_records_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        records, next_cursor = await list_records(
+            limit=limit,
+            after=after,
+            penalty_a=penalty_a,
+            penalty_b=penalty_b,
+            group_name=group_name,
+            date_from=date_from,
+            date_to=date_to,
+            columns=columns
+        )
+        response = JSONResponse(content=jsonable_encoder({
             'success': True,
-            'records': records
-        }
+            'records': records,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    records_cache.put(cache_key, version, response.body)
+    return response
+
+# Results returned by /api/records/search at most
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '100'))
+
+@app.get("/api/records/search")
+async def search_records_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: str = Query('fulltext', pattern=f"^({'|'.join(SEARCH_MODES)})$"),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_RESULTS),
+    fields: Optional[str] = None
+):
+    """Search records by group name, filename and plan facts, best matches first
+
+    ``mode`` is ``fulltext`` (every word must occur), ``prefix`` (every
+    word may be the start of a longer word, for search-as-you-type) or
+    ``fuzzy`` (group and file names similar to the query, tolerating typos).
+    """
+    columns = parse_fields(fields)
+    try:
+        records = await search_records(q, mode=mode, limit=limit, columns=columns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        'success': True,
+        'query': q,
+        'mode': mode,
+        'records': records
+    }
+
+@app.get("/api/records/stats")
+async def get_records_stats(
+    group_by: Optional[str] = None,
+    date_from: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$'),
+    date_to: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$')
+):
+    """Record counts per penalty answer, overall and optionally per upload date and/or plan type
+
+    ``group_by`` is a comma-separated list of upload_date and plan_type.
+    """
+    columns = tuple(column.strip() for column in (group_by or '').split(',') if column.strip())
+    unknown = [column for column in columns if column not in RECORD_STATS_GROUPS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot group by: {', '.join(unknown)}. Available: {', '.join(RECORD_STATS_GROUPS)}"
+        )
+    
+    try:
+        stats = await get_record_stats(group_by=columns, date_from=date_from, date_to=date_to)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {'success': True, **stats}
+
+@app.get("/api/records/export")
+async def export_records(
+    format: str = Query('csv', pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    gzip: bool = False,
+    fields: Optional[str] = None
+):
+    """Stream every record as CSV or JSON Lines, optionally gzip-compressed
+
+    ``fields`` defaults to all columns. Batches are read and encoded on the
+    database threads one at a time, so memory use stays flat however many
+    records there are.
+    """
+    columns = parse_fields(fields) if fields else RECORD_COLUMNS
+    encoder = RecordEncoder(columns, format, compress=gzip)
+    batches = iter_record_batches(columns, EXPORT_BATCH_SIZE)
+    # Keeps the cursor from being closed while a batch is read
+    batches_lock = threading.Lock()
+    
+    def next_chunk():
+        with batches_lock:
+            batch = next(batches, None)
+        return None if batch is None else encoder.encode(batch)
+    
+    def close_batches():
+        with batches_lock:
+            batches.close()
+    
+    async def chunks():
+        yield encoder.begin()
+        while (chunk := await run_db(next_chunk)) is not None:
+            yield chunk
+        yield encoder.finish()
+    
+    if gzip:
+        media_type = 'application/gzip'
+    elif format == 'csv':
+        # Starlette adds the charset to text types
+        media_type = 'text/csv'
+    else:
+        media_type = 'application/x-ndjson'
+    # The background task also runs when the client disconnects mid-export,
+    # closing the export's database connection right away
+    return StreamingResponse(chunks(), media_type=media_type, headers={
+        'Content-Disposition': f'attachment; filename="{export_filename(format, gzip)}"'
+    }, background=BackgroundTask(run_db, close_batches))
+
+def spool_zip_members(archive_file) -> List[tuple]:
+    """Spool the PDFs of a ZIP archive to temporary files
+
+    Returns (filename, SpooledUpload) for every PDF member. Member names are
+    never used as paths, and the member count, the size of each PDF and the
+    total uncompressed size are capped. The sizes in the member headers are
+    only used to reject an archive early; the limits apply to the bytes read.
+    """
+    spooled = []
+    total_size = 0
+    try:
+        with zipfile.ZipFile(archive_file) as archive:
+            members = [m for m in archive.infolist() if not m.is_dir() and allowed_file(m.filename)]
+            if len(members) > MAX_BATCH_FILES:
+                raise HTTPException(status_code=400, detail=f"ZIP archive contains more than {MAX_BATCH_FILES} PDF files")
+            if sum(m.file_size for m in members) > MAX_ZIP_UNCOMPRESSED_BYTES:
+                raise HTTPException(status_code=400, detail="ZIP archive is too large once uncompressed")
+            
+            for member in members:
+                # The whole batch is spooled before processing, so keep it on disk
+                upload = SpooledUpload(max_memory=0)
+                spooled.append((os.path.basename(member.filename), upload))
+                with archive.open(member) as source:
+                    for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b''):
+                        total_size += len(chunk)
+                        if total_size > MAX_ZIP_UNCOMPRESSED_BYTES:
+                            raise HTTPException(status_code=400, detail="ZIP archive is too large once uncompressed")
+                        upload.write(chunk)
+                upload.finish()
+    except Exception as e:
+        for _, upload in spooled:
+            upload.close()
+        if isinstance(e, zipfile.BadZipFile):
+            raise HTTPException(status_code=400, detail="Invalid ZIP archive")
+        if isinstance(e, UploadTooLarge):
+            raise HTTPException(status_code=413, detail=f"ZIP member {spooled[-1][0]}: {e}")
+        raise
+    return spooled
+
+def validate_backend(backend: Optional[str]):
+    """Reject unknown text backend names"""
+    if backend is not None and backend != 'auto' and backend not in TEXT_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown text backend '{backend}'")
 
 @app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    file: UploadFile = File(...),
+    backend: Optional[str] = Query(None, description="Text backend: auto, pdfminer or pdfplumber"),
+    async_job: bool = Query(False, alias="async", description="Queue the file and return a job id immediately")
+):
     """Process uploaded SBC file with intelligent explanations"""
     try:
+        validate_backend(backend)
+        
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file selected")
         
         if not allowed_file(file.filename):
             raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF file.")
         
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        upload = await spool_upload(file)
         
-        try:
-            # Process the PDF with enhanced explanations
-            result = process_sbc_pdf(temp_file_path)
-            
-            if result['success']:
-                # Upload to S3
-                s3_url = upload_to_s3(temp_file_path, file.filename)
-                
-                # If S3 upload fails, still save the record but without S3 URL
-                if s3_url is None:
-                    print("Warning: S3 upload failed, saving record without S3 URL")
-                    s3_url = None
-                
-                # Insert into database with explanations
-                insert_record(
-                    result['company_name'],
-                    result['penalty_a'],
-                    result['penalty_b'],
-                    file.filename,
-                    s3_url,
-                    result.get('penalty_a_explanation'),  # NEW
-                    result.get('penalty_b_explanation')   # NEW
-                )
-                
-                response_data = {
+        if async_job:
+            with upload:
+                job_id = await enqueue_upload(file.filename, upload, backend)
+            return JSONResponse(
+                status_code=202,
+                content={
                     'success': True,
-                    'message': 'File processed successfully!',
-                    'data': {
-                        'company_name': result['company_name'],
-                        'penalty_a': result['penalty_a'],
-                        'penalty_b': result['penalty_b'],
-                        'penalty_a_explanation': result.get('penalty_a_explanation', ''),  # NEW
-                        'penalty_b_explanation': result.get('penalty_b_explanation', ''), # NEW
-                        'filename': file.filename
-                    }
+                    'message': 'File queued for processing.',
+                    'job_id': job_id,
+                    'status_url': f"/api/jobs/{job_id}"
                 }
-                
-                if s3_url is None:
-                    response_data['warning'] = 'File processed but S3 upload failed. Data saved locally.'
-                
-                return response_data
-            else:
-                raise HTTPException(status_code=400, detail=f"Error processing file: {result['error']}")
-                
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            )
+        
+        with upload:
+            return await process_pdf_upload(file.filename, upload, backend)
                 
     except HTTPException:
         raise
@@ -150,26 +404,188 @@ async def upload_file(file: UploadFile = File(...)):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/api/upload/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    backend: Optional[str] = Query(None, description="Text backend: auto, pdfminer or pdfplumber")
+):
+    """Process many SBC files, or ZIP archives of them, streaming one NDJSON line per file
+
+    Files are processed concurrently through the extraction pool and each
+    result is written as soon as that file finishes. The last line is a summary.
+    """
+    validate_backend(backend)
+    
+    # Spool everything before streaming, the request body is gone afterwards
+    spooled = []
+    rejected = []
+    try:
+        for file in files:
+            filename = file.filename or ''
+            if filename.lower().endswith('.zip'):
+                with await spool_upload(file, max_size=MAX_ZIP_UPLOAD_BYTES) as archive_upload:
+                    spooled.extend(spool_zip_members(archive_upload.reader()))
+            elif allowed_file(filename):
+                # The whole batch is spooled before processing, so keep it on disk
+                try:
+                    spooled.append((filename, await spool_upload(file, max_memory=0)))
+                except HTTPException as e:
+                    if e.status_code != 413:
+                        raise
+                    rejected.append({'filename': filename, 'success': False, 'error': e.detail})
+            else:
+                rejected.append({
+                    'filename': filename,
+                    'success': False,
+                    'error': 'Invalid file type. Please upload PDF files or a ZIP archive.'
+                })
+            
+            if len(spooled) > MAX_BATCH_FILES:
+                raise HTTPException(status_code=400, detail=f"A batch may contain at most {MAX_BATCH_FILES} PDF files")
+    except Exception:
+        for _, upload in spooled:
+            upload.close()
+        raise
+    
+    # Bounds how many of this batch's files wait on the extraction pool at once
+    batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def process_one(filename: str, upload: SpooledUpload) -> dict:
+        try:
+            async with batch_slots:
+                response_data = await process_pdf_upload(filename, upload, backend, wait=True)
+            return {'filename': filename, **response_data}
+        except HTTPException as e:
+            return {'filename': filename, 'success': False, 'error': e.detail}
+        except Exception as e:
+            print(f"Unexpected error processing {filename} in batch: {e}")
+            return {'filename': filename, 'success': False, 'error': f"Internal server error: {str(e)}"}
+        finally:
+            upload.close()
+    
+    def close_spooled():
+        for _, upload in spooled:
+            upload.close()
+    
+    async def stream_results():
+        tasks = []
+        succeeded = 0
+        try:
+            tasks = [asyncio.create_task(process_one(*item)) for item in spooled]
+            for line in rejected:
+                yield json.dumps(line) + "\n"
+            for next_result in asyncio.as_completed(tasks):
+                line = await next_result
+                succeeded += 1 if line['success'] else 0
+                yield json.dumps(line, default=str) + "\n"
+            total = len(tasks) + len(rejected)
+            yield json.dumps({
+                'done': True,
+                'total': total,
+                'succeeded': succeeded,
+                'failed': total - succeeded
+            }) + "\n"
+        finally:
+            # Client went away: stop work that has not started yet
+            for task in tasks:
+                task.cancel()
+            # Files of tasks cancelled before they ran are never closed by process_one
+            close_spooled()
+    
+    # Also runs when the client is gone before the first line was streamed
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson",
+                             background=BackgroundTask(close_spooled))
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: int):
+    """Get the status of a queued upload, with its record once it succeeded"""
+    try:
+        job = await get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        record = None
+        if job['status'] == 'succeeded' and job['record_id'] is not None:
+            record = await get_record_by_id(job['record_id'])
+        
+        return {
+            'success': True,
+            'data': {
+                'id': job['id'],
+                'status': job['status'],
+                'filename': job['filename'],
+                'attempts': job['attempts'],
+                'error': job['error'],
+                'created_at': str(job['created_at']) if job['created_at'] else None,
+                'started_at': str(job['started_at']) if job['started_at'] else None,
+                'finished_at': str(job['finished_at']) if job['finished_at'] else None,
+                'record': record
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/records/{record_id}/explanation")
+async def get_record_explanation(record_id: int):
+    """Render the penalty explanations of a record"""
+    try:
+        record = await get_record_by_id(record_id)
+        if not record:
+            raise HTTPException(status_code=404, detail="Record not found")
+        
+        return {
+            'success': True,
+            'data': {
+                'id': record['id'],
+                **record_explanations(record)
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def check_admin_token(token: Optional[str]):
+    """Reject admin requests without the configured token"""
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/api/admin/rule-stats")
+async def get_rule_stats(
+    sort: str = Query('time', pattern='^(time|matched|evaluated|rule)$'),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Evaluations, matches and time spent per extraction rule"""
+    check_admin_token(x_admin_token)
+    try:
+        return {
+            'success': True,
+            'rules': await run_db(rule_stats_report, sort)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/api/records/{record_id}")
 async def delete_record(record_id: int):
     """Delete a record and its associated S3 file"""
     try:
-        from database import delete_record as db_delete_record, get_record_by_id
-        
         # Get the record first to get the S3 URL
-        record = get_record_by_id(record_id)
+        record = await get_record_by_id(record_id)
         if not record:
             raise HTTPException(status_code=404, detail="Record not found")
         
         # Delete from S3 if URL exists
         if record.get('s3_url'):
             try:
-                delete_from_s3(record['s3_url'])
+                # boto3 blocks, so keep it off the event loop
+                await asyncio.to_thread(delete_from_s3, record['s3_url'])
             except Exception as s3_error:
                 print(f"Warning: Failed to delete S3 file: {s3_error}")
         
-        # Delete the record from database
-        db_delete_record(record_id)
+        # Delete the record from database, dropping any upload still waiting for S3
+        discard_spooled(await db_delete_record(record_id))
         
         return {
             'success': True,
@@ -0,0 +1,83 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import database
+
+load_dotenv()
+
+# Database calls each API worker runs at once; more wait for a free thread.
+# Defaults to the connection pool size so threads never wait for a connection.
+DB_CONCURRENCY = int(os.getenv('DB_CONCURRENCY', str(max(database.DB_POOL_MAX_SIZE, 1))))
+
+_executor = None
+_executor_pid = None
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get the database thread pool for this worker, creating it after fork if needed"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=DB_CONCURRENCY, thread_name_prefix='db')
+        _executor_pid = os.getpid()
+    return _executor
+
+def shutdown_db_executor():
+    """Wait for running database calls and stop the thread pool"""
+    global _executor
+    if _executor is not None and _executor_pid == os.getpid():
+        _executor.shutdown(wait=True)
+    _executor = None
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the database threads without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(func, *args, **kwargs))
+
+async def insert_record(*args, **kwargs):
+    return await run_db(database.insert_record, *args, **kwargs)
+
+async def list_records(*args, **kwargs):
+    return await run_db(database.list_records, *args, **kwargs)
+
+async def search_records(*args, **kwargs):
+    return await run_db(database.search_records, *args, **kwargs)
+
+async def get_record_stats(*args, **kwargs):
+    return await run_db(database.get_record_stats, *args, **kwargs)
+
+async def get_record_by_id(record_id):
+    return await run_db(database.get_record_by_id, record_id)
+
+async def get_record_by_hash(content_hash):
+    return await run_db(database.get_record_by_hash, content_hash)
+
+async def delete_record(record_id):
+    return await run_db(database.delete_record, record_id)
+
+async def create_job(*args, **kwargs):
+    return await run_db(database.create_job, *args, **kwargs)
+
+async def get_job(job_id):
+    return await run_db(database.get_job, job_id)
+
+async def claim_next_job(stale_before, max_attempts):
+    return await run_db(database.claim_next_job, stale_before, max_attempts)
+
+async def touch_job(job_id):
+    return await run_db(database.touch_job, job_id)
+
+async def finish_job(*args, **kwargs):
+    return await run_db(database.finish_job, *args, **kwargs)
+
+async def claim_s3_upload(lease_until):
+    return await run_db(database.claim_s3_upload, lease_until)
+
+async def complete_s3_upload(entry_id, record_id, s3_url):
+    return await run_db(database.complete_s3_upload, entry_id, record_id, s3_url)
+
+async def fail_s3_upload(*args, **kwargs):
+    return await run_db(database.fail_s3_upload, *args, **kwargs)
+
+async def get_s3_outbox_stats():
+    return await run_db(database.get_s3_outbox_stats)
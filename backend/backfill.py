@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Re-extract records produced by an older extractor from their stored PDFs.
+
+Records whose extractor_version is below pdf_processor.EXTRACTOR_VERSION are
+streamed from the database, their PDFs downloaded from S3 and parsed again in
+a process pool. Only records whose answers or plan facts changed are
+rewritten; the others just get the current extractor version. Records are
+never picked up twice, so an interrupted run can simply be started again.
+Set S3_ENDPOINT_URL to run against a local S3 stand-in.
+"""
+
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+from dotenv import load_dotenv
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import BULK_PAGE_SIZE, bulk_update_records, iter_record_batches
+from extraction_service import EXTRACTION_MAX_TASKS_PER_CHILD, EXTRACTION_WORKERS
+from pdf_processor import EXTRACTOR_VERSION, process_sbc_pdf
+from s3_service import download_from_s3, get_s3_client
+
+load_dotenv()
+
+# Columns re-extraction may change
+RESULT_COLUMNS = ('group_name', 'penalty_a', 'penalty_b', 'plan_facts')
+
+def _extract_document(data: bytes) -> dict:
+    """Entry point executed inside the parse processes"""
+    return process_sbc_pdf(io.BytesIO(data))
+
+def result_changes(record: dict, result: dict) -> dict:
+    """Columns whose re-extracted value differs from the stored one"""
+    extracted = {
+        'group_name': result['company_name'],
+        'penalty_a': result['penalty_a'],
+        'penalty_b': result['penalty_b'],
+        'plan_facts': result['plan_facts']
+    }
+    return {column: value for column, value in extracted.items() if record.get(column) != value}
+
+class Backfill:
+    """Download, parse and compare outdated records with bounded concurrency"""
+
+    def __init__(self, args):
+        self.args = args
+        self.stats = Counter()
+        self.changed = []
+        self.unchanged = []
+        self.downloads = asyncio.Semaphore(args.download_concurrency)
+        self.parses = asyncio.Semaphore(args.parse_workers)
+        # Bounds the PDFs held in memory between download and parse
+        self.in_flight = asyncio.Semaphore(args.download_concurrency + 2 * args.parse_workers)
+        self.download_pool = ThreadPoolExecutor(max_workers=args.download_concurrency, thread_name_prefix='download')
+        self.parse_pool = ProcessPoolExecutor(
+            max_workers=args.parse_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            max_tasks_per_child=EXTRACTION_MAX_TASKS_PER_CHILD
+        )
+        self.s3_client = get_s3_client()
+
+    async def process(self, record: dict):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self.downloads:
+                data = await loop.run_in_executor(
+                    self.download_pool, download_from_s3, record['s3_url'], self.s3_client
+                )
+            async with self.parses:
+                result = await loop.run_in_executor(self.parse_pool, _extract_document, data)
+            del data
+
+            if not result['success']:
+                self.stats['failed'] += 1
+                print(f"Record {record['id']}: extraction failed: {result['error']}")
+                return
+
+            changes = result_changes(record, result)
+            if changes:
+                self.stats['changed'] += 1
+                for column, value in changes.items():
+                    print(f"Record {record['id']}: {column} {record.get(column)!r} -> {value!r}")
+                self.changed.append({
+                    'id': record['id'],
+                    **{column: changes.get(column, record.get(column)) for column in RESULT_COLUMNS},
+                    'extractor_version': EXTRACTOR_VERSION
+                })
+            else:
+                self.stats['unchanged'] += 1
+                self.unchanged.append({'id': record['id'], 'extractor_version': EXTRACTOR_VERSION})
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"Record {record['id']}: {e}")
+        finally:
+            self.in_flight.release()
+
+    async def flush(self, force: bool = False):
+        """Write the collected results once a batch is complete"""
+        if not force and len(self.changed) + len(self.unchanged) < self.args.batch_size:
+            return
+        changed, self.changed = self.changed, []
+        unchanged, self.unchanged = self.unchanged, []
+        if self.args.dry_run:
+            return
+        loop = asyncio.get_running_loop()
+        if changed:
+            await loop.run_in_executor(
+                None, bulk_update_records, changed, RESULT_COLUMNS + ('extractor_version',)
+            )
+        if unchanged:
+            await loop.run_in_executor(None, bulk_update_records, unchanged, ('extractor_version',))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        columns = ('s3_url',) + RESULT_COLUMNS
+        batches = iter_record_batches(
+            columns, self.args.batch_size, extractor_version_below=EXTRACTOR_VERSION
+        )
+        tasks = set()
+        started = perf_counter()
+        try:
+            while self.stats['checked'] < self.args.limit:
+                batch = await loop.run_in_executor(None, next, batches, None)
+                if batch is None:
+                    break
+                for record in batch[:self.args.limit - self.stats['checked']]:
+                    self.stats['checked'] += 1
+                    if not record.get('s3_url'):
+                        self.stats['no_pdf'] += 1
+                        continue
+                    await self.in_flight.acquire()
+                    task = asyncio.create_task(self.process(record))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    await self.flush()
+                print(f"Checked {self.stats['checked']} records "
+                      f"({self.stats['changed']} changed, {self.stats['failed']} failed, "
+                      f"{perf_counter() - started:.1f}s)")
+            await asyncio.gather(*tasks)
+            await self.flush(force=True)
+        finally:
+            batches.close()
+            self.download_pool.shutdown()
+            self.parse_pool.shutdown()
+        return self.stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--download-concurrency', type=int, default=8,
+                        help="PDFs downloaded from S3 at once (default 8)")
+    parser.add_argument('--parse-workers', type=int, default=EXTRACTION_WORKERS,
+                        help=f"Extraction processes (default EXTRACTION_WORKERS, {EXTRACTION_WORKERS})")
+    parser.add_argument('--batch-size', type=int, default=BULK_PAGE_SIZE,
+                        help=f"Records read and written per batch (default {BULK_PAGE_SIZE})")
+    parser.add_argument('--limit', type=int, default=sys.maxsize, help="Re-extract at most this many records")
+    parser.add_argument('--dry-run', action='store_true', help="Report changes without writing them")
+    args = parser.parse_args()
+
+    print(f"Re-extracting records older than extractor version {EXTRACTOR_VERSION}")
+    started = perf_counter()
+    stats = asyncio.run(Backfill(args).run())
+    elapsed = perf_counter() - started
+    action = 'would change' if args.dry_run else 'changed'
+    print(f"Checked {stats['checked']} records in {elapsed:.1f}s: {stats['changed']} {action}, "
+          f"{stats['unchanged']} unchanged, {stats['failed']} failed, {stats['no_pdf']} without a stored PDF")
+
+if __name__ == "__main__":
+    main()
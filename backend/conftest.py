@@ -0,0 +1,99 @@
+"""
+Shared fixtures for the backend tests.
+
+Run with ``python -m pytest -q`` from the repository root. Databases are
+created in a temporary directory and PDFs are generated in memory.
+"""
+
+import pytest
+import database
+import extraction_service
+import s3_service
+
+def _pdf_bytes(pages) -> bytes:
+    """A minimal PDF with one line of Helvetica text per string of each page"""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for lines in pages:
+        escaped = (line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') for line in lines)
+        stream = 'BT /F1 10 Tf 14 TL 50 760 Td ' + ' '.join(f"({line}) '" for line in escaped) + ' ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(pdf)
+    pdf += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    pdf += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('latin-1')
+    pdf += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    return pdf
+
+def _sbc_pdf(company: str = 'Acme Delivery Company', essential_coverage: str = 'Yes',
+             value_standards: str = 'No', pages: int = 3) -> bytes:
+    """A small SBC in the standard layout with the coverage questions on its last page"""
+    first = [
+        f'{company} Employee Benefits Plan',
+        'Coverage Period: 01/01/2025 - 12/31/2025',
+        'Coverage for: Individual + Family | Plan Type: PPO',
+        'What is the overall deductible? $1,500 individual / $3,000 family deductible',
+        'What is the out-of-pocket limit for this plan? out-of-pocket $6,000 individual $12,000 family',
+    ]
+    middle = [f'Common Medical Event {line}: 20% coinsurance' for line in range(40)]
+    last = [
+        'Coverage Examples',
+        f'Does this plan provide Minimum Essential Coverage? {essential_coverage}',
+        f'Does this plan meet the Minimum Value Standards? {value_standards}',
+    ]
+    return _pdf_bytes([first] + [middle] * (pages - 2) + [last])
+
+@pytest.fixture
+def make_sbc_pdf():
+    """Builder of small SBC PDFs, see _sbc_pdf"""
+    return _sbc_pdf
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """A fresh SQLite database and connection pool in a temporary directory"""
+    monkeypatch.delenv('RENDER_DB_KEY', raising=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, '_pool', None)
+    yield tmp_path
+    database.close_db_pool()
+
+@pytest.fixture
+def db(sqlite_db):
+    """A fresh SQLite database with every migration applied"""
+    database.init_db()
+    return sqlite_db
+
+@pytest.fixture
+def extraction_pool(monkeypatch):
+    """A fresh extraction process pool, stopped after the test"""
+    monkeypatch.setattr(extraction_service, '_executor_pid', None)
+    yield
+    extraction_service.shutdown_extraction_pool()
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    """An empty bucket in moto's in-process S3, configured for s3_service"""
+    moto = pytest.importorskip('moto')
+    settings = {
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_REGION': 'us-east-1',
+        'S3_BUCKET_NAME': 'sbc-test',
+        'S3_ENDPOINT_URL': None,
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(s3_service, name, value)
+    with moto.mock_aws():
+        s3_service.close_s3_client()
+        s3_service.get_s3_client().create_bucket(Bucket='sbc-test')
+        yield 'sbc-test'
+        s3_service.close_s3_client()
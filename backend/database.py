@@ -1,121 +1,144 @@
+import base64
+import json
 import os
-from datetime import datetime
+import sqlite3
+from datetime import date, datetime
 from dotenv import load_dotenv
+from db_pool import ConnectionPool, PooledSqliteConnection
+from migrations import migrate
+from search import (
+    SEARCH_FUZZY_CANDIDATES, SEARCH_FUZZY_THRESHOLD, SEARCH_RANK_WINDOW, fts5_any_query, fts5_query,
+    fuzzy_candidate_trigrams, search_terms, trigrams, tsquery, word_similarity
+)
 
 load_dotenv()
 
 # Try to import psycopg2 at module level
 try:
     import psycopg2
+    from db_pool import PooledPgConnection
     PSYCOPG2_AVAILABLE = True
 except ImportError:
     PSYCOPG2_AVAILABLE = False
 
-def get_db_connection():
-    """Get database connection"""
+# Connections each worker process keeps open, and the most it opens at once
+# (DB_POOL_MAX_SIZE=0 opens a new connection for every call instead)
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '5'))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Idle connections are checked with SELECT 1 before reuse after this many seconds
+DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', '30'))
+
+def _connect_sqlite():
+    # Pooled connections move between threads, but only one uses them at a time
+    return sqlite3.connect('sbc_records.db', factory=PooledSqliteConnection, check_same_thread=False)
+
+def _open_connection():
+    """Open a new database connection"""
     database_url = os.getenv('RENDER_DB_KEY')
-    print(f"Database URL available: {database_url is not None}")
-    print(f"PSYCOPG2_AVAILABLE: {PSYCOPG2_AVAILABLE}")
     
     if database_url and PSYCOPG2_AVAILABLE:
         try:
-            conn = psycopg2.connect(database_url)
-            print("Connected to PostgreSQL database")
-            return conn
+            return psycopg2.connect(database_url, connection_factory=PooledPgConnection)
         except Exception as e:
             print(f"Warning: PostgreSQL connection failed: {e}, falling back to SQLite")
-            import sqlite3
-            return sqlite3.connect('sbc_records.db')
+            return _connect_sqlite()
     else:
         # Fallback to local SQLite for development
         if database_url and not PSYCOPG2_AVAILABLE:
             print("Warning: psycopg2 not available, falling back to SQLite")
-        import sqlite3
-        print("Using SQLite database")
-        return sqlite3.connect('sbc_records.db')
+        return _connect_sqlite()
 
-def init_db():
-    """Initialize the database and create tables if they don't exist"""
+_pool = None
+
+def get_db_pool() -> ConnectionPool:
+    """Get the connection pool of this process"""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(
+            _open_connection,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            ping_interval=DB_POOL_PING_INTERVAL
+        )
+        print(f"Created database pool with {DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE} connections per worker")
+    return _pool
+
+def get_db_connection():
+    """Get database connection
+
+    Connections come from the pool of the current process; close() returns
+    them to it after rolling back anything left uncommitted. Close them in a
+    ``finally`` block: a connection that is never closed stays checked out.
+    """
+    if DB_POOL_MAX_SIZE <= 0:
+        return _open_connection()
+    return get_db_pool().acquire()
+
+def close_db_pool():
+    """Close this process's idle connections, e.g. in the gunicorn master before it forks"""
+    if _pool is not None:
+        _pool.close()
+
+def get_db_pool_stats() -> dict:
+    """Size, checkout and wait time figures of this process's connection pool"""
+    if DB_POOL_MAX_SIZE <= 0:
+        return {'enabled': False}
+    return {'enabled': True, **get_db_pool().stats()}
+
+def get_records_version():
+    """Current version of sbc_records (nanoseconds since the epoch of the last change)
+
+    Triggers bump the version in the database with every write to
+    sbc_records, so changes made by any instance or script are seen.
+    """
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
-        
-        # Check if we're using PostgreSQL or SQLite
-        if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
-            # PostgreSQL
-            print("Initializing PostgreSQL database")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sbc_records (
-                    id SERIAL PRIMARY KEY,
-                    group_name VARCHAR(255) NOT NULL,
-                    upload_date VARCHAR(10) NOT NULL,
-                    penalty_a VARCHAR(10) NOT NULL,
-                    penalty_b VARCHAR(10) NOT NULL,
-                    filename VARCHAR(255) NOT NULL,
-                    s3_url TEXT,
-                    penalty_a_explanation TEXT,
-                    penalty_b_explanation TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Add explanation columns to existing table if they don't exist
-            try:
-                cursor.execute('ALTER TABLE sbc_records ADD COLUMN penalty_a_explanation TEXT')
-            except Exception as e:
-                print(f"Column penalty_a_explanation may already exist: {e}")
-                
-            try:
-                cursor.execute('ALTER TABLE sbc_records ADD COLUMN penalty_b_explanation TEXT')
-            except Exception as e:
-                print(f"Column penalty_b_explanation may already exist: {e}")
-
-        else:
-            # SQLite
-            print("Initializing SQLite database")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sbc_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    group_name TEXT NOT NULL,
-                    upload_date TEXT NOT NULL,
-                    penalty_a TEXT NOT NULL,
-                    penalty_b TEXT NOT NULL,
-                    filename TEXT NOT NULL,
-                    s3_url TEXT,
-                    penalty_a_explanation TEXT,
-                    penalty_b_explanation TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # For SQLite, add columns if they don't exist
-            try:
-                cursor.execute('ALTER TABLE sbc_records ADD COLUMN penalty_a_explanation TEXT')
-            except Exception as e:
-                print(f"Column penalty_a_explanation may already exist: {e}")
-                
-            try:
-                cursor.execute('ALTER TABLE sbc_records ADD COLUMN penalty_b_explanation TEXT')
-            except Exception as e:
-                print(f"Column penalty_b_explanation may already exist: {e}")
-        
-        conn.commit()
+        cursor.execute('SELECT version FROM records_version')
+        row = cursor.fetchone()
+    finally:
         conn.close()
-        print("Database initialized successfully")
+    return row[0] if row else 0
+
+def init_db():
+    """Bring the database schema up to date by applying pending migrations"""
+    conn = get_db_connection()
+    try:
+        postgres = PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection)
+        applied = migrate(conn, postgres)
     except Exception as e:
         print(f"Error initializing database: {e}")
-        if 'conn' in locals():
-            conn.close()
         raise
+    finally:
+        conn.close()
+    if applied:
+        print(f"Applied {'PostgreSQL' if postgres else 'SQLite'} migrations {', '.join(map(str, applied))}")
+    return applied
 
 def insert_record(group_name, penalty_a, penalty_b, filename, s3_url=None,
-                 penalty_a_explanation=None, penalty_b_explanation=None):
-    """Insert a new SBC record into the database with explanations"""
+                 penalty_a_explanation=None, penalty_b_explanation=None, content_hash=None,
+                 plan_facts=None, extractor_version=None, s3_outbox_path=None):
+    """Insert a new SBC record into the database
+
+    New records store the extracted ``plan_facts`` and leave the explanation
+    columns empty; explanations are rendered from the facts when requested.
+    ``extractor_version`` is the pdf_processor.EXTRACTOR_VERSION that
+    produced the results, so outdated records can be re-extracted later.
+    With ``s3_outbox_path``, an upload of that file to S3 is queued in the
+    same transaction; it fills in ``s3_url`` once it completes. The file is
+    removed if the record already existed, since nothing was queued for it.
+    Returns the id of the new record. If a record with the same content hash
+    already exists (a concurrent duplicate upload), its id is returned instead.
+    """
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
         upload_date = datetime.now().strftime('%Y-%m-%d')
+        plan_facts_json = json.dumps(plan_facts) if plan_facts is not None else None
         
         # Check if we're using PostgreSQL or SQLite and use appropriate placeholders
         if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
@@ -124,114 +147,891 @@ def insert_record(group_name, penalty_a, penalty_b, filename, s3_url=None,
             cursor.execute('''
                 INSERT INTO sbc_records 
                 (group_name, upload_date, penalty_a, penalty_b, filename, s3_url, 
-                 penalty_a_explanation, penalty_b_explanation)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                 penalty_a_explanation, penalty_b_explanation, content_hash, plan_facts, extractor_version)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (content_hash) DO NOTHING
+                RETURNING id
             ''', (group_name, upload_date, penalty_a, penalty_b, filename, s3_url,
-                  penalty_a_explanation, penalty_b_explanation))
+                  penalty_a_explanation, penalty_b_explanation, content_hash, plan_facts_json,
+                  extractor_version))
+            row = cursor.fetchone()
+            record_id = row[0] if row else None
         else:
             # SQLite
             print("Using SQLite placeholders (?)")
             cursor.execute('''
                 INSERT INTO sbc_records 
                 (group_name, upload_date, penalty_a, penalty_b, filename, s3_url,
-                 penalty_a_explanation, penalty_b_explanation)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                 penalty_a_explanation, penalty_b_explanation, content_hash, plan_facts, extractor_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (content_hash) DO NOTHING
             ''', (group_name, upload_date, penalty_a, penalty_b, filename, s3_url,
-                  penalty_a_explanation, penalty_b_explanation))
+                  penalty_a_explanation, penalty_b_explanation, content_hash, plan_facts_json,
+                  extractor_version))
+            record_id = cursor.lastrowid if cursor.rowcount else None
+        
+        if record_id is not None and s3_outbox_path:
+            _queue_s3_upload(cursor, _placeholder(conn), record_id, filename, s3_outbox_path, content_hash)
         
         conn.commit()
         conn.close()
+        
+        if record_id is None and s3_outbox_path and os.path.exists(s3_outbox_path):
+            os.unlink(s3_outbox_path)
+        
+        if record_id is None and content_hash:
+            existing = get_record_by_hash(content_hash)
+            print(f"Record for hash {content_hash} already exists, reusing it")
+            return existing['id'] if existing else None
+        
         print(f"Successfully inserted record for {group_name}")
+        return record_id
     except Exception as e:
         print(f"Error inserting record: {e}")
         if 'conn' in locals():
             conn.close()
         raise
 
-def get_all_records():
-    """Retrieve all SBC records from the database including explanations"""
+# Columns of a full record, and of the compact form used for listings
+RECORD_COLUMNS = (
+    'id', 'group_name', 'upload_date', 'penalty_a', 'penalty_b', 'filename', 's3_url',
+    'penalty_a_explanation', 'penalty_b_explanation', 'created_at', 'content_hash', 'plan_facts',
+    'extractor_version'
+)
+RECORD_SUMMARY_COLUMNS = (
+    'id', 'group_name', 'upload_date', 'penalty_a', 'penalty_b', 'filename', 's3_url',
+    'created_at', 'content_hash'
+)
+
+def format_record(record, columns=RECORD_COLUMNS):
+    """Convert a sbc_records row into a dictionary for JSON serialization"""
+    formatted = dict(zip(columns, record))
+    # upload_date is a DATE on PostgreSQL and ISO text on SQLite
+    if isinstance(formatted.get('upload_date'), date):
+        formatted['upload_date'] = formatted['upload_date'].isoformat()
+    # JSONB comes back decoded from PostgreSQL, SQLite returns the JSON text
+    if isinstance(formatted.get('plan_facts'), str):
+        formatted['plan_facts'] = json.loads(formatted['plan_facts'])
+    return formatted
+
+def encode_records_cursor(record):
+    """Opaque cursor pointing after ``record`` in the (created_at, id) listing order"""
+    position = json.dumps([str(record['created_at']), record['id']])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_records_cursor(cursor_token):
+    """Return the (created_at, id) of a cursor, raising ValueError if it is malformed"""
+    try:
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(cursor_token.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(record_id, int):
+        raise ValueError("Invalid cursor")
+    return created_at, record_id
+
+def list_records(limit=50, after=None, penalty_a=None, penalty_b=None, group_name=None,
+                 date_from=None, date_to=None, columns=RECORD_SUMMARY_COLUMNS):
+    """Get one page of records, newest first, and the cursor of the next page
+
+    ``after`` is the decoded (created_at, id) cursor of the previous page. ``group_name`` matches
+    case-insensitively anywhere in the name; ``date_from``/``date_to`` bound
+    the upload date (YYYY-MM-DD, inclusive). id and created_at are always
+    selected because the cursor is built from them. Returns
+    ``(records, next_cursor)``; next_cursor is None on the last page.
+    """
+    columns = tuple(dict.fromkeys(('id', 'created_at') + tuple(columns)))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, group_name, upload_date, penalty_a, penalty_b, filename, s3_url, 
-               penalty_a_explanation, penalty_b_explanation, created_at
-        FROM sbc_records
-        ORDER BY created_at DESC
-    ''')
-    
-    records = cursor.fetchall()
-    conn.close()
-    
-    # Convert to list of dictionaries for JSON serialization
-    formatted_records = []
-    for record in records:
-        formatted_records.append({
-            'id': record[0],
-            'group_name': record[1],
-            'upload_date': record[2],
-            'penalty_a': record[3],
-            'penalty_b': record[4],
-            'filename': record[5],
-            's3_url': record[6],
-            'penalty_a_explanation': record[7] if len(record) > 7 else '',
-            'penalty_b_explanation': record[8] if len(record) > 8 else '',
-            'created_at': record[9] if len(record) > 9 else None
-        })
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        
+        conditions = []
+        params = []
+        if penalty_a:
+            conditions.append(f'penalty_a = {ph}')
+            params.append(penalty_a)
+        if penalty_b:
+            conditions.append(f'penalty_b = {ph}')
+            params.append(penalty_b)
+        if group_name:
+            # ILIKE on PostgreSQL; SQLite's LIKE is already case-insensitive
+            like = 'ILIKE' if ph == '%s' else 'LIKE'
+            pattern = group_name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append(f"group_name {like} {ph} ESCAPE '\\'")
+            params.append(f'%{pattern}%')
+        if date_from:
+            conditions.append(f'upload_date >= {ph}')
+            params.append(date_from)
+        if date_to:
+            conditions.append(f'upload_date <= {ph}')
+            params.append(date_to)
+        if after:
+            # Row comparison keeps the seek on the (created_at, id) index
+            conditions.append(f'(created_at, id) < ({ph}, {ph})')
+            params.extend(after)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        # Fetch one extra row to know whether another page follows
+        cursor.execute(f'''
+            SELECT {', '.join(columns)}
+            FROM sbc_records
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT {ph}
+        ''', params + [limit + 1])
+        
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
     
-    return formatted_records
+    records = [format_record(row, columns) for row in rows[:limit]]
+    next_cursor = encode_records_cursor(records[-1]) if len(rows) > limit else None
+    return records, next_cursor
+
+def search_records(query, mode='fulltext', limit=20, columns=RECORD_SUMMARY_COLUMNS):
+    """Find records by group name, filename and plan facts, best matches first
+
+    ``mode`` is one of search.SEARCH_MODES: ``fulltext`` requires every word
+    of the query, ``prefix`` every word as the start of a word and ``fuzzy``
+    finds group and file names similar to the query. Each record gets a
+    ``score``; scores only order the results of one search. Word searches
+    rank the newest SEARCH_RANK_WINDOW matches.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    text = ' '.join(terms)
+    columns = tuple(dict.fromkeys(('id',) + tuple(columns)))
+    selected = ', '.join(f'r.{column}' for column in columns)
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
+            # PostgreSQL: tsvector for words and prefixes, pg_trgm for similar names
+            if mode == 'fuzzy':
+                cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                               (str(SEARCH_FUZZY_THRESHOLD),))
+                cursor.execute(f'''
+                    SELECT {selected},
+                        GREATEST(word_similarity(%s, r.group_name), word_similarity(%s, r.filename)) AS score
+                    FROM sbc_records AS r
+                    WHERE %s <%% r.group_name OR %s <%% r.filename
+                    ORDER BY score DESC, r.id DESC
+                    LIMIT %s
+                ''', (text, text, text, text, limit))
+            else:
+                cursor.execute(f'''
+                    WITH q AS (SELECT to_tsquery('simple', %s) AS query),
+                    matches AS (
+                        SELECT r.id FROM sbc_records AS r, q
+                        WHERE r.search_vector @@ q.query
+                        ORDER BY r.id DESC
+                        LIMIT %s
+                    )
+                    SELECT {selected}, ts_rank_cd(r.search_vector, q.query) AS score
+                    FROM matches JOIN sbc_records AS r ON r.id = matches.id, q
+                    ORDER BY score DESC, r.id DESC
+                    LIMIT %s
+                ''', (tsquery(terms, mode), SEARCH_RANK_WINDOW, limit))
+            rows = cursor.fetchall()
+        elif mode == 'fuzzy':
+            # SQLite: find names containing the query's rarest trigrams, then
+            # score the best candidates the way pg_trgm's word_similarity does
+            grams = sorted(trigrams(text))
+            cursor.execute(f'''
+                SELECT term, doc FROM sbc_records_trigram_terms
+                WHERE term IN ({', '.join('?' for _ in grams)})
+            ''', grams)
+            candidates = fuzzy_candidate_trigrams(len(grams), dict(cursor.fetchall()))
+            rows = []
+            if candidates:
+                cursor.execute(f'''
+                    SELECT {selected}, r.group_name, r.filename
+                    FROM sbc_records_trigrams AS t JOIN sbc_records AS r ON r.id = t.rowid
+                    WHERE sbc_records_trigrams MATCH ?
+                    ORDER BY t.rank
+                    LIMIT ?
+                ''', (fts5_any_query(candidates), SEARCH_FUZZY_CANDIDATES))
+                for row in cursor.fetchall():
+                    score = max(word_similarity(text, row[-2]), word_similarity(text, row[-1]))
+                    if score >= SEARCH_FUZZY_THRESHOLD:
+                        rows.append(row[:-2] + (score,))
+                rows.sort(key=lambda row: (row[-1], row[0]), reverse=True)
+                rows = rows[:limit]
+        else:
+            # SQLite: FTS5 with bm25, names weighted above plan facts
+            cursor.execute(f'''
+                SELECT {selected}, -matches.rank AS score
+                FROM (
+                    SELECT rowid, bm25(sbc_records_fts, 10.0, 5.0, 1.0) AS rank
+                    FROM sbc_records_fts
+                    WHERE sbc_records_fts MATCH ?
+                    ORDER BY rowid DESC
+                    LIMIT ?
+                ) AS matches JOIN sbc_records AS r ON r.id = matches.rowid
+                ORDER BY score DESC, r.id DESC
+                LIMIT ?
+            ''', (fts5_query(terms, mode), SEARCH_RANK_WINDOW, limit))
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    records = []
+    for row in rows:
+        record = format_record(row[:-1], columns)
+        record['score'] = float(row[-1])
+        records.append(record)
+    return records
+
+# Columns record statistics can be grouped by
+RECORD_STATS_GROUPS = ('upload_date', 'plan_type')
+
+def get_record_stats(group_by=(), date_from=None, date_to=None):
+    """Record counts per penalty answer, overall and optionally per upload date and/or plan type
+
+    Reads the record_stats summary that database triggers keep current, so
+    the cost grows with the number of days and plan types, not records.
+    Returns ``total`` and the ``penalty_a``/``penalty_b`` counts per answer;
+    with ``group_by`` also ``groups``, each with the same figures.
+    """
+    group_by = tuple(group_by)
+    unknown = [column for column in group_by if column not in RECORD_STATS_GROUPS]
+    if unknown:
+        raise ValueError(f"Cannot group by: {', '.join(unknown)}")
+    keys = group_by + ('penalty_a', 'penalty_b')
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        conditions = ['records > 0']
+        params = []
+        if date_from:
+            conditions.append(f'upload_date >= {ph}')
+            params.append(date_from)
+        if date_to:
+            conditions.append(f'upload_date <= {ph}')
+            params.append(date_to)
+        cursor.execute(f'''
+            SELECT {', '.join(keys)}, SUM(records)
+            FROM record_stats
+            WHERE {' AND '.join(conditions)}
+            GROUP BY {', '.join(keys)}
+            ORDER BY {', '.join(keys)}
+        ''', params)
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    def counts():
+        return {'total': 0, 'penalty_a': {}, 'penalty_b': {}}
+
+    summary = counts()
+    groups = {}
+    for row in rows:
+        group = row[:len(group_by)]
+        penalty_a, penalty_b, records = row[len(group_by):]
+        targets = [summary]
+        if group_by:
+            if group not in groups:
+                values = dict(zip(group_by, group))
+                if isinstance(values.get('upload_date'), date):
+                    values['upload_date'] = values['upload_date'].isoformat()
+                if 'plan_type' in values:
+                    # Records without a plan type are counted under ''
+                    values['plan_type'] = values['plan_type'] or None
+                groups[group] = {**values, **counts()}
+            targets.append(groups[group])
+        for target in targets:
+            target['total'] += int(records)
+            target['penalty_a'][penalty_a] = target['penalty_a'].get(penalty_a, 0) + int(records)
+            target['penalty_b'][penalty_b] = target['penalty_b'].get(penalty_b, 0) + int(records)
+
+    if group_by:
+        summary['groups'] = list(groups.values())
+    return summary
 
 def get_record_by_id(record_id):
-    """Get a record by ID including explanations"""
+    """Get a record by ID including plan facts and any stored explanations"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if we're using PostgreSQL or SQLite and use appropriate placeholders
-    if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
-        # PostgreSQL
-        cursor.execute('''
-            SELECT id, group_name, upload_date, penalty_a, penalty_b, filename, s3_url, 
-                   penalty_a_explanation, penalty_b_explanation, created_at
-            FROM sbc_records WHERE id = %s
-        ''', (record_id,))
-    else:
-        # SQLite
-        cursor.execute('''
-            SELECT id, group_name, upload_date, penalty_a, penalty_b, filename, s3_url,
-                   penalty_a_explanation, penalty_b_explanation, created_at
-            FROM sbc_records WHERE id = ?
-        ''', (record_id,))
+    try:
+        cursor = conn.cursor()
+        
+        # Check if we're using PostgreSQL or SQLite and use appropriate placeholders
+        if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
+            # PostgreSQL
+            cursor.execute(f'''
+                SELECT {', '.join(RECORD_COLUMNS)}
+                FROM sbc_records WHERE id = %s
+            ''', (record_id,))
+        else:
+            # SQLite
+            cursor.execute(f'''
+                SELECT {', '.join(RECORD_COLUMNS)}
+                FROM sbc_records WHERE id = ?
+            ''', (record_id,))
+        
+        record = cursor.fetchone()
+    finally:
+        conn.close()
     
-    record = cursor.fetchone()
-    conn.close()
+    if record:
+        return format_record(record)
+    return None
+
+def get_record_by_hash(content_hash):
+    """Get the record previously extracted from a file with this SHA-256 digest"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        
+        if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
+            # PostgreSQL
+            cursor.execute(f'''
+                SELECT {', '.join(RECORD_COLUMNS)}
+                FROM sbc_records WHERE content_hash = %s
+            ''', (content_hash,))
+        else:
+            # SQLite
+            cursor.execute(f'''
+                SELECT {', '.join(RECORD_COLUMNS)}
+                FROM sbc_records WHERE content_hash = ?
+            ''', (content_hash,))
+        
+        record = cursor.fetchone()
+    finally:
+        conn.close()
     
     if record:
-        return {
-            'id': record[0],
-            'group_name': record[1],
-            'upload_date': record[2],
-            'penalty_a': record[3],
-            'penalty_b': record[4],
-            'filename': record[5],
-            's3_url': record[6],
-            'penalty_a_explanation': record[7] if len(record) > 7 else '',
-            'penalty_b_explanation': record[8] if len(record) > 8 else '',
-            'created_at': record[9] if len(record) > 9 else None
-        }
+        return format_record(record)
     return None
 
 def delete_record(record_id):
-    """Delete a record by ID"""
+    """Delete a record by ID along with its pending S3 uploads
+
+    Returns the spooled files of the dropped uploads for the caller to remove.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        cursor.execute(f'SELECT file_path FROM s3_outbox WHERE record_id = {ph}', (record_id,))
+        spooled = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'DELETE FROM s3_outbox WHERE record_id = {ph}', (record_id,))
+        cursor.execute(f'DELETE FROM sbc_records WHERE id = {ph}', (record_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    return spooled
+
+# Columns bulk writes may set, and those stored as JSON
+RECORD_WRITE_COLUMNS = (
+    'group_name', 'upload_date', 'penalty_a', 'penalty_b', 'filename', 's3_url',
+    'penalty_a_explanation', 'penalty_b_explanation', 'content_hash', 'plan_facts', 'extractor_version'
+)
+RECORD_JSON_COLUMNS = ('plan_facts',)
+# PostgreSQL types of columns whose values bulk updates send as text
+RECORD_COLUMN_CASTS = {'plan_facts': 'jsonb', 'upload_date': 'date'}
+# Rows sent per statement by the bulk helpers
+BULK_PAGE_SIZE = int(os.getenv('BULK_PAGE_SIZE', '500'))
+
+def _record_values(record, columns):
+    """Row tuple for ``columns`` with JSON columns serialized"""
+    return tuple(
+        json.dumps(record.get(column)) if column in RECORD_JSON_COLUMNS and record.get(column) is not None
+        else record.get(column)
+        for column in columns
+    )
+
+def _check_write_columns(columns):
+    unknown = [column for column in columns if column not in RECORD_WRITE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Cannot write columns: {', '.join(unknown)}")
+
+def bulk_insert_records(records, page_size=BULK_PAGE_SIZE):
+    """Insert many records in a few round trips and return how many were inserted
+
+    ``records`` are dicts keyed by column name; upload_date defaults to
+    today. Records whose content hash is already stored are skipped.
+    """
+    records = list(records)
+    if not records:
+        return 0
+    today = datetime.now().strftime('%Y-%m-%d')
+    rows = [_record_values({'upload_date': today, **record}, RECORD_WRITE_COLUMNS) for record in records]
     
-    # Check if we're using PostgreSQL or SQLite and use appropriate placeholders
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
+            # PostgreSQL: one multi-row INSERT per page
+            from psycopg2.extras import execute_values
+            inserted = execute_values(cursor, f'''
+                INSERT INTO sbc_records ({', '.join(RECORD_WRITE_COLUMNS)})
+                VALUES %s
+                ON CONFLICT (content_hash) DO NOTHING
+                RETURNING id
+            ''', rows, page_size=page_size, fetch=True)
+            inserted_count = len(inserted)
+        else:
+            # SQLite: executemany reuses one prepared statement
+            cursor.executemany(f'''
+                INSERT INTO sbc_records ({', '.join(RECORD_WRITE_COLUMNS)})
+                VALUES ({', '.join('?' for _ in RECORD_WRITE_COLUMNS)})
+                ON CONFLICT (content_hash) DO NOTHING
+            ''', rows)
+            inserted_count = cursor.rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return inserted_count
+
+def bulk_update_records(updates, columns, page_size=BULK_PAGE_SIZE):
+    """Set ``columns`` on many records in a few round trips and return how many were updated
+
+    ``updates`` are dicts with the record ``id`` and a value for every column.
+    """
+    columns = tuple(columns)
+    _check_write_columns(columns)
+    rows = [(update['id'],) + _record_values(update, columns) for update in updates]
+    if not rows:
+        return 0
+    
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
+            # PostgreSQL: join each page of rows as a VALUES list
+            from psycopg2.extras import execute_values
+            assignments = ', '.join(
+                f"{column} = v.{column}::{RECORD_COLUMN_CASTS[column]}" if column in RECORD_COLUMN_CASTS
+                else f"{column} = v.{column}"
+                for column in columns
+            )
+            execute_values(cursor, f'''
+                UPDATE sbc_records AS r SET {assignments}
+                FROM (VALUES %s) AS v (id, {', '.join(columns)})
+                WHERE r.id = v.id
+            ''', rows, page_size=page_size)
+        else:
+            # SQLite
+            cursor.executemany(f'''
+                UPDATE sbc_records SET {', '.join(f'{column} = ?' for column in columns)}
+                WHERE id = ?
+            ''', [row[1:] + row[:1] for row in rows])
+        conn.commit()
+    finally:
+        conn.close()
+    return len(rows)
+
+def iter_record_batches(columns=RECORD_COLUMNS, batch_size=BULK_PAGE_SIZE, after_id=0,
+                        extractor_version_below=None):
+    """Yield every record with an id above ``after_id``, in id order, as lists of dicts
+
+    With ``extractor_version_below`` only records extracted by an older
+    extractor, or before versions were recorded, are returned.
+
+    PostgreSQL streams the rows through a server-side cursor, so memory use
+    stays at one batch however large the table is. The cursor keeps its
+    connection busy until the last batch, so it gets a connection of its own
+    rather than one of the pool's. SQLite reads one keyset page per batch on
+    a pooled connection that is returned between batches, so the caller can
+    write to the table while iterating.
+    """
+    columns = tuple(dict.fromkeys(('id',) + tuple(columns)))
+    outdated = ''
+    filter_params = ()
+
+    if os.getenv('RENDER_DB_KEY') and PSYCOPG2_AVAILABLE:
+        conn = _open_connection()
+        try:
+            if isinstance(conn, psycopg2.extensions.connection):
+                if extractor_version_below is not None:
+                    outdated = 'AND (extractor_version IS NULL OR extractor_version < %s)'
+                    filter_params = (extractor_version_below,)
+                # PostgreSQL: named cursors are declared on the server
+                with conn.cursor(name='sbc_records_batches') as cursor:
+                    cursor.itersize = batch_size
+                    cursor.execute(f'''
+                        SELECT {', '.join(columns)} FROM sbc_records
+                        WHERE id > %s {outdated} ORDER BY id
+                    ''', (after_id,) + filter_params)
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield [format_record(row, columns) for row in rows]
+                return
+        finally:
+            conn.close()
+
+    # SQLite
+    if extractor_version_below is not None:
+        outdated = 'AND (extractor_version IS NULL OR extractor_version < ?)'
+        filter_params = (extractor_version_below,)
+    while True:
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(f'''
+                SELECT {', '.join(columns)} FROM sbc_records
+                WHERE id > ? {outdated} ORDER BY id LIMIT ?
+            ''', (after_id,) + filter_params + (batch_size,)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            break
+        after_id = rows[-1][0]
+        yield [format_record(row, columns) for row in rows]
+
+def _utc_now():
+    """Current UTC time in the format stored in job timestamp columns"""
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+def _placeholder(conn):
+    """Return the parameter placeholder for the connection's driver"""
     if PSYCOPG2_AVAILABLE and isinstance(conn, psycopg2.extensions.connection):
-        # PostgreSQL
-        cursor.execute('DELETE FROM sbc_records WHERE id = %s', (record_id,))
-    else:
-        # SQLite
-        cursor.execute('DELETE FROM sbc_records WHERE id = ?', (record_id,))
+        return '%s'
+    return '?'
+
+def create_job(filename, file_path, content_hash, backend=None):
+    """Queue a spooled PDF for background extraction and return the job id"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        
+        query = f'''
+            INSERT INTO extraction_jobs (status, filename, file_path, content_hash, backend, created_at)
+            VALUES ('queued', {ph}, {ph}, {ph}, {ph}, {ph})
+        '''
+        params = (filename, file_path, content_hash, backend, _utc_now())
+        
+        if ph == '%s':
+            # PostgreSQL
+            cursor.execute(query + ' RETURNING id', params)
+            job_id = cursor.fetchone()[0]
+        else:
+            # SQLite
+            cursor.execute(query, params)
+            job_id = cursor.lastrowid
+        
+        conn.commit()
+    finally:
+        conn.close()
+    return job_id
+
+JOB_COLUMNS = (
+    'id', 'status', 'filename', 'file_path', 'content_hash', 'backend', 'attempts',
+    'error', 'record_id', 'created_at', 'started_at', 'heartbeat_at', 'finished_at', 'retry_at'
+)
+
+def get_job(job_id):
+    """Get a background extraction job by ID"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        
+        cursor.execute(f'''
+            SELECT {', '.join(JOB_COLUMNS)} FROM extraction_jobs WHERE id = {ph}
+        ''', (job_id,))
+        
+        job = cursor.fetchone()
+    finally:
+        conn.close()
     
-    conn.commit()
-    conn.close()
+    if job:
+        return dict(zip(JOB_COLUMNS, job))
+    return None
+
+def claim_next_job(stale_before, max_attempts):
+    """Atomically move the oldest runnable job to 'running' and return it
+
+    Runnable jobs are queued ones whose ``retry_at`` has passed, and running
+    ones whose heartbeat is older than ``stale_before`` (their worker was
+    recycled or killed). Stale jobs that already used ``max_attempts`` are
+    marked failed instead of being retried, and their spooled files are removed.
+    """
+    conn = get_db_connection()
+    abandoned = []
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        now = _utc_now()
+        
+        if ph == '%s':
+            # PostgreSQL
+            cursor.execute('''
+                UPDATE extraction_jobs
+                SET status = 'failed', error = 'Worker stopped while processing the job', finished_at = %s
+                WHERE status = 'running' AND heartbeat_at < %s AND attempts >= %s
+                RETURNING id, file_path
+            ''', (now, stale_before, max_attempts))
+            abandoned = cursor.fetchall()
+        else:
+            # SQLite: only the claimer whose update succeeds removes the file
+            cursor.execute('''
+                SELECT id, file_path FROM extraction_jobs
+                WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?
+            ''', (stale_before, max_attempts))
+            for job_id, file_path in cursor.fetchall():
+                cursor.execute('''
+                    UPDATE extraction_jobs
+                    SET status = 'failed', error = 'Worker stopped while processing the job', finished_at = ?
+                    WHERE id = ? AND status = 'running' AND heartbeat_at < ?
+                ''', (now, job_id, stale_before))
+                if cursor.rowcount == 1:
+                    abandoned.append((job_id, file_path))
+        
+        runnable = (
+            f"(status = 'queued' AND (retry_at IS NULL OR retry_at <= {ph})) "
+            f"OR (status = 'running' AND heartbeat_at < {ph})"
+        )
+        
+        if ph == '%s':
+            # PostgreSQL: SKIP LOCKED lets concurrent workers claim different jobs
+            cursor.execute(f'''
+                UPDATE extraction_jobs
+                SET status = 'running', attempts = attempts + 1,
+                    started_at = %s, heartbeat_at = %s, error = NULL
+                WHERE id = (
+                    SELECT id FROM extraction_jobs
+                    WHERE {runnable}
+                    ORDER BY id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {', '.join(JOB_COLUMNS)}
+            ''', (now, now, now, stale_before))
+            job = cursor.fetchone()
+        else:
+            # SQLite: the conditional update only succeeds for one claimer
+            job = None
+            cursor.execute(f'''
+                SELECT id, attempts FROM extraction_jobs
+                WHERE {runnable}
+                ORDER BY id
+                LIMIT 1
+            ''', (now, stale_before))
+            candidate = cursor.fetchone()
+            if candidate:
+                cursor.execute('''
+                    UPDATE extraction_jobs
+                    SET status = 'running', attempts = attempts + 1,
+                        started_at = ?, heartbeat_at = ?, error = NULL
+                    WHERE id = ? AND attempts = ?
+                ''', (now, now, candidate[0], candidate[1]))
+                if cursor.rowcount == 1:
+                    cursor.execute(f'''
+                        SELECT {', '.join(JOB_COLUMNS)} FROM extraction_jobs WHERE id = ?
+                    ''', (candidate[0],))
+                    job = cursor.fetchone()
+        
+        conn.commit()
+    finally:
+        conn.close()
+    
+    for job_id, file_path in abandoned:
+        print(f"Job {job_id}: failed after its worker stopped too often, removing its file")
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+    
+    if job:
+        return dict(zip(JOB_COLUMNS, job))
+    return None
+
+def touch_job(job_id):
+    """Record that the worker running a job is still alive"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        cursor.execute(f"UPDATE extraction_jobs SET heartbeat_at = {ph} WHERE id = {ph} AND status = 'running'",
+                       (_utc_now(), job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+def finish_job(job_id, status, record_id=None, error=None, retry_at=None):
+    """Mark a job as succeeded, failed, or queued again for a retry at ``retry_at``"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        finished_at = None if status == 'queued' else _utc_now()
+        cursor.execute(f'''
+            UPDATE extraction_jobs
+            SET status = {ph}, record_id = {ph}, error = {ph}, finished_at = {ph}, retry_at = {ph}
+            WHERE id = {ph}
+        ''', (status, record_id, error, finished_at, retry_at, job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+S3_OUTBOX_COLUMNS = (
+    'id', 'record_id', 'status', 'filename', 'file_path', 'content_hash', 'attempts',
+    'error', 'created_at', 'next_attempt_at', 'finished_at'
+)
+
+def _queue_s3_upload(cursor, ph, record_id, filename, file_path, content_hash):
+    """Add a pending S3 upload for a record, due immediately"""
+    now = _utc_now()
+    cursor.execute(f'''
+        INSERT INTO s3_outbox (record_id, status, filename, file_path, content_hash, created_at, next_attempt_at)
+        VALUES ({ph}, 'pending', {ph}, {ph}, {ph}, {ph}, {ph})
+    ''', (record_id, filename, file_path, content_hash, now, now))
+
+def claim_s3_upload(lease_until):
+    """Claim the S3 upload that has been due the longest and return it
+
+    The claim moves the entry's ``next_attempt_at`` to ``lease_until``, so it
+    is retried then if the worker dies before reporting back.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        now = _utc_now()
+        
+        if ph == '%s':
+            # PostgreSQL: SKIP LOCKED lets concurrent workers claim different uploads
+            cursor.execute(f'''
+                UPDATE s3_outbox
+                SET attempts = attempts + 1, next_attempt_at = %s
+                WHERE id = (
+                    SELECT id FROM s3_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= %s
+                    ORDER BY next_attempt_at, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {', '.join(S3_OUTBOX_COLUMNS)}
+            ''', (lease_until, now))
+            entry = cursor.fetchone()
+        else:
+            # SQLite: the conditional update only succeeds for one claimer
+            entry = None
+            cursor.execute('''
+                SELECT id, attempts FROM s3_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT 1
+            ''', (now,))
+            candidate = cursor.fetchone()
+            if candidate:
+                cursor.execute('''
+                    UPDATE s3_outbox SET attempts = attempts + 1, next_attempt_at = ?
+                    WHERE id = ? AND attempts = ?
+                ''', (lease_until, candidate[0], candidate[1]))
+                if cursor.rowcount == 1:
+                    cursor.execute(f'''
+                        SELECT {', '.join(S3_OUTBOX_COLUMNS)} FROM s3_outbox WHERE id = ?
+                    ''', (candidate[0],))
+                    entry = cursor.fetchone()
+        
+        conn.commit()
+    finally:
+        conn.close()
+    
+    if entry:
+        return dict(zip(S3_OUTBOX_COLUMNS, entry))
+    return None
+
+def complete_s3_upload(entry_id, record_id, s3_url):
+    """Store the uploaded file's URL on its record and remove the outbox entry
+
+    Returns False if the record was deleted while the upload was pending.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        cursor.execute(f'UPDATE sbc_records SET s3_url = {ph} WHERE id = {ph}', (s3_url, record_id))
+        updated = cursor.rowcount == 1
+        cursor.execute(f'DELETE FROM s3_outbox WHERE id = {ph}', (entry_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    return updated
+
+def fail_s3_upload(entry_id, error, next_attempt_at=None):
+    """Schedule another attempt of an S3 upload, or give up on it without ``next_attempt_at``"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        if next_attempt_at:
+            cursor.execute(f'''
+                UPDATE s3_outbox SET error = {ph}, next_attempt_at = {ph} WHERE id = {ph}
+            ''', (error, next_attempt_at, entry_id))
+        else:
+            cursor.execute(f'''
+                UPDATE s3_outbox SET status = 'failed', error = {ph}, finished_at = {ph} WHERE id = {ph}
+            ''', (error, _utc_now(), entry_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_s3_outbox_stats():
+    """Number of pending and failed S3 uploads, and when the oldest pending one was queued"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT status, COUNT(*), MIN(created_at) FROM s3_outbox GROUP BY status
+        ''')
+        rows = {status: (count, oldest) for status, count, oldest in cursor.fetchall()}
+    finally:
+        conn.close()
+    pending, oldest_pending = rows.get('pending', (0, None))
+    return {
+        'pending': pending,
+        'failed': rows.get('failed', (0, None))[0],
+        'oldest_pending': str(oldest_pending) if oldest_pending else None
+    }
+
+def add_rule_stats(deltas):
+    """Add {rule_key: [evaluated, matched, time_ns]} counters to the stored totals"""
+    if not deltas:
+        return
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ph = _placeholder(conn)
+        now = _utc_now()
+        
+        # Both databases support the same upsert syntax
+        cursor.executemany(f'''
+            INSERT INTO rule_stats (rule_key, evaluated, matched, time_ns, updated_at)
+            VALUES ({ph}, {ph}, {ph}, {ph}, {ph})
+            ON CONFLICT (rule_key) DO UPDATE SET
+                evaluated = rule_stats.evaluated + excluded.evaluated,
+                matched = rule_stats.matched + excluded.matched,
+                time_ns = rule_stats.time_ns + excluded.time_ns,
+                updated_at = excluded.updated_at
+        ''', [(key, counts[0], counts[1], counts[2], now) for key, counts in deltas.items()])
+        
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_rule_stats():
+    """Stored totals per extraction rule"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT rule_key, evaluated, matched, time_ns FROM rule_stats')
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    return {row[0]: [row[1], row[2], row[3]] for row in rows}
+
+def reset_rule_stats():
+    """Delete the stored rule totals"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM rule_stats')
+        conn.commit()
+    finally:
+        conn.close()
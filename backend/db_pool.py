@@ -0,0 +1,271 @@
+import os
+import sqlite3
+import threading
+from collections import deque
+from time import monotonic, perf_counter
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+class PoolTimeout(Exception):
+    """Raised when no database connection becomes free within the pool timeout"""
+
+class _PooledConnection:
+    """Mixin for driver connections whose close() hands them back to their pool
+
+    Callers keep the usual connect/close pattern; closing twice is harmless.
+    """
+
+    _pool = None
+    _checked_out = False
+
+    def close(self):
+        if self._pool is None:
+            return self._close()
+        if self._checked_out:
+            self._checked_out = False
+            self._pool.release(self)
+
+    def _close(self):
+        super().close()
+
+class PooledSqliteConnection(_PooledConnection, sqlite3.Connection):
+    kind = 'sqlite'
+
+    def is_usable(self) -> bool:
+        return True
+
+    def ping(self) -> bool:
+        self.execute('SELECT 1').fetchone()
+        return True
+
+    def reset(self):
+        """Roll back whatever the last borrower left uncommitted"""
+        if self.in_transaction:
+            self.rollback()
+
+if PSYCOPG2_AVAILABLE:
+    class PooledPgConnection(_PooledConnection, psycopg2.extensions.connection):
+        kind = 'postgresql'
+
+        def is_usable(self) -> bool:
+            return not self.closed
+
+        def ping(self) -> bool:
+            # Autocommit makes the check a single round trip without a BEGIN
+            self.autocommit = True
+            try:
+                with self.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                return True
+            finally:
+                self.autocommit = False
+
+        def reset(self):
+            """Roll back the transaction psycopg2 opened for the last borrower's queries"""
+            if self.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                self.rollback()
+
+class ConnectionPool:
+    """Thread-safe pool of database connections for one process
+
+    ``connect`` opens a new pooled connection. Up to ``max_size`` connections
+    are open at once; ``min_size`` of them are opened on first use and kept.
+    A connection that sat idle for ``ping_interval`` seconds or more is
+    checked with a round trip before it is handed out. Connections inherited
+    across fork belong to the parent and are never used or closed by the child.
+    """
+
+    def __init__(self, connect, min_size: int = 1, max_size: int = 5,
+                 timeout: float = 10, ping_interval: float = 30):
+        self.connect = connect
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.kind = None
+        self._inherited = []
+        self._reset_state()
+
+    def _reset_state(self):
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._filled = False
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.opened = 0
+        self.discarded = 0
+        self.failed_checks = 0
+
+    def _check_fork(self):
+        if self.pid != os.getpid():
+            # Closing the parent's connections here would end its sessions;
+            # keep them referenced so they are not closed when collected
+            self._inherited.extend(conn for conn, _ in self._idle)
+            self._reset_state()
+
+    def _open(self):
+        conn = self.connect()
+        conn._pool = self
+        self.kind = conn.kind
+        with self._cond:
+            self.opened += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn._close()
+        except Exception:
+            pass
+        with self._cond:
+            self.discarded += 1
+
+    def _fill(self):
+        """Open the minimum number of connections the first time this process needs one"""
+        with self._cond:
+            if self._filled:
+                return
+            self._filled = True
+            missing = self.min_size - self._size
+            self._size += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            try:
+                conn = self._open()
+            except Exception as e:
+                print(f"Failed to open pooled database connection: {e}")
+                with self._cond:
+                    self._size -= 1
+                continue
+            with self._cond:
+                self._idle.append((conn, monotonic()))
+                self._cond.notify()
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to ``timeout`` for a free one"""
+        self._check_fork()
+        start = perf_counter()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = idle_since = None
+                    break
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self.waits += 1
+                    self.wait_time += self.timeout
+                    self.max_wait_time = max(self.max_wait_time, self.timeout)
+                    raise PoolTimeout(f"No database connection available after {self.timeout:g}s")
+                waited = True
+                self._cond.wait(remaining)
+
+            elapsed = perf_counter() - start
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += elapsed
+                self.max_wait_time = max(self.max_wait_time, elapsed)
+
+        if conn is not None and not self._healthy(conn, idle_since):
+            self._discard(conn)
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        if not self._filled:
+            self._fill()
+
+        conn._checked_out = True
+        return conn
+
+    def _healthy(self, conn, idle_since: float) -> bool:
+        try:
+            if not conn.is_usable():
+                healthy = False
+            elif monotonic() - idle_since >= self.ping_interval:
+                healthy = conn.ping()
+            else:
+                return True
+        except Exception as e:
+            print(f"Pooled database connection failed its health check: {e}")
+            healthy = False
+        if not healthy:
+            with self._cond:
+                self.failed_checks += 1
+        return healthy
+
+    def release(self, conn):
+        """Return a connection after rolling back anything left uncommitted"""
+        if self.pid != os.getpid():
+            return
+        try:
+            conn.reset()
+            usable = conn.is_usable()
+        except Exception:
+            usable = False
+
+        if not usable:
+            self._discard(conn)
+        with self._cond:
+            if usable:
+                self._idle.append((conn, monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def close(self):
+        """Close the idle connections of this process; used before forking workers"""
+        self._check_fork()
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._filled = False
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        self._check_fork()
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'pid': self.pid,
+                'database': self.kind,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_ms_total': round(self.wait_time * 1000, 2),
+                'wait_ms_avg': round(self.wait_time * 1000 / self.waits, 2) if self.waits else 0,
+                'wait_ms_max': round(self.max_wait_time * 1000, 2),
+                'timeouts': self.timeouts,
+                'connections_opened': self.opened,
+                'connections_closed': self.discarded,
+                'failed_health_checks': self.failed_checks
+            }
@@ -0,0 +1,152 @@
+import re
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+# Headings that close a section of the standard SBC template, searched in the
+# lowercased text. A section starts at the beginning of the document, so a
+# pattern that is not found in it can still be looked for in the full text.
+SECTION_ENDS = {
+    # Company name, plan name, plan type and coverage period
+    'header': None,  # first page
+    # "Important Questions" table: deductibles and out-of-pocket limits
+    'important_questions': re.compile(r'common\s+medical\s+event'),
+}
+
+class DocumentContext:
+    """Text views of one document, computed once and shared by every extractor
+
+    Pages are added as they are parsed. The joined text, its lowercased form
+    and the line index are built incrementally; section boundaries are found
+    lazily and recomputed only after new pages arrive.
+    """
+
+    def __init__(self, pages: Optional[List[str]] = None):
+        self.pages = []
+        self.page_offsets = []
+        self._chunks = []
+        self._lower_chunks = []
+        self._line_starts = [0]
+        self._length = 0
+        self._text = None
+        self._lower = None
+        self._lines = None
+        self._sections = {}
+        for page_text in pages or []:
+            self.add_page(page_text)
+
+    @classmethod
+    def of(cls, source) -> 'DocumentContext':
+        """Return ``source`` if it is a context, else a one-page context of the text"""
+        if isinstance(source, DocumentContext):
+            return source
+        context = cls()
+        context.add_page(source or "", separator="")
+        return context
+
+    def add_page(self, page_text: str, separator: str = "\n"):
+        """Append a page; empty pages are counted but add no text"""
+        self.pages.append(page_text)
+        self.page_offsets.append(self._length)
+        if not page_text:
+            return
+
+        chunk = page_text + separator
+        # Lowercasing page by page gives the same result as lowercasing the
+        # joined text because every page ends with a line break
+        self._chunks.append(chunk)
+        self._lower_chunks.append(chunk.lower())
+        self._line_starts.extend(match.end() + self._length for match in re.finditer('\n', chunk))
+        self._length += len(chunk)
+        self._text = self._lower = self._lines = None
+        self._sections = {}
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._chunks)
+        return self._text
+
+    @property
+    def lower(self) -> str:
+        """Lowercased text; its length may differ from ``text`` for a few non-ASCII characters"""
+        if self._lower is None:
+            self._lower = "".join(self._lower_chunks)
+        return self._lower
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.text.split('\n')
+        return self._lines
+
+    def page_lines(self, index: int) -> List[str]:
+        """Lines of a single page"""
+        if index >= len(self.pages):
+            return [""]
+        return self.pages[index].split('\n')
+
+    def line_at(self, offset: int) -> int:
+        """Index of the line containing a text offset"""
+        return bisect_right(self._line_starts, offset) - 1
+
+    def page_at(self, offset: int) -> int:
+        """Index of the page containing a text offset"""
+        return max(0, bisect_right(self.page_offsets, offset) - 1)
+
+    def section(self, name: str) -> Tuple[int, int]:
+        """(start, end) offsets of a named section, or of the whole text if it is not found"""
+        if name not in self._sections:
+            self._sections[name] = (0, self._find_section_end(name))
+        return self._sections[name]
+
+    def section_ended(self, name: str) -> bool:
+        """Check whether the text read so far reaches past the end of a named section"""
+        return self.section(name)[1] < self._length
+
+    def _find_section_end(self, name: str) -> int:
+        if name == 'header':
+            # Everything before the second page with text
+            later = [offset for offset in self.page_offsets[1:] if offset > 0]
+            return later[0] if later else self._length
+
+        match = SECTION_ENDS[name].search(self.lower) if len(self.lower) == self._length else None
+        if not match:
+            return self._length
+        # Cut at the start of the heading's line so no line is split
+        return self._line_starts[self.line_at(match.start())]
+
+    def search(self, pattern, section: Optional[str] = None, whole_text: bool = True):
+        """Search a lowercase, case-sensitive pattern in a section first, then in the whole text
+
+        Matching the lowercased text is much faster than re.IGNORECASE, so
+        groups come from the lowercased text; use the match span to slice
+        ``text`` when the original case matters. The section is a prefix of
+        the document, so this finds the same match as searching the whole text
+        whenever that match lies in the section. With ``whole_text`` unset,
+        only the section is searched.
+        """
+        if len(self.lower) == self._length:
+            text = self.lower
+        else:
+            # A few non-ASCII characters change length when lowercased
+            text = self.text
+            pattern = _ignorecase(pattern)
+
+        if section is not None:
+            start, end = self.section(section)
+            if end < len(text):
+                match = pattern.search(text, start, end)
+                if match or not whole_text:
+                    return match
+        return pattern.search(text)
+
+_IGNORECASE_PATTERNS = {}
+
+def _ignorecase(pattern):
+    """Case-insensitive variant of a lowercase pattern, for text whose length changes when lowercased"""
+    if hasattr(pattern, 'ignorecase'):
+        # Extraction rules provide their own variant so their counters are kept
+        return pattern.ignorecase
+    if pattern not in _IGNORECASE_PATTERNS:
+        _IGNORECASE_PATTERNS[pattern] = re.compile(pattern.pattern, pattern.flags | re.IGNORECASE)
+    return _IGNORECASE_PATTERNS[pattern]
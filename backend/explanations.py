@@ -0,0 +1,180 @@
+import os
+from functools import lru_cache
+from string import Formatter
+from typing import Optional
+
+# Current year penalty amounts (2024-2025)
+EMPLOYER_PENALTY = "$4,320"  # 2024 4980H penalty amount
+
+# Rendered explanations kept per process
+EXPLANATION_CACHE_SIZE = int(os.getenv('EXPLANATION_CACHE_SIZE', '1024'))
+
+# Plan facts stored with each record, with the value used when one was not found
+PLAN_FACT_DEFAULTS = {
+    'plan_type': 'Health Plan',
+    'deductible_individual': 'Not specified',
+    'deductible_family': 'Not specified',
+    'coverage_period': 'annual coverage period',
+    'oop_limit': 'specified limits',
+    'employer_penalty': EMPLOYER_PENALTY
+}
+
+def format_deductible(individual: str, family: str) -> str:
+    """Describe the individual and family deductibles in one phrase"""
+    if individual != 'Not specified' and family != 'Not specified':
+        return f"{individual} individual / {family} family deductible"
+    elif individual != 'Not specified':
+        return f"{individual} individual deductible"
+    elif family != 'Not specified':
+        return f"{family} family deductible"
+    return 'structured deductible'
+
+# Explanation templates per question and answer. Fields are the plan facts
+# plus company_name and deductible.
+EXPLANATION_TEMPLATES = {
+    'penalty_a_explanation': {
+        'yes': """✅ MINIMUM ESSENTIAL COVERAGE QUALIFIED
+
+{company_name}'s {plan_type} meets all ACA requirements for Minimum Essential Coverage.
+
+KEY QUALIFICATIONS:
+• Comprehensive health benefits including preventive care at no cost
+• Covers all 10 Essential Health Benefits required by ACA
+• Active during {coverage_period}
+• Includes prescription drug coverage and emergency services
+• Meets federal standards for health insurance coverage
+
+COMPLIANCE IMPACT:
+• Employees enrolled in this plan are exempt from individual mandate penalties
+• Plan satisfies ACA coverage requirements for tax purposes
+• Qualifies for premium tax credit eligibility determinations
+
+TECHNICAL DETAILS:
+• Plan Structure: {plan_type} with {deductible}
+• Out-of-Pocket Protection: {oop_limit} maximum annual limits
+• Coverage Level: Meets actuarial value and benefit design standards""",
+        'no': """❌ MINIMUM ESSENTIAL COVERAGE NOT QUALIFIED
+
+{company_name}'s plan does NOT meet ACA Minimum Essential Coverage standards.
+
+COMPLIANCE RISKS:
+• Employees may face individual mandate penalties (varies by state)
+• Plan may not qualify for premium tax credit interactions
+• Potential tax reporting complications for employees
+
+RECOMMENDED ACTIONS:
+• Review plan benefits against ACA essential health benefit categories
+• Consider supplemental coverage options
+• Consult with benefits advisor for compliance strategies
+• Evaluate plan upgrade options for next enrollment period
+
+CURRENT GAPS:
+• May lack required essential health benefit categories
+• Could have insufficient preventive care coverage
+• Possible limitations in prescription drug benefits"""
+    },
+    'penalty_b_explanation': {
+        'yes': """✅ MINIMUM VALUE STANDARDS ACHIEVED
+
+{company_name}'s {plan_type} meets the 60% actuarial value requirement under ACA Section 4980H.
+
+ACTUARIAL VALUE COMPLIANCE:
+• Plan covers ≥60% of expected total healthcare costs
+• Substantial coverage for inpatient hospital and physician services
+• Meets affordability thresholds for employee premium contributions
+• Qualified plan design under federal guidelines
+
+EMPLOYER MANDATE PROTECTION:
+• {company_name} AVOIDS Section 4980H penalties
+• No {employer_penalty} per full-time employee penalty exposure
+• Satisfies "offer of coverage" requirements for large employers
+• Maintains safe harbor status for ACA compliance
+
+PLAN PERFORMANCE METRICS:
+• Structure: {plan_type} with {deductible}
+• Cost Sharing: {oop_limit} out-of-pocket protection
+• Coverage Period: {coverage_period}
+• Value Ratio: ≥60% actuarial value certified""",
+        'no': """❌ MINIMUM VALUE STANDARDS NOT MET
+
+{company_name}'s plan FAILS the 60% actuarial value requirement.
+
+IMMEDIATE PENALTY EXPOSURE:
+• Potential {employer_penalty} penalty per full-time employee annually
+• Applies to ALL full-time employees if triggered
+• Section 4980H(b) "sledgehammer" penalty risk
+• Retroactive penalty assessment possible
+
+COMPLIANCE FAILURES:
+• Plan covers <60% of expected total healthcare costs
+• Insufficient coverage for inpatient hospital or physician services
+• May fail affordability tests for employee contributions
+• Does not qualify as "minimum value" coverage
+
+URGENT ACTIONS REQUIRED:
+• Immediate plan enhancement or replacement needed
+• Calculate total potential penalty exposure (employees × {employer_penalty})
+• Consider stop-loss or supplemental coverage options
+• Engage benefits consultant for emergency compliance strategy
+• Review all full-time employee classifications
+
+FINANCIAL IMPACT EXAMPLE:
+• 50 full-time employees = {employer_penalty} × 50 = $216,000 annual penalty risk"""
+    }
+}
+
+def _compile(template: str) -> tuple:
+    """Split a template into (literal, field) pairs once, at import"""
+    return tuple((literal, field) for literal, field, _, _ in Formatter().parse(template))
+
+_COMPILED_TEMPLATES = {
+    (name, answer): _compile(template)
+    for name, answers in EXPLANATION_TEMPLATES.items()
+    for answer, template in answers.items()
+}
+
+def _answer_key(answer: Optional[str]) -> str:
+    return 'yes' if answer and answer.lower() == 'yes' else 'no'
+
+@lru_cache(maxsize=EXPLANATION_CACHE_SIZE)
+def _render(company_name: str, essential_answer: str, value_answer: str, facts: tuple) -> tuple:
+    values = dict(facts)
+    values['company_name'] = company_name
+    values['deductible'] = format_deductible(values['deductible_individual'], values['deductible_family'])
+    rendered = []
+    for name, answer in (('penalty_a_explanation', essential_answer), ('penalty_b_explanation', value_answer)):
+        rendered.append(''.join(
+            literal + (values[field] if field is not None else '')
+            for literal, field in _COMPILED_TEMPLATES[(name, answer)]
+        ))
+    return tuple(rendered)
+
+def render_explanations(company_name: str, essential_coverage: Optional[str], value_standards: Optional[str],
+                        plan_facts: Optional[dict]) -> dict:
+    """Render both penalty explanations from a record's answers and plan facts"""
+    facts = {**PLAN_FACT_DEFAULTS, **(plan_facts or {})}
+    penalty_a, penalty_b = _render(
+        company_name,
+        _answer_key(essential_coverage),
+        _answer_key(value_standards),
+        tuple((field, str(facts[field])) for field in PLAN_FACT_DEFAULTS)
+    )
+    return {
+        'penalty_a_explanation': penalty_a,
+        'penalty_b_explanation': penalty_b
+    }
+
+def record_explanations(record: dict) -> dict:
+    """Explanations for a stored record
+
+    Records with plan facts are rendered from the current templates; older
+    records fall back to the explanation text stored with them.
+    """
+    if record.get('plan_facts'):
+        return render_explanations(
+            record['group_name'], record['penalty_a'], record['penalty_b'], record['plan_facts']
+        )
+    return {
+        'penalty_a_explanation': record.get('penalty_a_explanation') or '',
+        'penalty_b_explanation': record.get('penalty_b_explanation') or ''
+    }
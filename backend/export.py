@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Export every SBC record as CSV or JSON Lines, optionally gzip-compressed.
+
+Records are streamed from the database in batches (a server-side cursor on
+PostgreSQL, keyset pages on SQLite) and each batch is encoded and written
+before the next one is read, so memory use does not grow with the table.
+GET /api/records/export serves the same output over HTTP.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from time import perf_counter
+from dotenv import load_dotenv
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import RECORD_COLUMNS, iter_record_batches
+
+load_dotenv()
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+# Records read from the database and encoded per chunk
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+
+class RecordEncoder:
+    """Encode batches of records as chunks of CSV or JSON Lines, optionally gzipped
+
+    Call ``begin()`` once, ``encode()`` for every batch and ``finish()`` at
+    the end; the chunks they return concatenate into one file.
+    """
+
+    def __init__(self, columns, format: str = 'csv', compress: bool = False):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{format}'")
+        self.columns = tuple(columns)
+        self.format = format
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def _output(self, text: str) -> bytes:
+        data = text.encode('utf-8')
+        return self.compressor.compress(data) if self.compressor else data
+
+    def begin(self) -> bytes:
+        if self.format == 'csv':
+            return self._output(','.join(self.columns) + '\r\n')
+        return b''
+
+    def encode(self, records) -> bytes:
+        if self.format == 'jsonl':
+            return self._output(''.join(
+                json.dumps({column: record.get(column) for column in self.columns}, default=str) + '\n'
+                for record in records
+            ))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow([self._csv_value(record.get(column)) for column in self.columns])
+        return self._output(buffer.getvalue())
+
+    def finish(self) -> bytes:
+        return self.compressor.flush() if self.compressor else b''
+
+    @staticmethod
+    def _csv_value(value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if value is None:
+            return ''
+        return str(value)
+
+def export_filename(format: str, compress: bool) -> str:
+    return f"sbc_records.{format}{'.gz' if compress else ''}"
+
+def export_chunks(columns=RECORD_COLUMNS, format: str = 'csv', compress: bool = False,
+                  batch_size: int = EXPORT_BATCH_SIZE):
+    """Yield the encoded export of every record, one chunk per batch"""
+    encoder = RecordEncoder(columns, format, compress)
+    yield encoder.begin()
+    for batch in iter_record_batches(columns, batch_size):
+        yield encoder.encode(batch)
+    yield encoder.finish()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help="Output format (default csv)")
+    parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip")
+    parser.add_argument('--fields', help="Comma-separated columns to export (default all)")
+    parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE,
+                        help=f"Records read per batch (default {EXPORT_BATCH_SIZE})")
+    parser.add_argument('--output', '-o', help="Output file (default standard output)")
+    args = parser.parse_args()
+
+    columns = RECORD_COLUMNS
+    if args.fields:
+        columns = tuple(field.strip() for field in args.fields.split(',') if field.strip())
+        unknown = [field for field in columns if field not in RECORD_COLUMNS]
+        if unknown:
+            parser.error(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(RECORD_COLUMNS)}")
+
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    started = perf_counter()
+    written = 0
+    try:
+        for chunk in export_chunks(columns, args.format, args.gzip, args.batch_size):
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            output.close()
+    if args.output:
+        print(f"Wrote {written} bytes to {args.output} in {perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
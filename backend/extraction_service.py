@@ -0,0 +1,125 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from pdf_processor import process_sbc_pdf
+from async_db import run_db
+from rule_stats import record_rule_stats, save_rule_stats, take_pending_rule_stats
+
+load_dotenv()
+
+# Number of extraction processes per API worker
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '2'))
+# Extractions allowed to wait for a free process before uploads are rejected
+EXTRACTION_QUEUE_SIZE = int(os.getenv('EXTRACTION_QUEUE_SIZE', '8'))
+# Recycle extraction processes after this many documents to cap memory growth
+EXTRACTION_MAX_TASKS_PER_CHILD = int(os.getenv('EXTRACTION_MAX_TASKS_PER_CHILD', '50'))
+
+class ExtractionQueueFull(Exception):
+    """Raised when the extraction pool cannot accept any more documents"""
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_slots = None
+_in_flight = 0
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get the process pool for this worker, creating it after fork if needed"""
+    global _executor, _executor_pid, _slots, _in_flight
+
+    with _executor_lock:
+        # gunicorn preloads the app in the master, so never reuse a pool (or its
+        # semaphore) inherited from another process
+        if _executor_pid != os.getpid():
+            _executor = None
+            _executor_pid = os.getpid()
+            _slots = asyncio.Semaphore(EXTRACTION_WORKERS + EXTRACTION_QUEUE_SIZE)
+            _in_flight = 0
+
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=EXTRACTION_MAX_TASKS_PER_CHILD
+            )
+            print(f"Started extraction pool with {EXTRACTION_WORKERS} processes (pid {_executor_pid})")
+
+        return _executor
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    """Drop a broken pool so the next submission starts a fresh one
+
+    Every extraction running in the pool fails at once; only the first to
+    report it replaces the pool, so a pool started since is left alone.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not broken:
+            return
+        _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+async def extract_pdf(source, wait: bool = False, **options) -> dict:
+    """Run process_sbc_pdf in the process pool without blocking the event loop
+
+    ``source`` is a PDF path or the PDF's bytes; bytes are sent to the
+    extraction process and parsed from memory there.
+    When every process is busy and the submission queue is full, raises
+    ExtractionQueueFull immediately, or waits for a free slot if ``wait`` is set.
+    """
+    global _in_flight
+    executor = get_executor()
+
+    if not wait and _slots.locked():
+        raise ExtractionQueueFull(
+            f"Extraction queue is full ({EXTRACTION_WORKERS} running, {EXTRACTION_QUEUE_SIZE} queued)"
+        )
+
+    async with _slots:
+        _in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                executor, _run_extraction, source, options
+            )
+        except BrokenProcessPool as e:
+            print(f"Extraction process died, restarting pool: {e}")
+            _reset_executor(executor)
+            return {
+                'success': False,
+                'error': 'PDF extraction process terminated unexpectedly'
+            }
+        finally:
+            _in_flight -= 1
+
+    # Rule counters come back from the extraction process with each result
+    if record_rule_stats(result.pop('rule_stats', None)):
+        await run_db(save_rule_stats, take_pending_rule_stats())
+    return result
+
+def _run_extraction(source, options: dict) -> dict:
+    """Entry point executed inside the extraction processes"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return process_sbc_pdf(source, **options)
+
+def get_extraction_stats() -> dict:
+    """Report pool size and current load for this worker"""
+    return {
+        'workers': EXTRACTION_WORKERS,
+        'queue_size': EXTRACTION_QUEUE_SIZE,
+        'in_flight': _in_flight if _executor_pid == os.getpid() else 0
+    }
+
+def shutdown_extraction_pool():
+    """Stop the extraction processes owned by this worker"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None and _executor_pid == os.getpid():
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,107 +1,75 @@
 #!/usr/bin/env python3
 """
 Script to fix incorrect answers in the database and regenerate explanations.
+
+Records are streamed and updated in batches; an interrupted run resumes from
+its checkpoint. Use --dry-run to list the fixes without writing them.
 """
 
 import os
 import sys
-from datetime import datetime
 from dotenv import load_dotenv
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import get_all_records, get_db_connection
-from pdf_processor import generate_penalty_explanation
+from explanations import render_explanations
+from maintenance import batch_argument_parser, run_batched_update
 
 load_dotenv()
 
-def fix_incorrect_answers():
+def corrected_answers(penalty_a, penalty_b):
+    """Return the corrected (penalty_a, penalty_b) of a record"""
+    new_penalty_a = penalty_a if penalty_a in ['Yes', 'No'] else 'Unknown'
+    
+    # Fix "S" to "Yes" for Minimum Value Standards
+    if penalty_b == 'S':
+        new_penalty_b = 'Yes'
+    else:
+        new_penalty_b = penalty_b if penalty_b in ['Yes', 'No'] else 'Unknown'
+    
+    return new_penalty_a, new_penalty_b
+
+def fix_record(record):
+    """Changes for one record, or None if its answers are valid"""
+    penalty_a = record.get('penalty_a', '')
+    penalty_b = record.get('penalty_b', '')
+    new_penalty_a, new_penalty_b = corrected_answers(penalty_a, penalty_b)
+    if (new_penalty_a, new_penalty_b) == (penalty_a, penalty_b):
+        return None
+    
+    if new_penalty_a != penalty_a:
+        print(f"Fixing record {record['id']}: penalty_a from '{penalty_a}' to '{new_penalty_a}'")
+    if new_penalty_b != penalty_b:
+        print(f"Fixing record {record['id']}: penalty_b from '{penalty_b}' to '{new_penalty_b}'")
+    
+    changes = {'penalty_a': new_penalty_a, 'penalty_b': new_penalty_b}
+    if record.get('plan_facts'):
+        # Explanations of these records are rendered from their facts on request
+        changes['penalty_a_explanation'] = record.get('penalty_a_explanation')
+        changes['penalty_b_explanation'] = record.get('penalty_b_explanation')
+    else:
+        # Older records keep stored explanations; regenerate them for the corrected answers
+        changes.update(render_explanations(record['group_name'], new_penalty_a, new_penalty_b, None))
+    return changes
+
+def fix_incorrect_answers(args):
     """Fix incorrect answers in the database"""
     try:
-        # Get all existing records
-        records = get_all_records()
-        print(f"Found {len(records)} records to check")
-        
-        if not records:
-            print("No records to check")
-            return
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        fixed_count = 0
-        
-        for record in records:
-            penalty_a = record.get('penalty_a', '')
-            penalty_b = record.get('penalty_b', '')
-            
-            # Check for incorrect answers
-            needs_fix = False
-            new_penalty_a = penalty_a
-            new_penalty_b = penalty_b
-            
-            # Fix "S" to "Yes" for Minimum Value Standards
-            if penalty_b == 'S':
-                print(f"Fixing record {record['id']}: penalty_b from 'S' to 'Yes'")
-                new_penalty_b = 'Yes'
-                needs_fix = True
-            
-            # Fix any other invalid answers
-            if penalty_a not in ['Yes', 'No']:
-                print(f"Fixing record {record['id']}: penalty_a from '{penalty_a}' to 'Unknown'")
-                new_penalty_a = 'Unknown'
-                needs_fix = True
-                
-            if penalty_b not in ['Yes', 'No'] and penalty_b != 'S':
-                print(f"Fixing record {record['id']}: penalty_b from '{penalty_b}' to 'Unknown'")
-                new_penalty_b = 'Unknown'
-                needs_fix = True
-            
-            if needs_fix:
-                # Generate new explanations based on corrected answers
-                explanations = generate_penalty_explanation(
-                    record['group_name'],
-                    new_penalty_a,
-                    new_penalty_b,
-                    f"Company: {record['group_name']}, Essential Coverage: {new_penalty_a}, Value Standards: {new_penalty_b}"
-                )
-                
-                # Update the record in the database
-                if hasattr(conn, 'execute'):  # SQLite
-                    cursor.execute('''
-                        UPDATE sbc_records 
-                        SET penalty_a = ?, penalty_b = ?, 
-                            penalty_a_explanation = ?, penalty_b_explanation = ?
-                        WHERE id = ?
-                    ''', (new_penalty_a, new_penalty_b, 
-                          explanations['penalty_a_explanation'], 
-                          explanations['penalty_b_explanation'], 
-                          record['id']))
-                else:  # PostgreSQL
-                    cursor.execute('''
-                        UPDATE sbc_records 
-                        SET penalty_a = %s, penalty_b = %s, 
-                            penalty_a_explanation = %s, penalty_b_explanation = %s
-                        WHERE id = %s
-                    ''', (new_penalty_a, new_penalty_b, 
-                          explanations['penalty_a_explanation'], 
-                          explanations['penalty_b_explanation'], 
-                          record['id']))
-                
-                fixed_count += 1
-            else:
-                print(f"Record {record['id']}: {record['group_name']} - No fixes needed")
-        
-        conn.commit()
-        conn.close()
-        
-        print(f"Successfully fixed {fixed_count} records")
+        processed, fixed = run_batched_update(
+            'fix_incorrect_answers',
+            args,
+            read_columns=('group_name', 'penalty_a', 'penalty_b', 'penalty_a_explanation',
+                          'penalty_b_explanation', 'plan_facts'),
+            write_columns=('penalty_a', 'penalty_b', 'penalty_a_explanation', 'penalty_b_explanation'),
+            transform=fix_record
+        )
+        action = 'Would fix' if args.dry_run else 'Successfully fixed'
+        print(f"{action} {fixed} of {processed} records")
         
     except Exception as e:
         print(f"Error fixing records: {e}")
-        if 'conn' in locals():
-            conn.close()
+        sys.exit(1)
 
 if __name__ == "__main__":
-    fix_incorrect_answers()
+    fix_incorrect_answers(batch_argument_parser(__doc__.strip().splitlines()[0]).parse_args())
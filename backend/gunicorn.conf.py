@@ -8,3 +8,17 @@ keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
 preload_app = True
+
+def pre_fork(server, worker):
+    """Close database connections the preloaded app opened in the master
+
+    Workers open their own pooled connections; a socket shared across fork
+    would mix the queries of several processes.
+    """
+    from database import close_db_pool
+    close_db_pool()
+
+def on_starting(server):
+    """Apply pending schema migrations once in the master, before any worker starts"""
+    from database import init_db
+    init_db()
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from async_db import create_job, claim_next_job, touch_job, finish_job
+from upload_service import SpooledUpload, process_pdf_upload
+
+load_dotenv()
+
+# Background job runners per API worker
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))
+# Seconds between polls of the jobs table when it is empty
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+# A running job whose heartbeat is older than this is assumed orphaned and retried
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '120'))
+# Attempts before a job that keeps getting orphaned is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+# Seconds before a job that hit an unexpected error is retried, doubled for every further attempt
+JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', '10'))
+# Where uploads wait for their job; must be shared by all API workers
+JOB_SPOOL_DIR = os.getenv('JOB_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'sbc_jobs'))
+
+_tasks = []
+
+async def enqueue_upload(filename: str, upload: SpooledUpload, backend=None) -> int:
+    """Store a spooled upload in the job spool directory and queue a job for it"""
+    os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    fd, job_file_path = tempfile.mkstemp(suffix='.pdf', dir=JOB_SPOOL_DIR)
+    os.close(fd)
+    upload.save_as(job_file_path)
+    return await create_job(filename, job_file_path, upload.content_hash, backend)
+
+async def _heartbeat(job_id: int):
+    """Keep a running job's heartbeat fresh so it is not reclaimed"""
+    while True:
+        await asyncio.sleep(JOB_STALE_SECONDS / 4)
+        try:
+            await touch_job(job_id)
+        except Exception as e:
+            print(f"Failed to update heartbeat for job {job_id}: {e}")
+
+async def _run_job(job: dict):
+    """Process one claimed job and record its outcome"""
+    job_id = job['id']
+    print(f"Job {job_id}: processing {job['filename']} (attempt {job['attempts']})")
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        with SpooledUpload.from_path(job['file_path'], job['content_hash']) as upload:
+            result = await process_pdf_upload(job['filename'], upload, backend=job['backend'], wait=True)
+        await finish_job(job_id, 'succeeded', record_id=result['data']['id'])
+        print(f"Job {job_id}: succeeded, record {result['data']['id']}")
+    except HTTPException as e:
+        await finish_job(job_id, 'failed', error=e.detail)
+        print(f"Job {job_id}: failed: {e.detail}")
+    except Exception as e:
+        # Unexpected errors (database, S3) are retried after a delay until attempts run out
+        status = 'queued' if job['attempts'] < JOB_MAX_ATTEMPTS else 'failed'
+        retry_at = _utc_after(JOB_RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1)) if status == 'queued' else None
+        await finish_job(job_id, status, error=str(e), retry_at=retry_at)
+        print(f"Job {job_id}: error, now {status}: {e}")
+        if status == 'queued':
+            return
+    finally:
+        heartbeat.cancel()
+
+    if os.path.exists(job['file_path']):
+        os.unlink(job['file_path'])
+
+def _utc_after(seconds: float) -> str:
+    return (datetime.utcnow() + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+async def _worker_loop(index: int):
+    """Claim and run jobs until cancelled"""
+    while True:
+        try:
+            job = await claim_next_job(_utc_after(-JOB_STALE_SECONDS), JOB_MAX_ATTEMPTS)
+        except Exception as e:
+            print(f"Job worker {index}: failed to claim a job: {e}")
+            job = None
+
+        if job is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        try:
+            if not os.path.exists(job['file_path']):
+                await finish_job(job['id'], 'failed', error='Uploaded file is no longer available')
+                continue
+            await _run_job(job)
+        except Exception as e:
+            # The job stays running until its heartbeat goes stale and it is claimed again
+            print(f"Job worker {index}: error handling job {job['id']}: {e}")
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+def start_job_workers():
+    """Start the background job runners for this API worker"""
+    loop = asyncio.get_running_loop()
+    for index in range(JOB_WORKERS):
+        _tasks.append(loop.create_task(_worker_loop(index)))
+    print(f"Started {JOB_WORKERS} job workers (pid {os.getpid()})")
+
+async def stop_job_workers():
+    """Cancel the background job runners; interrupted jobs are reclaimed once stale"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+from time import perf_counter
+from database import BULK_PAGE_SIZE, bulk_update_records, iter_record_batches
+
+def batch_argument_parser(description: str) -> argparse.ArgumentParser:
+    """Command line options shared by the batched maintenance scripts"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--batch-size', type=int, default=BULK_PAGE_SIZE,
+                        help=f"Records read and written per batch (default {BULK_PAGE_SIZE})")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Report what would change without writing anything")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default <script>.checkpoint.json)")
+    parser.add_argument('--restart', action='store_true',
+                        help="Ignore an existing checkpoint and start from the first record")
+    return parser
+
+class Checkpoint:
+    """Progress of an interrupted run: the last record id whose batch was committed"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last_id = 0
+        self.processed = 0
+        self.updated = 0
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        self.last_id = state['last_id']
+        self.processed = state.get('processed', 0)
+        self.updated = state.get('updated', 0)
+        return True
+
+    def save(self):
+        # Write then rename so a crash never leaves a truncated checkpoint
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as checkpoint_file:
+            json.dump({'last_id': self.last_id, 'processed': self.processed, 'updated': self.updated}, checkpoint_file)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+def run_batched_update(name: str, args, read_columns, write_columns, transform):
+    """Stream every record, apply ``transform`` and write the changes in batches
+
+    ``transform(record)`` returns a dict with a value for each of
+    ``write_columns``, or None when the record needs no change. Each batch is
+    committed before the checkpoint moves past it, so an interrupted run
+    resumes after the last committed batch. Returns (processed, updated).
+    """
+    checkpoint = Checkpoint(args.checkpoint or f"{name}.checkpoint.json")
+    if args.restart:
+        checkpoint.clear()
+    elif checkpoint.load():
+        print(f"Resuming after record {checkpoint.last_id} "
+              f"({checkpoint.processed} checked, {checkpoint.updated} updated so far)")
+
+    started = perf_counter()
+    for batch in iter_record_batches(read_columns, args.batch_size, checkpoint.last_id):
+        updates = []
+        for record in batch:
+            changes = transform(record)
+            if changes is not None:
+                updates.append({'id': record['id'], **changes})
+
+        if updates and not args.dry_run:
+            bulk_update_records(updates, write_columns, page_size=args.batch_size)
+
+        checkpoint.last_id = batch[-1]['id']
+        checkpoint.processed += len(batch)
+        checkpoint.updated += len(updates)
+        if not args.dry_run:
+            checkpoint.save()
+        print(f"Checked {checkpoint.processed} records, "
+              f"{'would update' if args.dry_run else 'updated'} {checkpoint.updated} "
+              f"(last id {checkpoint.last_id}, {perf_counter() - started:.1f}s)")
+
+    if not args.dry_run:
+        checkpoint.clear()
+    return checkpoint.processed, checkpoint.updated
@@ -0,0 +1,91 @@
+import os
+import resource
+import sys
+import tracemalloc
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Largest RSS growth allowed while parsing one document (0 disables the check)
+DOCUMENT_MEMORY_BUDGET_BYTES = int(float(os.getenv('SBC_DOCUMENT_MEMORY_MB', '256')) * 1024 * 1024)
+# Also trace Python allocations per document; slows parsing down noticeably
+TRACEMALLOC_ENABLED = os.getenv('SBC_TRACEMALLOC', 'false').lower() in ('1', 'true', 'yes')
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+class DocumentMemoryExceeded(Exception):
+    """Raised when parsing a document grows memory past its budget"""
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or its peak where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size this process has reached"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _mb(value: int) -> float:
+    return round(value / (1024 * 1024), 1)
+
+class MemoryGuard:
+    """Track memory while one document is parsed and enforce its budget
+
+    ``check`` is called after every page; it samples RSS and raises
+    DocumentMemoryExceeded once the growth since ``start`` is over budget.
+    """
+
+    def __init__(self, budget: int = DOCUMENT_MEMORY_BUDGET_BYTES, trace: bool = TRACEMALLOC_ENABLED):
+        self.budget = budget
+        self.trace = trace
+        self.started_tracing = False
+        self.rss_start = 0
+        self.rss_peak = 0
+        self.tracemalloc_peak = None
+        self.pages = 0
+
+    def start(self) -> 'MemoryGuard':
+        self.rss_start = self.rss_peak = current_rss_bytes()
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+        return self
+
+    def check(self):
+        """Sample memory after a page and abort if the budget is exceeded"""
+        self.pages += 1
+        rss = current_rss_bytes()
+        self.rss_peak = max(self.rss_peak, rss)
+        if self.budget and rss - self.rss_start > self.budget:
+            raise DocumentMemoryExceeded(
+                f"Document exceeded the {_mb(self.budget):g}MB memory budget after {self.pages} pages"
+            )
+
+    def stop(self):
+        if self.trace and tracemalloc.is_tracing():
+            self.tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+            if self.started_tracing:
+                tracemalloc.stop()
+
+    def report(self) -> dict:
+        """Memory figures for the document, in MB"""
+        return {
+            'rss_start_mb': _mb(self.rss_start),
+            'rss_peak_mb': _mb(self.rss_peak),
+            'rss_growth_mb': _mb(self.rss_peak - self.rss_start),
+            'process_peak_rss_mb': _mb(peak_rss_bytes()),
+            'tracemalloc_peak_mb': _mb(self.tracemalloc_peak) if self.tracemalloc_peak is not None else None
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
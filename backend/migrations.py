@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the SBC database.
+
+Each migration runs once, in its own transaction, and is recorded in the
+schema_version table. A database that is already up to date costs a single
+query at startup. Run this file to apply pending migrations or, with
+--status, to list them.
+"""
+
+import argparse
+import string
+from datetime import datetime
+
+# Advisory lock key serializing migration runs of concurrently starting instances
+MIGRATION_LOCK_ID = 4_276_193_001
+
+def _add_missing_columns(cursor, postgres, table, columns):
+    """Add columns that tables created by older versions of init_db lack"""
+    if postgres:
+        for name, definition in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {definition}')
+        return
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, definition in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+def _create_tables(cursor, postgres):
+    """Tables as of the first versioned schema, including columns added by earlier ALTERs"""
+    if postgres:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sbc_records (
+                id SERIAL PRIMARY KEY,
+                group_name VARCHAR(255) NOT NULL,
+                upload_date VARCHAR(10) NOT NULL,
+                penalty_a VARCHAR(10) NOT NULL,
+                penalty_b VARCHAR(10) NOT NULL,
+                filename VARCHAR(255) NOT NULL,
+                s3_url TEXT,
+                penalty_a_explanation TEXT,
+                penalty_b_explanation TEXT,
+                content_hash VARCHAR(64),
+                plan_facts JSONB,
+                extractor_version INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        _add_missing_columns(cursor, postgres, 'sbc_records', [
+            ('penalty_a_explanation', 'TEXT'),
+            ('penalty_b_explanation', 'TEXT'),
+            ('content_hash', 'VARCHAR(64)'),
+            ('plan_facts', 'JSONB'),
+            ('extractor_version', 'INTEGER'),
+        ])
+
+        # Background extraction jobs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS extraction_jobs (
+                id SERIAL PRIMARY KEY,
+                status VARCHAR(10) NOT NULL DEFAULT 'queued',
+                filename VARCHAR(255) NOT NULL,
+                file_path TEXT NOT NULL,
+                content_hash VARCHAR(64) NOT NULL,
+                backend VARCHAR(20),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                record_id INTEGER,
+                created_at TIMESTAMP NOT NULL,
+                started_at TIMESTAMP,
+                heartbeat_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+
+        # Cumulative extraction rule usage
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rule_stats (
+                rule_key VARCHAR(100) PRIMARY KEY,
+                evaluated BIGINT NOT NULL DEFAULT 0,
+                matched BIGINT NOT NULL DEFAULT 0,
+                time_ns BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP
+            )
+        ''')
+    else:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sbc_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                group_name TEXT NOT NULL,
+                upload_date TEXT NOT NULL,
+                penalty_a TEXT NOT NULL,
+                penalty_b TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                s3_url TEXT,
+                penalty_a_explanation TEXT,
+                penalty_b_explanation TEXT,
+                content_hash TEXT,
+                plan_facts TEXT,
+                extractor_version INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        _add_missing_columns(cursor, postgres, 'sbc_records', [
+            ('penalty_a_explanation', 'TEXT'),
+            ('penalty_b_explanation', 'TEXT'),
+            ('content_hash', 'TEXT'),
+            ('plan_facts', 'TEXT'),
+            ('extractor_version', 'INTEGER'),
+        ])
+
+        # Background extraction jobs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS extraction_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                backend TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                record_id INTEGER,
+                created_at TIMESTAMP NOT NULL,
+                started_at TIMESTAMP,
+                heartbeat_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+
+        # Cumulative extraction rule usage
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rule_stats (
+                rule_key TEXT PRIMARY KEY,
+                evaluated INTEGER NOT NULL DEFAULT 0,
+                matched INTEGER NOT NULL DEFAULT 0,
+                time_ns INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP
+            )
+        ''')
+
+def _create_indexes(cursor, postgres):
+    """Indexes for duplicate detection, the job queue and the record listing filters"""
+    for statement in (
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_sbc_records_content_hash ON sbc_records (content_hash)',
+        'CREATE INDEX IF NOT EXISTS idx_extraction_jobs_status ON extraction_jobs (status, id)',
+        # Keyset pagination, alone and combined with the penalty filters
+        'CREATE INDEX IF NOT EXISTS idx_sbc_records_created_at ON sbc_records (created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_sbc_records_penalty_a ON sbc_records (penalty_a, created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_sbc_records_penalty_b ON sbc_records (penalty_b, created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_sbc_records_group_name ON sbc_records (group_name)',
+        'CREATE INDEX IF NOT EXISTS idx_sbc_records_upload_date ON sbc_records (upload_date)',
+    ):
+        cursor.execute(statement)
+
+def _upload_date_as_date(cursor, postgres):
+    """Store upload_date as DATE instead of VARCHAR(10)
+
+    SQLite has no date type; ISO dates stored as text already sort and
+    compare correctly there, so only PostgreSQL changes.
+    """
+    if postgres:
+        cursor.execute('ALTER TABLE sbc_records ALTER COLUMN upload_date TYPE DATE USING upload_date::date')
+
+def _padded_names_sql(row):
+    """SQLite expression of a row's group and file name with each word padded as pg_trgm pads it"""
+    names = f"{row}.group_name || ' ' || coalesce({row}.filename, '')"
+    for separator in ('_', '-', '.'):
+        names = f"replace({names}, '{separator}', ' ')"
+    return f"'  ' || replace({names}, ' ', '   ') || ' '"
+
+def _plan_facts_text_sql(row):
+    """SQLite expression of the values of a row's plan facts, without the JSON keys"""
+    return f"(SELECT group_concat(value, ' ') FROM json_each({row}.plan_facts))"
+
+def _index_row_sql(row, delete=False, padded_names_sql=_padded_names_sql):
+    """Trigger statements adding a row to the SQLite search tables, or removing it
+
+    Contentless tables do not keep the text, so a delete repeats the indexed values.
+    """
+    plan_facts = _plan_facts_text_sql(row)
+    names = padded_names_sql(row)
+    if delete:
+        return f'''
+            INSERT INTO sbc_records_fts (sbc_records_fts, rowid, group_name, filename, plan_facts)
+            VALUES ('delete', {row}.id, {row}.group_name, {row}.filename, {plan_facts});
+            INSERT INTO sbc_records_trigrams (sbc_records_trigrams, rowid, names)
+            VALUES ('delete', {row}.id, {names});
+        '''
+    return f'''
+            INSERT INTO sbc_records_fts (rowid, group_name, filename, plan_facts)
+            VALUES ({row}.id, {row}.group_name, {row}.filename, {plan_facts});
+            INSERT INTO sbc_records_trigrams (rowid, names) VALUES ({row}.id, {names});
+    '''
+
+def _search_indexes(cursor, postgres):
+    """Full-text, prefix and fuzzy search over names and plan facts
+
+    PostgreSQL keeps a generated tsvector column (names weighted above plan
+    facts) with a GIN index, plus trigram indexes on the names. SQLite keeps
+    two contentless FTS5 tables, one by word and one by trigram, which
+    triggers update on every insert, update and delete.
+    """
+    if postgres:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute('''
+            ALTER TABLE sbc_records ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', group_name), 'A') ||
+                setweight(to_tsvector('simple', regexp_replace(filename, '[^[:alnum:]]+', ' ', 'g')), 'B') ||
+                setweight(jsonb_to_tsvector('simple', coalesce(plan_facts, '{}'), '["string", "numeric"]'), 'C')
+            ) STORED
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sbc_records_search ON sbc_records USING GIN (search_vector)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sbc_records_group_name_trgm ON sbc_records USING GIN (group_name gin_trgm_ops)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sbc_records_filename_trgm ON sbc_records USING GIN (filename gin_trgm_ops)')
+        return
+
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS sbc_records_fts USING fts5(
+            group_name, filename, plan_facts,
+            content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS sbc_records_trigrams USING fts5(
+            names, content='', tokenize='trigram'
+        )
+    ''')
+    # Rows per trigram, to search fuzzy matches through the rarest ones
+    cursor.execute('CREATE VIRTUAL TABLE IF NOT EXISTS sbc_records_trigram_terms USING fts5vocab(sbc_records_trigrams, row)')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS sbc_records_search_insert AFTER INSERT ON sbc_records BEGIN
+            {_index_row_sql('new')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS sbc_records_search_delete AFTER DELETE ON sbc_records BEGIN
+            {_index_row_sql('old', delete=True)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS sbc_records_search_update
+        AFTER UPDATE OF group_name, filename, plan_facts ON sbc_records BEGIN
+            {_index_row_sql('old', delete=True)}
+            {_index_row_sql('new')}
+        END
+    ''')
+
+    # Index the existing records
+    cursor.execute(f'''
+        INSERT INTO sbc_records_fts (rowid, group_name, filename, plan_facts)
+        SELECT r.id, r.group_name, r.filename, {_plan_facts_text_sql('r')} FROM sbc_records AS r
+    ''')
+    cursor.execute(f'''
+        INSERT INTO sbc_records_trigrams (rowid, names)
+        SELECT r.id, {_padded_names_sql('r')} FROM sbc_records AS r
+    ''')
+
+# Characters names are split into words at, besides spaces: search queries
+# split at every character that is not a letter or digit (search._words).
+# SQLite has no regular expressions, so these are replaced one by one: ASCII
+# punctuation and whitespace, and the typographic punctuation found in names.
+NAME_SEPARATORS = string.punctuation + '\t\n\r\u00a0\u2018\u2019\u201c\u201d\u2013\u2014\u00ae\u2122\u00a9\u2022\u00b7'
+
+def _word_padded_names_sql(row):
+    """_padded_names_sql splitting names at every character of NAME_SEPARATORS
+
+    The replace() calls are nested in subqueries of 12, as the SQLite parser
+    does not take more than about 30 nested calls.
+    """
+    names = f"{row}.group_name || ' ' || coalesce({row}.filename, '')"
+    for start in range(0, len(NAME_SEPARATORS), 12):
+        replaced = 'names'
+        for separator in NAME_SEPARATORS[start:start + 12]:
+            quoted = separator.replace("'", "''")
+            replaced = f"replace({replaced}, '{quoted}', ' ')"
+        names = f"(SELECT {replaced} FROM (SELECT {names} AS names))"
+    return f"'  ' || replace({names}, ' ', '   ') || ' '"
+
+def _search_word_splitting(cursor, postgres):
+    """Split names into words at punctuation, as search queries are split
+
+    Names were only split at spaces, '_', '-' and '.' in the SQLite trigram
+    index and not at all in the PostgreSQL tsvector, so names such as
+    "Plan (XYZ) Trust" could not be found by their words. The triggers use
+    plain SQL, so any connection can write to sbc_records.
+    """
+    if postgres:
+        cursor.execute('DROP INDEX IF EXISTS idx_sbc_records_search')
+        cursor.execute('ALTER TABLE sbc_records DROP COLUMN IF EXISTS search_vector')
+        cursor.execute('''
+            ALTER TABLE sbc_records ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', regexp_replace(group_name, '[^[:alnum:]]+', ' ', 'g')), 'A') ||
+                setweight(to_tsvector('simple', regexp_replace(filename, '[^[:alnum:]]+', ' ', 'g')), 'B') ||
+                setweight(jsonb_to_tsvector('simple', coalesce(plan_facts, '{}'), '["string", "numeric"]'), 'C')
+            ) STORED
+        ''')
+        cursor.execute('CREATE INDEX idx_sbc_records_search ON sbc_records USING GIN (search_vector)')
+        return
+
+    cursor.execute('DROP TRIGGER sbc_records_search_insert')
+    cursor.execute('DROP TRIGGER sbc_records_search_delete')
+    cursor.execute('DROP TRIGGER sbc_records_search_update')
+    cursor.execute(f'''
+        CREATE TRIGGER sbc_records_search_insert AFTER INSERT ON sbc_records BEGIN
+            {_index_row_sql('new', padded_names_sql=_word_padded_names_sql)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER sbc_records_search_delete AFTER DELETE ON sbc_records BEGIN
+            {_index_row_sql('old', delete=True, padded_names_sql=_word_padded_names_sql)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER sbc_records_search_update
+        AFTER UPDATE OF group_name, filename, plan_facts ON sbc_records BEGIN
+            {_index_row_sql('old', delete=True, padded_names_sql=_word_padded_names_sql)}
+            {_index_row_sql('new', padded_names_sql=_word_padded_names_sql)}
+        END
+    ''')
+
+    # Reindex the existing records
+    cursor.execute("INSERT INTO sbc_records_trigrams (sbc_records_trigrams) VALUES ('delete-all')")
+    cursor.execute(f'''
+        INSERT INTO sbc_records_trigrams (rowid, names)
+        SELECT r.id, {_word_padded_names_sql('r')} FROM sbc_records AS r
+    ''')
+
+def _count_stats_sql(row, change):
+    """SQLite trigger statements adding ``change`` to the record_stats count of a row"""
+    plan_type = f"coalesce(json_extract({row}.plan_facts, '$.plan_type'), '')"
+    return f'''
+        INSERT OR IGNORE INTO record_stats (upload_date, plan_type, penalty_a, penalty_b, records)
+        VALUES ({row}.upload_date, {plan_type}, {row}.penalty_a, {row}.penalty_b, 0);
+        UPDATE record_stats SET records = records {change}
+        WHERE upload_date = {row}.upload_date AND plan_type = {plan_type}
+            AND penalty_a = {row}.penalty_a AND penalty_b = {row}.penalty_b;
+    '''
+
+def _record_stats(cursor, postgres):
+    """Record counts per upload date, plan type and answers, kept current by triggers
+
+    The triggers fire for every write, including the bulk helpers used by
+    the maintenance scripts and the backfill. Records without a plan type
+    are counted under ''.
+    """
+    if postgres:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS record_stats (
+                upload_date DATE NOT NULL,
+                plan_type VARCHAR(100) NOT NULL,
+                penalty_a VARCHAR(10) NOT NULL,
+                penalty_b VARCHAR(10) NOT NULL,
+                records INTEGER NOT NULL,
+                PRIMARY KEY (upload_date, plan_type, penalty_a, penalty_b)
+            )
+        ''')
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION sbc_records_count_stats() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    UPDATE record_stats SET records = records - 1
+                    WHERE upload_date = OLD.upload_date
+                        AND plan_type = coalesce(OLD.plan_facts->>'plan_type', '')
+                        AND penalty_a = OLD.penalty_a AND penalty_b = OLD.penalty_b;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'INSERT') THEN
+                    INSERT INTO record_stats (upload_date, plan_type, penalty_a, penalty_b, records)
+                    VALUES (NEW.upload_date, coalesce(NEW.plan_facts->>'plan_type', ''), NEW.penalty_a, NEW.penalty_b, 1)
+                    ON CONFLICT (upload_date, plan_type, penalty_a, penalty_b)
+                    DO UPDATE SET records = record_stats.records + 1;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS sbc_records_stats ON sbc_records')
+        cursor.execute('''
+            CREATE TRIGGER sbc_records_stats
+            AFTER INSERT OR DELETE OR UPDATE OF upload_date, penalty_a, penalty_b, plan_facts ON sbc_records
+            FOR EACH ROW EXECUTE FUNCTION sbc_records_count_stats()
+        ''')
+        plan_type = "coalesce(plan_facts->>'plan_type', '')"
+    else:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS record_stats (
+                upload_date TEXT NOT NULL,
+                plan_type TEXT NOT NULL,
+                penalty_a TEXT NOT NULL,
+                penalty_b TEXT NOT NULL,
+                records INTEGER NOT NULL,
+                PRIMARY KEY (upload_date, plan_type, penalty_a, penalty_b)
+            )
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS sbc_records_stats_insert AFTER INSERT ON sbc_records BEGIN
+                {_count_stats_sql('new', '+ 1')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS sbc_records_stats_delete AFTER DELETE ON sbc_records BEGIN
+                {_count_stats_sql('old', '- 1')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS sbc_records_stats_update
+            AFTER UPDATE OF upload_date, penalty_a, penalty_b, plan_facts ON sbc_records BEGIN
+                {_count_stats_sql('old', '- 1')}
+                {_count_stats_sql('new', '+ 1')}
+            END
+        ''')
+        plan_type = "coalesce(json_extract(plan_facts, '$.plan_type'), '')"
+
+    # Count the existing records
+    cursor.execute('DELETE FROM record_stats')
+    cursor.execute(f'''
+        INSERT INTO record_stats (upload_date, plan_type, penalty_a, penalty_b, records)
+        SELECT upload_date, {plan_type}, penalty_a, penalty_b, COUNT(*)
+        FROM sbc_records
+        GROUP BY upload_date, {plan_type}, penalty_a, penalty_b
+    ''')
+
+def _s3_outbox(cursor, postgres):
+    """Queue of record PDFs waiting to be uploaded to S3
+
+    Entries are written in the transaction that inserts their record and
+    removed once the upload has set the record's s3_url.
+    """
+    if postgres:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS s3_outbox (
+                id SERIAL PRIMARY KEY,
+                record_id INTEGER NOT NULL,
+                status VARCHAR(10) NOT NULL DEFAULT 'pending',
+                filename VARCHAR(255) NOT NULL,
+                file_path TEXT NOT NULL,
+                content_hash VARCHAR(64) NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP NOT NULL,
+                next_attempt_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP
+            )
+        ''')
+    else:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS s3_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                record_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP NOT NULL,
+                next_attempt_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP
+            )
+        ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_s3_outbox_status ON s3_outbox (status, next_attempt_at)')
+
+def _job_retry_at(cursor, postgres):
+    """When a requeued job may run again, so failed jobs back off before retrying"""
+    cursor.execute('ALTER TABLE extraction_jobs ADD COLUMN retry_at TIMESTAMP')
+
+def _records_version(cursor, postgres):
+    """Version of sbc_records for ETags, bumped by triggers on every write
+
+    The version is the time of the last change in nanoseconds, and always
+    grows even if the clock goes back.
+    """
+    if postgres:
+        now_ns = "(extract(epoch FROM clock_timestamp()) * 1000000000)::bigint"
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS records_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE OR REPLACE FUNCTION sbc_records_bump_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE records_version SET version = GREATEST({now_ns}, version + 1);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS sbc_records_version ON sbc_records')
+        cursor.execute('''
+            CREATE TRIGGER sbc_records_version
+            AFTER INSERT OR UPDATE OR DELETE ON sbc_records
+            FOR EACH STATEMENT EXECUTE FUNCTION sbc_records_bump_version()
+        ''')
+    else:
+        now_ns = "CAST((julianday('now') - 2440587.5) * 86400000000000 AS INTEGER)"
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS records_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        # SQLite only has row triggers
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS sbc_records_version_{event.lower()}
+                AFTER {event} ON sbc_records BEGIN
+                    UPDATE records_version SET version = max({now_ns}, version + 1);
+                END
+            ''')
+    cursor.execute(f'INSERT INTO records_version (id, version) VALUES (1, {now_ns}) ON CONFLICT (id) DO NOTHING')
+
+# (version, description, function(cursor, postgres)) in the order they are applied.
+# Never edit an applied migration; add a new one instead.
+MIGRATIONS = [
+    (1, 'Create tables', _create_tables),
+    (2, 'Create indexes for duplicates, jobs and record listings', _create_indexes),
+    (3, 'Store upload_date as a date', _upload_date_as_date),
+    (4, 'Create search indexes', _search_indexes),
+    (5, 'Count records per upload date, plan type and answers', _record_stats),
+    (6, 'Create the S3 upload outbox', _s3_outbox),
+    (7, 'Delay retries of failed jobs', _job_retry_at),
+    (8, 'Version sbc_records in the database', _records_version),
+    (9, 'Split names into words like search queries', _search_word_splitting),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _current_version(cursor):
+    cursor.execute('SELECT MAX(version) FROM schema_version')
+    return cursor.fetchone()[0] or 0
+
+def migrate(conn, postgres: bool) -> list:
+    """Apply pending migrations and return the versions applied
+
+    The up-to-date check is a single query. Otherwise the runner takes a
+    lock (an advisory lock on PostgreSQL, a write lock on SQLite) so that
+    instances starting at the same time apply each migration once.
+    """
+    cursor = conn.cursor()
+    try:
+        if _current_version(cursor) >= LATEST_VERSION:
+            conn.rollback()
+            return []
+    except Exception:
+        # No schema_version table yet
+        conn.rollback()
+
+    if postgres:
+        cursor.execute('SELECT pg_advisory_lock(%s)', (MIGRATION_LOCK_ID,))
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL
+            )
+        ''')
+        conn.commit()
+
+        applied = []
+        ph = '%s' if postgres else '?'
+        for version, description, apply in MIGRATIONS:
+            if not postgres:
+                # Hold the write lock from the version check to the commit
+                cursor.execute('BEGIN IMMEDIATE')
+            if version <= _current_version(cursor):
+                conn.rollback()
+                continue
+            try:
+                print(f"Applying migration {version}: {description}")
+                apply(cursor, postgres)
+                cursor.execute(f'INSERT INTO schema_version (version, description, applied_at) VALUES ({ph}, {ph}, {ph})',
+                               (version, description, datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+        return applied
+    finally:
+        if postgres:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_ID,))
+            conn.commit()
+
+def migration_status(conn) -> list:
+    """Every known migration with the time it was applied, or None if pending"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT version, applied_at FROM schema_version')
+        applied = dict(cursor.fetchall())
+    except Exception:
+        conn.rollback()
+        applied = {}
+    return [
+        {'version': version, 'description': description, 'applied_at': applied.get(version)}
+        for version, description, _ in MIGRATIONS
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending database migrations")
+    parser.add_argument('--status', action='store_true', help="List migrations instead of applying them")
+    args = parser.parse_args()
+
+    from database import get_db_connection, init_db
+
+    if not args.status and not init_db():
+        print("Schema is up to date")
+    conn = get_db_connection()
+    try:
+        for migration in migration_status(conn):
+            state = migration['applied_at'] or 'pending'
+            print(f"{migration['version']:>4}  {state!s:<26}  {migration['description']}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
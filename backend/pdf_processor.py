@@ -1,28 +1,50 @@
-import pdfplumber
+import os
 import re
+from time import perf_counter_ns
 from typing import Tuple, Optional
+from document_context import SECTION_ENDS, DocumentContext
+from explanations import EMPLOYER_PENALTY, format_deductible, render_explanations
+from memory_guard import DocumentMemoryExceeded, MemoryGuard
+from rules import RULES, RULE_STATS_ENABLED
+from text_backends import DEFAULT_TEXT_BACKEND, TEXT_BACKENDS, open_document
 
-def extract_company_name(text: str) -> Optional[str]:
+# Version of the extraction results. Bump it whenever a change here or in the
+# rules can change the answers or facts of documents already stored, then run
+# backfill.py to re-extract the records of older versions.
+EXTRACTOR_VERSION = 2
+
+# How process_sbc_pdf reads the document: 'targeted' looks for the coverage
+# questions on the last pages first, 'stream' reads pages in order until
+# everything is found, 'full' always reads every page
+EXTRACTION_MODES = ('targeted', 'stream', 'full')
+DEFAULT_EXTRACTION_MODE = os.getenv('SBC_EXTRACTION_MODE', 'targeted')
+
+# Number of trailing pages searched for the coverage questions in targeted mode
+TARGETED_PAGE_LIMIT = int(os.getenv('SBC_TARGETED_PAGE_LIMIT', '4'))
+
+# Vertical margin (in PDF points) kept around the coverage question labels
+TARGETED_REGION_PADDING = 36
+
+# Characters of the text already read that are scanned again with each new
+# page, so matches that cross a page break are found; longer than any rule match
+PAGE_SCAN_OVERLAP = 2000
+
+# Labels of the coverage questions on the standard SBC template
+COVERAGE_QUESTION_LABELS = [
+    r'Minimum\s+Essential\s+Coverage',
+    r'Minimum\s+Value\s+Standards',
+]
+
+def extract_company_name(document) -> Optional[str]:
     """Extract company name from the first page of SBC document"""
     # Look for company name patterns in the beginning of the document
-    lines = text.split('\n')[:30]  # Check first 30 lines
-    
-    # Common patterns for company names in SBC documents
-    patterns = [
-        r'([A-Za-z\s]+(?:Company|Corp|Corporation|Inc|LLC|Group))\s+Employee\s+Benefits',
-        r'([A-Za-z\s]+)\s+Employee\s+Benefits\s+Plan',
-        r'^([A-Za-z\s]+(?:Company|Corp|Corporation|Inc|LLC))',
-        r'([A-Za-z\s]+(?:Delivery|Service|Solutions|Systems))\s+Company',
-        r'([A-Za-z\s]+)\s+Benefits\s+Plan',
-        r'([A-Za-z\s]+Delivery\s+Company)',  # Specific pattern for Fasttrack Delivery Company
-        r'([A-Za-z\s]+)\s+Employee\s+Benefits\s+Plan:\s+Plan\s+\d+',  # Pattern with plan number
-    ]
+    lines = DocumentContext.of(document).page_lines(0)[:30]  # Check first 30 lines
     
     for line in lines:
         line = line.strip()
         if len(line) > 5:  # Skip very short lines
-            for pattern in patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
+            for rule in RULES.group('company_name'):
+                match = rule.search(line)
                 if match:
                     company_name = match.group(1).strip()
                     # Clean up the company name
@@ -35,7 +57,7 @@ def extract_company_name(text: str) -> Optional[str]:
         line = line.strip()
         if 'Company' in line and len(line) > 10:
             # Extract the part before "Company"
-            company_match = re.search(r'([A-Za-z\s]+)\s+Company', line, re.IGNORECASE)
+            company_match = RULES.group('company_fallback')[0].search(line)
             if company_match:
                 return company_match.group(1).strip() + ' Company'
     
@@ -47,76 +69,46 @@ def extract_company_name(text: str) -> Optional[str]:
     
     return "Unknown Company"
 
-def extract_plan_type(text: str) -> str:
-    """Extract plan type from SBC text"""
-    text_lower = text.lower()
-    if 'indemnity' in text_lower:
-        return 'Indemnity Plan'
-    elif 'hmo' in text_lower:
-        return 'HMO Plan'
-    elif 'ppo' in text_lower:
-        return 'PPO Plan'
-    elif 'pos' in text_lower:
-        return 'POS Plan'
-    elif 'hdhp' in text_lower or 'high deductible' in text_lower:
-        return 'High Deductible Health Plan'
+def extract_plan_type(document) -> str:
+    """Extract plan type from SBC text, preferring the one named in the header"""
+    context = DocumentContext.of(document)
+    for section in ('header', None):
+        for rule in RULES.group('plan_type'):
+            if context.search(rule, section, whole_text=False):
+                return rule.value
     return 'Health Plan'
 
-def extract_deductible_info(text: str) -> dict:
+def extract_deductible_info(document) -> dict:
     """Extract comprehensive deductible information"""
+    context = DocumentContext.of(document)
     deductible_info = {
         'individual': 'Not specified',
         'family': 'Not specified',
         'formatted': 'structured deductible'
     }
     
-    # Pattern for individual deductible
-    individual_patterns = [
-        r'\$([0-9,]+)\s+individual.*?deductible',
-        r'deductible.*?\$([0-9,]+)\s+individual',
-        r'\$([0-9,]+)\s+individual'
-    ]
-    
-    # Pattern for family deductible  
-    family_patterns = [
-        r'\$([0-9,]+)\s+family.*?deductible',
-        r'deductible.*?\$([0-9,]+)\s+family',
-        r'\$([0-9,]+)\s+family'
-    ]
-    
-    for pattern in individual_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for rule in RULES.group('deductible_individual'):
+        match = context.search(rule, 'important_questions')
         if match:
             deductible_info['individual'] = f"${match.group(1)}"
             break
     
-    for pattern in family_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for rule in RULES.group('deductible_family'):
+        match = context.search(rule, 'important_questions')
         if match:
             deductible_info['family'] = f"${match.group(1)}"
             break
     
     # Create formatted string
-    if deductible_info['individual'] != 'Not specified' or deductible_info['family'] != 'Not specified':
-        if deductible_info['individual'] != 'Not specified' and deductible_info['family'] != 'Not specified':
-            deductible_info['formatted'] = f"{deductible_info['individual']} individual / {deductible_info['family']} family deductible"
-        elif deductible_info['individual'] != 'Not specified':
-            deductible_info['formatted'] = f"{deductible_info['individual']} individual deductible"
-        elif deductible_info['family'] != 'Not specified':
-            deductible_info['formatted'] = f"{deductible_info['family']} family deductible"
+    deductible_info['formatted'] = format_deductible(deductible_info['individual'], deductible_info['family'])
     
     return deductible_info
 
-def extract_coverage_period(text: str) -> str:
+def extract_coverage_period(document) -> str:
     """Extract coverage period from SBC"""
-    period_patterns = [
-        r'Coverage Period:\s*([0-9/\-\s]+)',
-        r'Plan Year:\s*([0-9/\-\s]+)',
-        r'Coverage for:\s*([0-9/\-\s]+)'
-    ]
-    
-    for pattern in period_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    context = DocumentContext.of(document)
+    for rule in RULES.group('coverage_period'):
+        match = context.search(rule, 'header')
         if match:
             period = match.group(1).strip()
             if len(period) > 5:
@@ -124,16 +116,11 @@ def extract_coverage_period(text: str) -> str:
     
     return 'annual coverage period'
 
-def extract_out_of_pocket_limit(text: str) -> str:
+def extract_out_of_pocket_limit(document) -> str:
     """Extract out-of-pocket limit information"""
-    oop_patterns = [
-        r'out-of-pocket.?$([0-9,]+)\s+individual.?$([0-9,]+)\s+family',
-        r'$([0-9,]+)\s+individual.?$([0-9,]+)\s+family.?out-of-pocket',
-        r'out-of-pocket.*?$([0-9,]+)'
-    ]
-    
-    for pattern in oop_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    context = DocumentContext.of(document)
+    for rule in RULES.group('out_of_pocket'):
+        match = context.search(rule, 'important_questions')
         if match:
             if len(match.groups()) >= 2:
                 return f"${match.group(1)} individual / ${match.group(2)} family"
@@ -142,228 +129,440 @@ def extract_out_of_pocket_limit(text: str) -> str:
     
     return "specified limits"
 
-def generate_penalty_explanation(company_name: str, essential_coverage: str, value_standards: str, full_text: str) -> dict:
+def extract_plan_facts(document) -> dict:
+    """Extract the plan facts the penalty explanations are rendered from
+
+    ``document`` is a DocumentContext or plain text.
+    """
+    context = DocumentContext.of(document)
+    deductible_info = extract_deductible_info(context)
+    return {
+        'plan_type': extract_plan_type(context),
+        'deductible_individual': deductible_info['individual'],
+        'deductible_family': deductible_info['family'],
+        'coverage_period': extract_coverage_period(context),
+        'oop_limit': extract_out_of_pocket_limit(context),
+        'employer_penalty': EMPLOYER_PENALTY
+    }
+
+def generate_penalty_explanation(company_name: str, essential_coverage: str, value_standards: str, full_text) -> dict:
     """Generate intelligent, contextual explanations for penalty compliance"""
+    return render_explanations(company_name, essential_coverage, value_standards, extract_plan_facts(full_text))
+
+# Coverage question rules in priority order (see rules.RULE_DEFINITIONS)
+COVERAGE_RULES = {
+    # Question 1: Minimum Essential Coverage
+    'essential_coverage': RULES.group('essential_coverage'),
+    # Question 2: Minimum Value Standards
+    'value_standards': RULES.group('value_standards'),
+}
+
+def _alternation(rules):
+    """Compile prioritized rules into one alternation, or None if there are none"""
+    if not rules:
+        return None
+    return re.compile('|'.join(f'({rule.pattern.pattern})' for _, _, rule in rules), re.IGNORECASE | re.DOTALL)
+
+def _build_anchor_index(rules_by_question):
+    """Group rules by their leading word into prioritized alternations
+
+    Within a word the alternatives are ordered by priority, so a single match
+    call returns the best rule that matches at that position. Rules of the two
+    questions never match at the same position, so they can share an
+    alternation. Rules that scan a span of text after the label are kept in a
+    separate, deferred alternation; they rank below every exact label rule.
     
-    # Extract contextual information from the SBC
-    plan_type = extract_plan_type(full_text)
-    deductible_info = extract_deductible_info(full_text)
-    coverage_period = extract_coverage_period(full_text)
-    oop_limit = extract_out_of_pocket_limit(full_text)
+    A rule that does not start with two words joined by ``\\s+`` has no anchor;
+    it is returned separately and searched for everywhere.
+    """
+    grouped = {}
+    unanchored = []
+    for question, rules in rules_by_question.items():
+        for priority, rule in enumerate(rules):
+            leading = re.match(r'([A-Za-z]+)\\s\+([A-Za-z]+)', rule.pattern.pattern)
+            if leading is None:
+                unanchored.append((priority, question, rule))
+                continue
+            word, next_word = leading.group(1).lower(), leading.group(2).lower()
+            entry = grouped.setdefault(word, {'next_words': set(), 'rules': []})
+            entry['next_words'].add(next_word)
+            entry['rules'].append((priority, question, rule))
     
-    # Current year penalty amounts (2024-2025)
-    current_employer_penalty = "$4,320"  # 2024 4980H penalty amount
+    index = {}
+    anchors = []
+    for word, entry in grouped.items():
+        rules = sorted(entry['rules'], key=lambda rule: rule[:2])
+        exact = [rule for rule in rules if '{0,' not in rule[2].pattern.pattern]
+        spans = [rule for rule in rules if '{0,' in rule[2].pattern.pattern]
+        best_priority = {}
+        for priority, question, _ in rules:
+            best_priority.setdefault(question, priority)
+        index[word] = {
+            'exact': (_alternation(exact), exact),
+            'spans': (_alternation(spans), spans),
+            'best_priority': best_priority,
+        }
+        anchors.append(f"{word}(?=\\s+(?:{'|'.join(sorted(entry['next_words']))}))")
     
-    explanations = {
-        'penalty_a_explanation': '',
-        'penalty_b_explanation': ''
+    unanchored.sort(key=lambda rule: rule[:2])
+    unanchored_tiers = {
+        'exact': [rule for rule in unanchored if '{0,' not in rule[2].pattern.pattern],
+        'spans': [rule for rule in unanchored if '{0,' in rule[2].pattern.pattern],
     }
-    
-    # Generate Minimum Essential Coverage explanation
-    if essential_coverage and essential_coverage.lower() == 'yes':
-        explanations['penalty_a_explanation'] = f"""✅ MINIMUM ESSENTIAL COVERAGE QUALIFIED
-
-{company_name}'s {plan_type} meets all ACA requirements for Minimum Essential Coverage.
-
-KEY QUALIFICATIONS:
-• Comprehensive health benefits including preventive care at no cost
-• Covers all 10 Essential Health Benefits required by ACA
-• Active during {coverage_period}
-• Includes prescription drug coverage and emergency services
-• Meets federal standards for health insurance coverage
-
-COMPLIANCE IMPACT:
-• Employees enrolled in this plan are exempt from individual mandate penalties
-• Plan satisfies ACA coverage requirements for tax purposes
-• Qualifies for premium tax credit eligibility determinations
-
-TECHNICAL DETAILS:
-• Plan Structure: {plan_type} with {deductible_info['formatted']}
-• Out-of-Pocket Protection: {oop_limit} maximum annual limits
-• Coverage Level: Meets actuarial value and benefit design standards"""
+    # Without any anchored rule the anchor scan must never match
+    return index, '|'.join(anchors) or '(?!)', unanchored_tiers
+
+_COVERAGE_ANCHORS, _anchor_pattern, _UNANCHORED_COVERAGE_RULES = _build_anchor_index(COVERAGE_RULES)
+
+# Coverage rules start with one of these two-word labels, so they only need to
+# be tried where one occurs. The anchor scan runs case-sensitively over
+# lowercased text, which is several times faster than an IGNORECASE alternation.
+_COVERAGE_ANCHOR = re.compile(_anchor_pattern)
+_COVERAGE_ANCHOR_IGNORECASE = re.compile(_anchor_pattern, re.IGNORECASE)
+
+def _try_anchor(text: str, position: int, tier: tuple, best: dict):
+    """Apply one alternation tier at an anchor, keeping the best rule per question"""
+    alternation, rules = tier
+    if alternation is None:
+        return
+    if RULE_STATS_ENABLED:
+        start = perf_counter_ns()
+        match = alternation.match(text, position)
+        _record_tier(rules, (match.lastindex - 1) // 2 if match else None, perf_counter_ns() - start)
     else:
-        explanations['penalty_a_explanation'] = f"""❌ MINIMUM ESSENTIAL COVERAGE NOT QUALIFIED
+        match = alternation.match(text, position)
+    if match:
+        # Each alternative contributes two groups: the rule and its answer
+        priority, question, rule = rules[(match.lastindex - 1) // 2]
+        found = best[question]
+        if found is None or priority < found[0]:
+            best[question] = (priority, rule.name, match.group(match.lastindex + 1).capitalize())
 
-{company_name}'s plan does NOT meet ACA Minimum Essential Coverage standards.
+def _record_tier(rules: list, winner: Optional[int], elapsed_ns: int):
+    """Count one alternation match against its rules
 
-COMPLIANCE RISKS:
-• Employees may face individual mandate penalties (varies by state)
-• Plan may not qualify for premium tax credit interactions
-• Potential tax reporting complications for employees
+    Alternatives are tried in order, so the rules up to the one that matched
+    (or all of them) were evaluated. The shared time is split between them.
+    """
+    evaluated = rules if winner is None else rules[:winner + 1]
+    share = elapsed_ns // len(evaluated)
+    for _, _, rule in evaluated:
+        rule.stats.record(False, share)
+    if winner is not None:
+        rules[winner][2].stats.matched += 1
 
-RECOMMENDED ACTIONS:
-• Review plan benefits against ACA essential health benefit categories
-• Consider supplemental coverage options
-• Consult with benefits advisor for compliance strategies
-• Evaluate plan upgrade options for next enrollment period
+def _beats(priority: int, found: Optional[tuple]) -> bool:
+    """Check whether a rule of this priority would replace the answer found so far"""
+    return found is None or priority < found[0]
 
-CURRENT GAPS:
-• May lack required essential health benefit categories
-• Could have insufficient preventive care coverage
-• Possible limitations in prescription drug benefits"""
-    
-    # Generate Minimum Value Standards explanation
-    if value_standards and value_standards.lower() == 'yes':
-        explanations['penalty_b_explanation'] = f"""✅ MINIMUM VALUE STANDARDS ACHIEVED
-
-{company_name}'s {plan_type} meets the 60% actuarial value requirement under ACA Section 4980H.
-
-ACTUARIAL VALUE COMPLIANCE:
-• Plan covers ≥60% of expected total healthcare costs
-• Substantial coverage for inpatient hospital and physician services
-• Meets affordability thresholds for employee premium contributions
-• Qualified plan design under federal guidelines
-
-EMPLOYER MANDATE PROTECTION:
-• {company_name} AVOIDS Section 4980H penalties
-• No {current_employer_penalty} per full-time employee penalty exposure
-• Satisfies "offer of coverage" requirements for large employers
-• Maintains safe harbor status for ACA compliance
-
-PLAN PERFORMANCE METRICS:
-• Structure: {plan_type} with {deductible_info['formatted']}
-• Cost Sharing: {oop_limit} out-of-pocket protection
-• Coverage Period: {coverage_period}
-• Value Ratio: ≥60% actuarial value certified"""
-    else:
-        explanations['penalty_b_explanation'] = f"""❌ MINIMUM VALUE STANDARDS NOT MET
-
-{company_name}'s plan FAILS the 60% actuarial value requirement.
-
-IMMEDIATE PENALTY EXPOSURE:
-• Potential {current_employer_penalty} penalty per full-time employee annually
-• Applies to ALL full-time employees if triggered
-• Section 4980H(b) "sledgehammer" penalty risk
-• Retroactive penalty assessment possible
-
-COMPLIANCE FAILURES:
-• Plan covers <60% of expected total healthcare costs
-• Insufficient coverage for inpatient hospital or physician services
-• May fail affordability tests for employee contributions
-• Does not qualify as "minimum value" coverage
-
-URGENT ACTIONS REQUIRED:
-• Immediate plan enhancement or replacement needed
-• Calculate total potential penalty exposure (employees × {current_employer_penalty})
-• Consider stop-loss or supplemental coverage options
-• Engage benefits consultant for emergency compliance strategy
-• Review all full-time employee classifications
-
-FINANCIAL IMPACT EXAMPLE:
-• 50 full-time employees = {current_employer_penalty} × 50 = $216,000 annual penalty risk"""
-    
-    return explanations
+def _settled(best: dict, best_priority: dict) -> bool:
+    """Check whether no rule at an anchor could beat the answers found so far"""
+    return all(best[question] is not None and best[question][0] <= priority
+               for question, priority in best_priority.items())
+
+class _CoverageScan:
+    """Scan for both coverage answers over text that arrives page by page
+
+    An anchor is only tried once PAGE_SCAN_OVERLAP characters of text follow
+    it (or the text has ended), so every anchor is tried exactly once and sees
+    as much text as its rules can match. Rules without an anchor are searched
+    for in the same part of the text. The result is the same as scanning the
+    joined text in one pass.
+    """
+
+    def __init__(self):
+        self.best = {question: None for question in COVERAGE_RULES}  # (priority, rule, answer)
+        # Span rules without an anchor, used like the deferred anchors
+        self._span_best = {question: None for question in COVERAGE_RULES}
+        self._deferred = []
+        self._carry = ""
+        # Anchors at the start of the carried text that were already tried
+        self._tried_to = 0
+        self.final = False
+
+    def feed(self, chunk: str, last: bool = False):
+        """Scan the anchors the new text completes; the rest waits for more text"""
+        if self.final:
+            return
+        text = self._carry + chunk
+        limit = len(text) if last else len(text) - PAGE_SCAN_OVERLAP
+        cut = max(limit, 0)
+        tried_to = self._tried_to
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            anchors = _COVERAGE_ANCHOR.finditer(lowered)
+        else:
+            # A few non-ASCII characters change length when lowercased
+            anchors = _COVERAGE_ANCHOR_IGNORECASE.finditer(text)
+        
+        for anchor in anchors:
+            if anchor.start() < self._tried_to:
+                continue
+            if anchor.start() >= limit:
+                break
+            tried_to = anchor.end()
+            entry = _COVERAGE_ANCHORS[anchor.group(0).lower()]
+            self._deferred.append((text, anchor.start(), entry))
+            
+            # Skip anchors whose rules cannot beat what has already been found
+            if not _settled(self.best, entry['best_priority']):
+                _try_anchor(text, anchor.start(), entry['exact'], self.best)
+            
+            if self._top_rules_matched():
+                return
+        
+        for tier, best in (('exact', self.best), ('spans', self._span_best)):
+            for priority, question, rule in _UNANCHORED_COVERAGE_RULES[tier]:
+                if _beats(priority, self.best[question]) and _beats(priority, best[question]):
+                    match = rule.search(text)
+                    if match and match.start() < limit:
+                        best[question] = (priority, rule.name, match.group(1).capitalize())
+        if self._top_rules_matched():
+            return
+        
+        self._carry = text[cut:]
+        self._tried_to = max(tried_to - cut, 0)
+
+    def _top_rules_matched(self) -> bool:
+        """Note whether the top rule of both questions has matched; nothing can beat that"""
+        self.final = all(found is not None and found[0] == 0 for found in self.best.values())
+        return self.final
+
+    def finish(self) -> dict:
+        """Scan the remaining text, fall back to the span rules and return the answers"""
+        self.feed("", last=True)
+        if any(found is None for found in self.best.values()):
+            for text, position, entry in self._deferred:
+                if not _settled(self.best, entry['best_priority']):
+                    _try_anchor(text, position, entry['spans'], self.best)
+            for question, found in self._span_best.items():
+                if found is not None and _beats(found[0], self.best[question]):
+                    self.best[question] = found
+        self._deferred = []
+        
+        result = {}
+        for question, found in self.best.items():
+            result[question] = found[2] if found else None
+            result[f'{question}_rule'] = found[1] if found else None
+        return result
+
+def scan_coverage_answers(document) -> dict:
+    """Find both coverage answers in one pass and report which rule matched each
+
+    Gives the same answer as trying every rule with re.search in priority
+    order, but the text is walked once: rules are only tried at anchor labels,
+    and the scan stops as soon as the top rule of both questions has matched.
+    The span rules are only tried, at the anchors already found, when an exact
+    label rule did not answer a question.
+    """
+    scan = _CoverageScan()
+    scan.feed(document.text if isinstance(document, DocumentContext) else document)
+    return scan.finish()
 
 def extract_coverage_answers(text: str) -> Tuple[Optional[str], Optional[str]]:
     """Extract answers to the two key questions"""
+    answers = scan_coverage_answers(text)
+    return answers['essential_coverage'], answers['value_standards']
+
+def extract_targeted_answers(doc, guard: Optional[MemoryGuard] = None) -> Tuple[Optional[dict], int]:
+    """Find the coverage answers by searching the last pages in reverse order
+
+    On the standard SBC template both questions sit in one block near the end
+    of the document. Only the region around their labels is extracted and
+    scanned. Returns the answers (or None if both were not found) and the
+    number of pages searched.
+    """
+    searched = 0
+    first = max(0, doc.page_count - TARGETED_PAGE_LIMIT)
+    for index in range(doc.page_count - 1, first - 1, -1):
+        searched += 1
+        region_text = doc.region_text(index, COVERAGE_QUESTION_LABELS, TARGETED_REGION_PADDING)
+        if guard:
+            guard.check()
+        if region_text is None:
+            continue
+        
+        answers = scan_coverage_answers(region_text)
+        if _answers_complete(answers):
+            return answers, searched
     
-    # Question 1: Minimum Essential Coverage
-    essential_coverage_patterns = [
-        r'Does\s+this\s+plan\s+provide\s+Minimum\s+Essential\s+Coverage\?\s*(Yes|No)',
-        r'Minimum\s+Essential\s+Coverage\?\s*(Yes|No)',
-        r'Essential\s+Coverage[:\s]*(Yes|No)',
-        r'Minimum\s+Essential[:\s]*(Yes|No)',
-        r'Essential\s+Coverage\?\s*(Yes|No)',
-        r'Minimum\s+Essential\s+Coverage[:\s]*(Yes|No)',
-        r'Essential\s+Coverage[^.]*?\b(Yes|No)\b',  # More flexible pattern with word boundaries
-        r'Minimum\s+Essential[^.]*?\b(Yes|No)\b',   # More flexible pattern with word boundaries
-    ]
-    
-    # Question 2: Minimum Value Standards
-    value_standards_patterns = [
-        r'Does\s+this\s+plan\s+meet\s+the\s+Minimum\s+Value\s+Standards\?\s*(Yes|No)',
-        r'Minimum\s+Value\s+Standards\?\s*(Yes|No)',
-        r'Value\s+Standards[:\s]*(Yes|No)',
-        r'Minimum\s+Value[:\s]*(Yes|No)',
-        r'Value\s+Standards\?\s*(Yes|No)',
-        r'Minimum\s+Value\s+Standards[:\s]*(Yes|No)',
-        r'Value\s+Standards[^.]*?\b(Yes|No)\b',     # More flexible pattern with word boundaries
-        r'Minimum\s+Value[^.]*?\b(Yes|No)\b',       # More flexible pattern with word boundaries
-    ]
-    
-    essential_coverage_answer = None
-    value_standards_answer = None
+    return None, searched
+
+def _answers_complete(answers: Optional[dict]) -> bool:
+    """Check whether a scan found both coverage answers"""
+    return bool(answers and answers['essential_coverage'] and answers['value_standards'])
+
+def _top_rule_match(group: str, section: str):
+    """Search a fact group's top rule the way its extractor does"""
+    rule = RULES.group(group)[0]
+    return lambda context: context.search(rule, section)
+
+def _plan_type_found(context: DocumentContext) -> bool:
+    rules = RULES.group('plan_type')
+    return bool(any(context.search(rule, 'header', whole_text=False) for rule in rules)
+                or context.search(rules[0]))
+
+def _coverage_period_found(context: DocumentContext) -> bool:
+    match = _top_rule_match('coverage_period', 'header')(context)
+    return bool(match and len(match.group(1).strip()) > 5)
+
+# Facts settle once the top rule of their extractor has matched (for the plan
+# type, any rule within the header), as no later match can take precedence.
+# Each is paired with the section its extractor searches first: until that
+# section ends it covers all the text read so far, so the match can still move.
+CONTEXT_FACT_CHECKS = {
+    'plan_type': ('header', _plan_type_found),
+    'deductible_individual': ('important_questions', _top_rule_match('deductible_individual', 'important_questions')),
+    'deductible_family': ('important_questions', _top_rule_match('deductible_family', 'important_questions')),
+    'coverage_period': ('header', _coverage_period_found),
+    'oop_limit': ('important_questions', _top_rule_match('out_of_pocket', 'important_questions')),
+}
+
+def _found_context_facts(context: DocumentContext, window: str, pending: set) -> set:
+    """Facts among ``pending`` that the text read so far now settles
+
+    Only the newly read window is searched, since a match can only appear
+    where new text was added. A hit is confirmed on the whole context once,
+    because the extractors give the first match of the document precedence.
+    """
+    window_context = DocumentContext.of(window)
+    return {name for name in pending
+            if CONTEXT_FACT_CHECKS[name][1](window_context) and CONTEXT_FACT_CHECKS[name][1](context)}
+
+def _ended_sections(context: DocumentContext, window: str, sections: set) -> set:
+    """Sections among ``sections`` whose end has now been read
+
+    Until a section ends it covers all the text read so far, so a fact found
+    in it can still change. Only a window containing the closing heading is
+    confirmed against the whole context.
+    """
+    window_lower = window.lower()
+    return {name for name in sections
+            if (SECTION_ENDS[name] is None or SECTION_ENDS[name].search(window_lower))
+            and context.section_ended(name)}
+
+def _read_document(doc, mode: str, guard: Optional[MemoryGuard] = None) -> dict:
+    """Read the company name, coverage answers and document context from an open document"""
+    company_name = None
+    answers = None
+    scan = _CoverageScan()
+    pending_facts = set(CONTEXT_FACT_CHECKS)
+    open_sections = set()
+    unread_sections = {section for section, _ in CONTEXT_FACT_CHECKS.values()}
+    tail = ""
+    context = DocumentContext()
+    pages_parsed = 0
+    targeted_pages = 0
     
-    # Search for answers
-    for pattern in essential_coverage_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if match:
-            essential_coverage_answer = match.group(1).strip()
-            # Validate the answer
-            if essential_coverage_answer.lower() not in ['yes', 'no']:
-                print(f"Warning: Invalid essential coverage answer extracted: '{essential_coverage_answer}'")
-                essential_coverage_answer = None
-            else:
-                break
+    if mode == 'targeted':
+        answers, targeted_pages = extract_targeted_answers(doc, guard)
     
-    for pattern in value_standards_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if match:
-            value_standards_answer = match.group(1).strip()
-            # Validate the answer
-            if value_standards_answer.lower() not in ['yes', 'no']:
-                print(f"Warning: Invalid value standards answer extracted: '{value_standards_answer}'")
-                value_standards_answer = None
-            else:
+    for page_text in doc.iter_page_texts():
+        pages_parsed += 1
+        if guard:
+            guard.check()
+        context.add_page(page_text)
+        
+        # Extract company name (usually on first page)
+        if company_name is None:
+            company_name = extract_company_name(context)
+        
+        if mode == 'full' or not page_text:
+            continue
+        
+        # Only the new page and the end of the previous one are searched
+        chunk = page_text + "\n"
+        window = tail + chunk
+        tail = window[-PAGE_SCAN_OVERLAP:]
+        if _answers_complete(answers):
+            # The answers came from the question block; the facts are taken
+            # from their sections, so stop once those have been read
+            unread_sections -= _ended_sections(context, window, unread_sections)
+            if not unread_sections:
                 break
+            continue
+        
+        scan.feed(chunk)
+        if pending_facts:
+            found = _found_context_facts(context, window, pending_facts)
+            pending_facts -= found
+            sections = {CONTEXT_FACT_CHECKS[name][0] for name in found} - open_sections
+            open_sections |= {name for name in sections if not context.section_ended(name)}
+        if open_sections:
+            open_sections -= _ended_sections(context, window, open_sections)
+        
+        # Later pages can still hold a better answer unless the top rules matched
+        if scan.final and not pending_facts and not open_sections:
+            break
     
-    # If not found with specific patterns, try broader search
-    if not essential_coverage_answer:
-        # Look for "Yes" or "No" near "Essential Coverage" text
-        essential_matches = re.findall(r'Essential\s+Coverage.*?([Yes|No])', text, re.IGNORECASE | re.DOTALL)
-        if essential_matches:
-            essential_coverage_answer = essential_matches[0].strip()
-        else:
-            # Try to find "Yes" or "No" in the same paragraph as "Essential Coverage"
-            essential_paragraphs = re.findall(r'Essential\s+Coverage[^.]*\.', text, re.IGNORECASE | re.DOTALL)
-            for paragraph in essential_paragraphs:
-                yes_no_match = re.search(r'\b([Yes|No])\b', paragraph, re.IGNORECASE)
-                if yes_no_match:
-                    essential_coverage_answer = yes_no_match.group(1).strip()
-                    break
+    if company_name is None:
+        company_name = extract_company_name("")
     
-    if not value_standards_answer:
-        # Look for "Yes" or "No" near "Value Standards" text
-        value_matches = re.findall(r'Value\s+Standards.*?([Yes|No])', text, re.IGNORECASE | re.DOTALL)
-        if value_matches:
-            value_standards_answer = value_matches[0].strip()
-        else:
-            # Try to find "Yes" or "No" in the same paragraph as "Value Standards"
-            value_paragraphs = re.findall(r'Value\s+Standards[^.]*\.', text, re.IGNORECASE | re.DOTALL)
-            for paragraph in value_paragraphs:
-                yes_no_match = re.search(r'\b([Yes|No])\b', paragraph, re.IGNORECASE)
-                if yes_no_match:
-                    value_standards_answer = yes_no_match.group(1).strip()
-                    break
+    if mode == 'full':
+        answers = scan_coverage_answers(context)
+    elif not _answers_complete(answers):
+        answers = scan.finish()
     
-    return essential_coverage_answer, value_standards_answer
+    return {
+        'company_name': company_name,
+        'answers': answers,
+        'context': context,
+        'pages_parsed': pages_parsed,
+        'targeted_pages': targeted_pages
+    }
+
+def process_sbc_pdf(file_path, mode: Optional[str] = None, backend: Optional[str] = None) -> dict:
+    """Process SBC PDF and extract required information with intelligent explanations
 
-def process_sbc_pdf(file_path: str) -> dict:
-    """Process SBC PDF and extract required information with intelligent explanations"""
+    ``file_path`` may also be a binary file object. The document is opened
+    once and pages are parsed lazily. In 'targeted' mode the coverage answers
+    are first read from the question block near the end of the document, and
+    pages are then read only until the header and Important Questions
+    sections, which the plan facts come from, have ended. 'stream' stops
+    reading pages once no later page can change the answers or the facts, so
+    it gives the same result as 'full'. 'full' reads every page.
+    
+    ``backend`` selects the text backend (see text_backends). With 'auto' the
+    fast pdfminer path is tried first and pdfplumber's layout analysis is only
+    used when the fast path does not find both coverage answers.
+    
+    Memory is sampled after every page; a document whose parsing grows RSS
+    past SBC_DOCUMENT_MEMORY_MB fails with ``memory_exceeded`` set instead of
+    taking the whole process down. Usage counters of the extraction rules
+    since the previous document are returned in ``rule_stats``.
+    """
+    mode = mode or DEFAULT_EXTRACTION_MODE
+    if mode not in EXTRACTION_MODES:
+        return {
+            'success': False,
+            'error': f"Unknown extraction mode '{mode}'"
+        }
+    
+    backend = backend or DEFAULT_TEXT_BACKEND
+    if backend == 'auto':
+        backends = ['pdfminer', 'pdfplumber']
+    elif backend in TEXT_BACKENDS:
+        backends = [backend]
+    else:
+        return {
+            'success': False,
+            'error': f"Unknown text backend '{backend}'"
+        }
+    
+    guard = MemoryGuard()
     try:
-        with pdfplumber.open(file_path) as pdf:
-            # Extract text from all pages
-            full_text = ""
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    full_text += page_text + "\n"
-            
-        # Extract company name (usually on first page)
-        first_page_text = ""
-        with pdfplumber.open(file_path) as pdf:
-            if len(pdf.pages) > 0:
-                first_page_text = pdf.pages[0].extract_text() or ""
-        
-        company_name = extract_company_name(first_page_text)
+        with guard:
+            extracted, backend_name, fallback_from = _read_with_backends(file_path, mode, backends, guard)
         
-        # Extract answers to coverage questions
-        essential_coverage, value_standards = extract_coverage_answers(full_text)
+        company_name = extracted['company_name']
+        answers = extracted['answers']
+        context = extracted['context']
+        essential_coverage = answers['essential_coverage']
+        value_standards = answers['value_standards']
         
-        # NEW: Generate intelligent explanations based on extracted content
-        explanations = generate_penalty_explanation(
-            company_name, essential_coverage, value_standards, full_text
-        )
+        # Structured facts are stored; explanations are rendered from them on demand
+        plan_facts = extract_plan_facts(context)
+        explanations = render_explanations(company_name, essential_coverage, value_standards, plan_facts)
         
         # Calculate penalties (keep existing logic)
         penalty_a = essential_coverage if essential_coverage else "Unknown"
@@ -377,11 +576,72 @@ def process_sbc_pdf(file_path: str) -> dict:
             'penalty_a': penalty_a,
             'penalty_b': penalty_b,
             'penalty_a_explanation': explanations['penalty_a_explanation'],  # NEW
-            'penalty_b_explanation': explanations['penalty_b_explanation']   # NEW
+            'penalty_b_explanation': explanations['penalty_b_explanation'],  # NEW
+            'plan_facts': plan_facts,
+            'extractor_version': EXTRACTOR_VERSION,
+            'essential_coverage_rule': answers['essential_coverage_rule'],
+            'value_standards_rule': answers['value_standards_rule'],
+            'extraction_mode': mode,
+            'text_backend': backend_name,
+            'fallback_from': fallback_from,
+            'pages_parsed': extracted['pages_parsed'],
+            'targeted_pages': extracted['targeted_pages'],
+            'memory': _report_memory(guard, file_path),
+            'rule_stats': RULES.drain()
         }
         
+    except DocumentMemoryExceeded as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'memory_exceeded': True,
+            'memory': _report_memory(guard, file_path),
+            'rule_stats': RULES.drain()
+        }
     except Exception as e:
         return {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'rule_stats': RULES.drain()
         }
+
+def _read_with_backends(file_path, mode: str, backends: list, guard: MemoryGuard) -> tuple:
+    """Read the document with each backend in turn until one finds both answers
+
+    Returns the extracted data, the backend that produced it and the backend
+    that was abandoned for it, if any.
+    """
+    fallback_from = None
+    for index, backend_name in enumerate(backends):
+        is_last = index == len(backends) - 1
+        if hasattr(file_path, 'seek'):
+            file_path.seek(0)
+        try:
+            with open_document(file_path, backend_name) as doc:
+                extracted = _read_document(doc, mode, guard)
+        except DocumentMemoryExceeded:
+            # The slower backends need more memory, never fall back to them
+            raise
+        except Exception as e:
+            if is_last:
+                raise
+            print(f"Text backend {backend_name} failed, falling back: {e}")
+            fallback_from = backend_name
+            continue
+        
+        if _answers_complete(extracted['answers']) or is_last:
+            break
+        print(f"Text backend {backend_name} did not find both coverage answers, falling back")
+        fallback_from = backend_name
+    
+    return extracted, backend_name, fallback_from
+
+def _report_memory(guard: MemoryGuard, file_path) -> dict:
+    """Log and return the memory figures of one processed document"""
+    memory = guard.report()
+    name = file_path if isinstance(file_path, (str, os.PathLike)) else 'in-memory upload'
+    line = f"Memory for {name}: peak RSS {memory['rss_peak_mb']}MB (+{memory['rss_growth_mb']}MB over {guard.pages} pages)"
+    if memory['tracemalloc_peak_mb'] is not None:
+        line += f", tracemalloc peak {memory['tracemalloc_peak_mb']}MB"
+    print(line)
+    return memory
@@ -0,0 +1,87 @@
+import hashlib
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Encoded listing responses each API worker keeps (0 disables the cache)
+RECORDS_CACHE_SIZE = int(os.getenv('RECORDS_CACHE_SIZE', '128'))
+
+class ResponseCache:
+    """Per-worker LRU of encoded response bodies, each valid for one data version"""
+
+    def __init__(self, max_entries: int = RECORDS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str, version: int) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, version: int, body: bytes):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (version, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified
+        }
+
+def make_etag(version: int, key: str) -> str:
+    """Strong ETag for the response to ``key`` at a data version"""
+    return '"' + hashlib.sha1(f"{version}:{key}".encode()).hexdigest()[:20] + '"'
+
+def version_datetime(version: int) -> datetime:
+    """Time of the change a nanosecond version stands for, truncated to HTTP's one-second precision"""
+    return datetime.fromtimestamp(version // 1_000_000_000, tz=timezone.utc)
+
+def http_date(version: int) -> str:
+    return format_datetime(version_datetime(version), usegmt=True)
+
+def version_settled(version: int, now: Optional[datetime] = None) -> bool:
+    """Whether the second of a version has passed, so no later write can share its date"""
+    now = now or datetime.now(timezone.utc)
+    return version_datetime(version) < now.replace(microsecond=0)
+
+def is_not_modified(etag: str, version: int, if_none_match: Optional[str], if_modified_since: Optional[str],
+                    now: Optional[datetime] = None) -> bool:
+    """Evaluate conditional request headers; If-None-Match takes precedence as in RFC 9110
+
+    A date alone never answers 304 during the second of the last change,
+    since a write later in that second would carry the same date.
+    """
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        # Weak comparison: a W/ prefix added by a proxy still matches
+        return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return version_settled(version, now) and version_datetime(version) <= since
+
+    return False
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import threading
+from dotenv import load_dotenv
+from database import add_rule_stats, get_rule_stats, reset_rule_stats
+from rules import RULES
+
+load_dotenv()
+
+# Documents whose rule counters are batched before they are written to the database
+RULE_STATS_FLUSH_EVERY = int(os.getenv('RULE_STATS_FLUSH_EVERY', '20'))
+
+# Counters not yet written; updated from the event loop and the database threads
+_pending = {}
+_pending_documents = 0
+_pending_lock = threading.Lock()
+
+def record_rule_stats(deltas) -> bool:
+    """Add the counters returned with one extraction result
+
+    Returns True once enough documents are pending that they should be flushed.
+    """
+    global _pending_documents
+    if not deltas:
+        return False
+    with _pending_lock:
+        merge_rule_stats(_pending, deltas)
+        _pending_documents += 1
+        return _pending_documents >= RULE_STATS_FLUSH_EVERY
+
+def merge_rule_stats(totals: dict, deltas: dict):
+    """Add {rule_key: [evaluated, matched, time_ns]} counters into ``totals``"""
+    for key, counts in deltas.items():
+        current = totals.setdefault(key, [0, 0, 0])
+        for index, value in enumerate(counts):
+            current[index] += value
+
+def take_pending_rule_stats() -> dict:
+    """Hand over the counters not yet written to the database"""
+    global _pending, _pending_documents
+    with _pending_lock:
+        pending, _pending, _pending_documents = _pending, {}, 0
+    return pending
+
+def save_rule_stats(pending: dict):
+    """Write counters taken with take_pending_rule_stats, keeping them if that fails"""
+    try:
+        add_rule_stats(pending)
+    except Exception as e:
+        print(f"Failed to save rule stats: {e}")
+        with _pending_lock:
+            merge_rule_stats(_pending, pending)
+
+def flush_rule_stats():
+    save_rule_stats(take_pending_rule_stats())
+
+def rule_stats_report(sort: str = 'time') -> list:
+    """Every registered rule with its stored totals, sorted by total time, matches or evaluations"""
+    totals = get_rule_stats()
+    with _pending_lock:
+        pending = {key: list(counts) for key, counts in _pending.items()}
+    merge_rule_stats(totals, pending)
+
+    report = []
+    for rule in RULES:
+        evaluated, matched, time_ns = totals.get(rule.key, [0, 0, 0])
+        report.append({
+            'rule': rule.key,
+            'group': rule.group,
+            'name': rule.name,
+            'evaluated': evaluated,
+            'matched': matched,
+            'hit_rate': round(matched / evaluated, 4) if evaluated else None,
+            'total_ms': round(time_ns / 1e6, 3),
+            'avg_us': round(time_ns / evaluated / 1e3, 2) if evaluated else None
+        })
+
+    sort_keys = {
+        'time': lambda row: -row['total_ms'],
+        'matched': lambda row: -row['matched'],
+        'evaluated': lambda row: -row['evaluated'],
+        'rule': lambda row: row['rule']
+    }
+    return sorted(report, key=sort_keys[sort])
+
+def main():
+    parser = argparse.ArgumentParser(description="Show how often each extraction rule is evaluated and matches")
+    parser.add_argument('--sort', choices=['time', 'matched', 'evaluated', 'rule'], default='time')
+    parser.add_argument('--group', help="Only show rules of this group")
+    parser.add_argument('--json', action='store_true', help="Print JSON instead of a table")
+    parser.add_argument('--reset', action='store_true', help="Delete the stored totals")
+    args = parser.parse_args()
+
+    if args.reset:
+        reset_rule_stats()
+        print("Rule stats reset")
+        return
+
+    report = [row for row in rule_stats_report(args.sort) if not args.group or row['group'] == args.group]
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'rule':<55} {'evaluated':>10} {'matched':>9} {'hit rate':>9} {'total ms':>10} {'avg us':>8}")
+    for row in report:
+        hit_rate = f"{row['hit_rate']:.1%}" if row['hit_rate'] is not None else '-'
+        avg_us = f"{row['avg_us']:.1f}" if row['avg_us'] is not None else '-'
+        print(f"{row['rule']:<55} {row['evaluated']:>10} {row['matched']:>9} {hit_rate:>9} {row['total_ms']:>10.3f} {avg_us:>8}")
+
+if __name__ == "__main__":
+    main()
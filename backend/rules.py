@@ -0,0 +1,188 @@
+import os
+import re
+import sys
+from time import perf_counter_ns
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Count evaluations, matches and time per rule
+RULE_STATS_ENABLED = os.getenv('SBC_RULE_STATS', 'true').lower() in ('1', 'true', 'yes')
+
+# Every extraction pattern, by group, in the order the extractors try them.
+# Rules may carry the value the extractor returns when they match.
+RULE_DEFINITIONS = {
+    # Tried on each of the first 30 lines of the first page
+    'company_name': {
+        'flags': re.IGNORECASE,
+        'rules': [
+            ('company_employee_benefits', r'([A-Za-z\s]+(?:Company|Corp|Corporation|Inc|LLC|Group))\s+Employee\s+Benefits'),
+            ('employee_benefits_plan', r'([A-Za-z\s]+)\s+Employee\s+Benefits\s+Plan'),
+            ('line_start_company', r'^([A-Za-z\s]+(?:Company|Corp|Corporation|Inc|LLC))'),
+            ('industry_company', r'([A-Za-z\s]+(?:Delivery|Service|Solutions|Systems))\s+Company'),
+            ('benefits_plan', r'([A-Za-z\s]+)\s+Benefits\s+Plan'),
+            ('delivery_company', r'([A-Za-z\s]+Delivery\s+Company)'),  # Specific pattern for Fasttrack Delivery Company
+            ('employee_benefits_plan_number', r'([A-Za-z\s]+)\s+Employee\s+Benefits\s+Plan:\s+Plan\s+\d+'),  # Pattern with plan number
+        ],
+    },
+    'company_fallback': {
+        'flags': re.IGNORECASE,
+        'rules': [
+            ('before_company', r'([A-Za-z\s]+)\s+Company'),
+        ],
+    },
+    # Keywords searched in the lowercased text, first match wins
+    'plan_type': {
+        'flags': 0,
+        'rules': [
+            ('indemnity', r'indemnity', 'Indemnity Plan'),
+            ('hmo', r'hmo', 'HMO Plan'),
+            ('ppo', r'ppo', 'PPO Plan'),
+            ('pos', r'pos', 'POS Plan'),
+            ('hdhp', r'hdhp', 'High Deductible Health Plan'),
+            ('high_deductible', r'high deductible', 'High Deductible Health Plan'),
+        ],
+    },
+    # The following groups are lowercase patterns for DocumentContext.search
+    'deductible_individual': {
+        'flags': 0,
+        'rules': [
+            ('individual_then_deductible', r'\$([0-9,]+)\s+individual.*?deductible'),
+            ('deductible_then_individual', r'deductible.*?\$([0-9,]+)\s+individual'),
+            ('individual_amount', r'\$([0-9,]+)\s+individual'),
+        ],
+    },
+    'deductible_family': {
+        'flags': 0,
+        'rules': [
+            ('family_then_deductible', r'\$([0-9,]+)\s+family.*?deductible'),
+            ('deductible_then_family', r'deductible.*?\$([0-9,]+)\s+family'),
+            ('family_amount', r'\$([0-9,]+)\s+family'),
+        ],
+    },
+    'coverage_period': {
+        'flags': 0,
+        'rules': [
+            ('coverage_period_label', r'coverage period:\s*([0-9/\-\s]+)'),
+            ('plan_year_label', r'plan year:\s*([0-9/\-\s]+)'),
+            ('coverage_for_label', r'coverage for:\s*([0-9/\-\s]+)'),
+        ],
+    },
+    'out_of_pocket': {
+        'flags': 0,
+        'rules': [
+            ('oop_individual_family', r'out-of-pocket.?\$([0-9,]+)\s+individual.?\$([0-9,]+)\s+family'),
+            ('individual_family_oop', r'\$([0-9,]+)\s+individual.?\$([0-9,]+)\s+family.?out-of-pocket'),
+            ('oop_amount', r'out-of-pocket.*?\$([0-9,]+)'),
+        ],
+    },
+    # Coverage question rules in priority order. Each pattern captures the
+    # Yes/No answer in group 1; the first rule that matches anywhere in the
+    # text wins. Sentence-level spans are bounded so a label without a nearby
+    # answer cannot make a rule scan to the end of the document.
+    'essential_coverage': {
+        'flags': re.IGNORECASE | re.DOTALL,
+        'rules': [
+            ('mec_full_question', r'Does\s+this\s+plan\s+provide\s+Minimum\s+Essential\s+Coverage\?\s*(Yes|No)'),
+            ('mec_question', r'Minimum\s+Essential\s+Coverage\?\s*(Yes|No)'),
+            ('mec_label', r'Essential\s+Coverage[:\s]*(Yes|No)'),
+            ('mec_short_label', r'Minimum\s+Essential[:\s]*(Yes|No)'),
+            ('mec_label_question', r'Essential\s+Coverage\?\s*(Yes|No)'),
+            ('mec_full_label', r'Minimum\s+Essential\s+Coverage[:\s]*(Yes|No)'),
+            ('mec_same_sentence', r'Essential\s+Coverage[^.]{0,500}?\b(Yes|No)\b'),  # More flexible pattern with word boundaries
+            ('mec_short_same_sentence', r'Minimum\s+Essential[^.]{0,500}?\b(Yes|No)\b'),
+            ('mec_nearby', r'Essential\s+Coverage.{0,300}?\b(Yes|No)\b'),  # Broader search near the label
+        ],
+    },
+    'value_standards': {
+        'flags': re.IGNORECASE | re.DOTALL,
+        'rules': [
+            ('mv_full_question', r'Does\s+this\s+plan\s+meet\s+the\s+Minimum\s+Value\s+Standards\?\s*(Yes|No)'),
+            ('mv_question', r'Minimum\s+Value\s+Standards\?\s*(Yes|No)'),
+            ('mv_label', r'Value\s+Standards[:\s]*(Yes|No)'),
+            ('mv_short_label', r'Minimum\s+Value[:\s]*(Yes|No)'),
+            ('mv_label_question', r'Value\s+Standards\?\s*(Yes|No)'),
+            ('mv_full_label', r'Minimum\s+Value\s+Standards[:\s]*(Yes|No)'),
+            ('mv_same_sentence', r'Value\s+Standards[^.]{0,500}?\b(Yes|No)\b'),  # More flexible pattern with word boundaries
+            ('mv_short_same_sentence', r'Minimum\s+Value[^.]{0,500}?\b(Yes|No)\b'),
+            ('mv_nearby', r'Value\s+Standards.{0,300}?\b(Yes|No)\b'),  # Broader search near the label
+        ],
+    },
+}
+
+class RuleStats:
+    """Counters for one rule since they were last drained"""
+
+    __slots__ = ('evaluated', 'matched', 'time_ns')
+
+    def __init__(self):
+        self.evaluated = 0
+        self.matched = 0
+        self.time_ns = 0
+
+    def record(self, matched: bool, elapsed_ns: int):
+        self.evaluated += 1
+        self.matched += matched
+        self.time_ns += elapsed_ns
+
+class Rule:
+    """A named, compiled extraction pattern that counts its own use"""
+
+    def __init__(self, group: str, name: str, pattern, value=None, stats: Optional[RuleStats] = None):
+        self.group = group
+        self.name = name
+        self.pattern = pattern
+        self.value = value
+        self.stats = stats or RuleStats()
+        self._ignorecase = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.group}.{self.name}"
+
+    @property
+    def ignorecase(self) -> 'Rule':
+        """Case-insensitive variant sharing this rule's counters"""
+        if self._ignorecase is None:
+            pattern = re.compile(self.pattern.pattern, self.pattern.flags | re.IGNORECASE)
+            self._ignorecase = Rule(self.group, self.name, pattern, self.value, self.stats)
+        return self._ignorecase
+
+    def search(self, text: str, pos: int = 0, endpos: int = sys.maxsize):
+        if not RULE_STATS_ENABLED:
+            return self.pattern.search(text, pos, endpos)
+        start = perf_counter_ns()
+        match = self.pattern.search(text, pos, endpos)
+        self.stats.record(match is not None, perf_counter_ns() - start)
+        return match
+
+class RuleRegistry:
+    """All extraction rules by group, with their usage counters"""
+
+    def __init__(self, definitions: dict):
+        self.groups: Dict[str, List[Rule]] = {}
+        for group, definition in definitions.items():
+            self.groups[group] = [
+                Rule(group, rule[0], re.compile(rule[1], definition['flags']), rule[2] if len(rule) > 2 else None)
+                for rule in definition['rules']
+            ]
+
+    def group(self, name: str) -> List[Rule]:
+        return self.groups[name]
+
+    def __iter__(self):
+        for rules in self.groups.values():
+            yield from rules
+
+    def drain(self) -> dict:
+        """Return the counters of every rule used since the last drain and reset them"""
+        drained = {}
+        for rule in self:
+            stats = rule.stats
+            if stats.evaluated:
+                drained[rule.key] = [stats.evaluated, stats.matched, stats.time_ns]
+                stats.evaluated = stats.matched = stats.time_ns = 0
+        return drained
+
+RULES = RuleRegistry(RULE_DEFINITIONS)
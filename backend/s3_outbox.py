@@ -0,0 +1,121 @@
+import asyncio
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from async_db import claim_s3_upload, complete_s3_upload, fail_s3_upload, get_record_by_hash
+from s3_service import delete_from_s3, upload_to_s3
+
+load_dotenv()
+
+# Background S3 uploaders per API worker
+S3_OUTBOX_WORKERS = int(os.getenv('S3_OUTBOX_WORKERS', '1'))
+# Seconds between polls of the outbox when nothing is due
+S3_OUTBOX_POLL_INTERVAL = float(os.getenv('S3_OUTBOX_POLL_INTERVAL', '1'))
+# Attempts before an upload is given up and marked failed
+S3_OUTBOX_MAX_ATTEMPTS = int(os.getenv('S3_OUTBOX_MAX_ATTEMPTS', '10'))
+# Delay before the first retry, doubled after every further failure up to the maximum
+S3_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv('S3_OUTBOX_RETRY_BASE_SECONDS', '5'))
+S3_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv('S3_OUTBOX_RETRY_MAX_SECONDS', '900'))
+# A claimed upload whose worker has not reported back after this long is retried
+S3_OUTBOX_LEASE_SECONDS = int(os.getenv('S3_OUTBOX_LEASE_SECONDS', '300'))
+# Where PDFs wait for their upload; must be shared by all API workers
+S3_OUTBOX_DIR = os.getenv('S3_OUTBOX_DIR', os.path.join(tempfile.gettempdir(), 'sbc_s3_outbox'))
+
+_tasks = []
+
+def spool_for_s3(upload) -> str:
+    """Store a SpooledUpload in a new file in the outbox directory and return its path"""
+    os.makedirs(S3_OUTBOX_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.pdf', dir=S3_OUTBOX_DIR)
+    os.close(fd)
+    try:
+        upload.save_as(path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+def discard_spooled(paths):
+    """Remove the spooled files of uploads that were dropped from the outbox"""
+    for path in paths:
+        if os.path.exists(path):
+            os.unlink(path)
+
+def _utc_after(seconds: float) -> str:
+    return (datetime.utcnow() + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait after the given number of failed attempts, with jitter"""
+    delay = min(S3_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), S3_OUTBOX_RETRY_MAX_SECONDS)
+    # Spread retries so uploads that failed together do not all retry together
+    return delay * random.uniform(0.5, 1)
+
+async def _give_up(entry: dict, error: str):
+    await fail_s3_upload(entry['id'], error)
+    print(f"S3 upload {entry['id']}: failed for record {entry['record_id']}: {error}")
+    discard_spooled([entry['file_path']])
+
+async def _run_upload(entry: dict):
+    """Upload one claimed file and store its URL, or schedule a retry"""
+    if not os.path.exists(entry['file_path']):
+        await _give_up(entry, 'Spooled file is no longer available')
+        return
+
+    try:
+        s3_url = await asyncio.to_thread(upload_to_s3, entry['file_path'], entry['filename'], entry['content_hash'])
+        error = None if s3_url else 'S3 upload failed'
+    except Exception as e:
+        s3_url, error = None, str(e)
+
+    if error:
+        if entry['attempts'] >= S3_OUTBOX_MAX_ATTEMPTS:
+            await _give_up(entry, error)
+            return
+        delay = retry_delay(entry['attempts'])
+        await fail_s3_upload(entry['id'], error, next_attempt_at=_utc_after(delay))
+        print(f"S3 upload {entry['id']}: attempt {entry['attempts']} failed, retrying in {delay:.1f}s: {error}")
+        return
+
+    if await complete_s3_upload(entry['id'], entry['record_id'], s3_url):
+        print(f"S3 upload {entry['id']}: stored record {entry['record_id']} at {s3_url}")
+    else:
+        print(f"S3 upload {entry['id']}: record {entry['record_id']} was deleted before its upload finished")
+        # Keys are content-addressed, so keep the object if the same PDF was uploaded again since
+        if await get_record_by_hash(entry['content_hash']) is None:
+            await asyncio.to_thread(delete_from_s3, s3_url)
+    discard_spooled([entry['file_path']])
+
+async def _worker_loop(index: int):
+    """Claim and run due uploads until cancelled"""
+    while True:
+        try:
+            entry = await claim_s3_upload(_utc_after(S3_OUTBOX_LEASE_SECONDS))
+        except Exception as e:
+            print(f"S3 uploader {index}: failed to claim an upload: {e}")
+            entry = None
+
+        if entry is None:
+            await asyncio.sleep(S3_OUTBOX_POLL_INTERVAL)
+            continue
+
+        try:
+            await _run_upload(entry)
+        except Exception as e:
+            # The lease expires and the upload is claimed again
+            print(f"S3 uploader {index}: error handling upload {entry['id']}: {e}")
+
+def start_s3_outbox_workers():
+    """Start the background S3 uploaders for this API worker"""
+    loop = asyncio.get_running_loop()
+    for index in range(S3_OUTBOX_WORKERS):
+        _tasks.append(loop.create_task(_worker_loop(index)))
+    print(f"Started {S3_OUTBOX_WORKERS} S3 uploaders (pid {os.getpid()})")
+
+async def stop_s3_outbox_workers():
+    """Cancel the background S3 uploaders; interrupted uploads are retried once their lease expires"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
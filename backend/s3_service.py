@@ -1,6 +1,11 @@
 import boto3
 import os
+import threading
 import uuid
+from contextlib import contextmanager
+from time import perf_counter
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 from dotenv import load_dotenv
 
@@ -11,33 +16,136 @@ AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME')
+# Alternative S3-compatible endpoint, e.g. a local MinIO or moto server for testing
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+
+# HTTP connections the S3 client of each process keeps open
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '10'))
+# botocore retry mode (legacy, standard or adaptive) and attempts per call
+S3_RETRY_MODE = os.getenv('S3_RETRY_MODE', 'standard')
+S3_MAX_ATTEMPTS = int(os.getenv('S3_MAX_ATTEMPTS', '3'))
+# Seconds to wait for a connection to S3 and for each response
+S3_CONNECT_TIMEOUT = float(os.getenv('S3_CONNECT_TIMEOUT', '5'))
+S3_READ_TIMEOUT = float(os.getenv('S3_READ_TIMEOUT', '30'))
+# Files above the threshold are uploaded in parts of the chunk size, several at
+# once; the default threshold keeps PDFs within MAX_UPLOAD_MB to a single PUT
+S3_MULTIPART_THRESHOLD = int(float(os.getenv('S3_MULTIPART_THRESHOLD_MB', '16')) * 1024 * 1024)
+S3_MULTIPART_CHUNKSIZE = int(float(os.getenv('S3_MULTIPART_CHUNKSIZE_MB', '8')) * 1024 * 1024)
+S3_MAX_CONCURRENCY = int(os.getenv('S3_MAX_CONCURRENCY', '4'))
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=S3_MAX_CONCURRENCY
+)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_call_stats = {}
+_stats_lock = threading.Lock()
 
 def get_s3_client():
-    """Get S3 client with credentials from environment variables"""
-    try:
-        if not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY:
-            print("AWS credentials not found in environment variables")
-            print(f"AWS_ACCESS_KEY_ID: {'Set' if AWS_ACCESS_KEY_ID else 'Not set'}")
-            print(f"AWS_SECRET_ACCESS_KEY: {'Set' if AWS_SECRET_ACCESS_KEY else 'Not set'}")
-            print(f"AWS_REGION: {AWS_REGION}")
-            return None
-        
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION
-        )
-        
-        print("AWS S3 client created successfully")
-        return s3_client
-        
-    except Exception as e:
-        print(f"Error creating S3 client: {e}")
+    """Get the S3 client of this process, creating it on first use
+
+    The client and its connection pool are shared by all threads. A client
+    inherited across fork is never reused, since its sockets belong to the
+    parent. Returns None when no credentials are configured.
+    """
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    if not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY:
+        print("AWS credentials not found in environment variables")
+        print(f"AWS_ACCESS_KEY_ID: {'Set' if AWS_ACCESS_KEY_ID else 'Not set'}")
+        print(f"AWS_SECRET_ACCESS_KEY: {'Set' if AWS_SECRET_ACCESS_KEY else 'Not set'}")
+        print(f"AWS_REGION: {AWS_REGION}")
         return None
 
-def upload_to_s3(file_path: str, original_filename: str) -> str:
-    """Upload file to S3 and return the URL"""
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            return _client
+        try:
+            # boto3's default session is not thread-safe, so use a private one
+            _client = boto3.session.Session().client(
+                's3',
+                aws_access_key_id=AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                region_name=AWS_REGION,
+                endpoint_url=S3_ENDPOINT_URL,
+                config=Config(
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                    retries={'mode': S3_RETRY_MODE, 'max_attempts': S3_MAX_ATTEMPTS},
+                    connect_timeout=S3_CONNECT_TIMEOUT,
+                    read_timeout=S3_READ_TIMEOUT
+                )
+            )
+            _client_pid = os.getpid()
+            print(f"AWS S3 client created successfully (pid {_client_pid})")
+            return _client
+        except Exception as e:
+            print(f"Error creating S3 client: {e}")
+            return None
+
+def s3_configured() -> bool:
+    """Whether credentials and a bucket are set, so uploads can succeed"""
+    return bool(AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY and S3_BUCKET_NAME)
+
+def close_s3_client():
+    """Close this process's S3 client; the next call creates a new one"""
+    global _client
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+
+@contextmanager
+def _timed(operation: str):
+    """Count an S3 operation and its duration in get_s3_stats()"""
+    start = perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        elapsed = perf_counter() - start
+        with _stats_lock:
+            stats = _call_stats.setdefault(operation, {'calls': 0, 'errors': 0, 'total': 0.0, 'max': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += failed
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+
+def get_s3_stats() -> dict:
+    """Calls, errors and durations of the S3 operations of this process"""
+    with _stats_lock:
+        operations = {
+            operation: {
+                'calls': stats['calls'],
+                'errors': stats['errors'],
+                'ms_total': round(stats['total'] * 1000, 2),
+                'ms_avg': round(stats['total'] * 1000 / stats['calls'], 2),
+                'ms_max': round(stats['max'] * 1000, 2)
+            }
+            for operation, stats in _call_stats.items()
+        }
+    return {
+        'client_ready': _client is not None and _client_pid == os.getpid(),
+        'max_pool_connections': S3_MAX_POOL_CONNECTIONS,
+        'retry_mode': S3_RETRY_MODE,
+        'max_attempts': S3_MAX_ATTEMPTS,
+        'operations': operations
+    }
+
+def upload_to_s3(file_path, original_filename: str, content_hash: str = None) -> str:
+    """Upload file to S3 and return the URL
+
+    ``file_path`` may also be a binary file object, which is streamed with
+    ``upload_fileobj`` instead of being read from disk. When the SHA-256
+    ``content_hash`` of the file is given, the object key is derived from it
+    so identical files always map to a single S3 object.
+    """
     s3_client = get_s3_client()
     if not s3_client:
         print("S3 client not available. Skipping upload.")
@@ -48,24 +156,28 @@ def upload_to_s3(file_path: str, original_filename: str) -> str:
         return None
     
     try:
-        # Generate unique filename to avoid conflicts
+        # Content-addressed key for known digests, otherwise a unique filename to avoid conflicts
         file_extension = original_filename.split('.')[-1]
-        unique_filename = f"text-extraction-pdf/{uuid.uuid4()}.{file_extension}"
+        object_name = content_hash or uuid.uuid4()
+        unique_filename = f"text-extraction-pdf/{object_name}.{file_extension}"
         
-        print(f"Attempting to upload {file_path} to S3 bucket {S3_BUCKET_NAME} as {unique_filename}")
+        print(f"Attempting to upload {original_filename} to S3 bucket {S3_BUCKET_NAME} as {unique_filename}")
         print(f"Using region: {AWS_REGION}")
         print(f"AWS credentials available: {bool(AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY)}")
         
+        extra_args = {
+            'ContentType': 'application/pdf',
+            'ContentDisposition': 'inline'
+        }
+        
         # Upload file using the same pattern as your working code
-        s3_client.upload_file(
-            file_path,
-            S3_BUCKET_NAME,
-            unique_filename,
-            ExtraArgs={
-                'ContentType': 'application/pdf',
-                'ContentDisposition': 'inline'
-            }
-        )
+        with _timed('upload'):
+            if isinstance(file_path, (str, os.PathLike)):
+                s3_client.upload_file(file_path, S3_BUCKET_NAME, unique_filename,
+                                      ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
+            else:
+                s3_client.upload_fileobj(file_path, S3_BUCKET_NAME, unique_filename,
+                                         ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
         
         print(f"Successfully uploaded to S3: {unique_filename}")
         
@@ -87,6 +199,27 @@ def upload_to_s3(file_path: str, original_filename: str) -> str:
         print(f"Unexpected error uploading to S3: {e}")
         return None
 
+def s3_key_from_url(s3_url: str) -> str:
+    """Object key of a URL returned by upload_to_s3"""
+    return s3_url.split(f"{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/")[-1]
+
+def download_from_s3(s3_url: str, s3_client=None) -> bytes:
+    """Download the object behind a URL returned by upload_to_s3
+
+    Unlike the other helpers this raises on failure, so callers can tell a
+    missing object from an empty one. Pass ``s3_client`` to reuse one client
+    across many downloads; by default the shared client is used.
+    """
+    s3_client = s3_client or get_s3_client()
+    if not s3_client:
+        raise RuntimeError("S3 client not available")
+    if not S3_BUCKET_NAME:
+        raise RuntimeError("S3 bucket name not configured")
+    
+    with _timed('download'):
+        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=s3_key_from_url(s3_url))
+        return response['Body'].read()
+
 def delete_from_s3(s3_url: str) -> bool:
     """Delete file from S3"""
     s3_client = get_s3_client()
@@ -97,14 +230,14 @@ def delete_from_s3(s3_url: str) -> bool:
         return False
     
     try:
-        # Extract key from URL
-        key = s3_url.split(f"{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/")[-1]
+        key = s3_key_from_url(s3_url)
         
         # Delete file
-        s3_client.delete_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=key
-        )
+        with _timed('delete'):
+            s3_client.delete_object(
+                Bucket=S3_BUCKET_NAME,
+                Key=key
+            )
         print(f"Successfully deleted from S3: {key}")
         return True
         
@@ -125,19 +258,19 @@ def get_s3_file_url(s3_url: str) -> str:
         return s3_url
     
     try:
-        # Extract key from URL
-        key = s3_url.split(f"{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/")[-1]
+        key = s3_key_from_url(s3_url)
         
         # Generate presigned URL using the same pattern as your working code
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': S3_BUCKET_NAME,
-                'Key': key,
-                'ResponseContentDisposition': 'inline'
-            },
-            ExpiresIn=3600
-        )
+        with _timed('presign'):
+            presigned_url = s3_client.generate_presigned_url(
+                'get_object',
+                Params={
+                    'Bucket': S3_BUCKET_NAME,
+                    'Key': key,
+                    'ResponseContentDisposition': 'inline'
+                },
+                ExpiresIn=3600
+            )
         return presigned_url
         
     except Exception as e:
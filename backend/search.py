@@ -0,0 +1,84 @@
+import math
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Search modes: whole words, word prefixes, or names similar to the query
+SEARCH_MODES = ('fulltext', 'prefix', 'fuzzy')
+# Words of a query that are searched for; the rest are ignored
+SEARCH_MAX_TERMS = int(os.getenv('SEARCH_MAX_TERMS', '8'))
+# Minimum word similarity (0-1) of a fuzzy match, as in pg_trgm's word_similarity
+SEARCH_FUZZY_THRESHOLD = float(os.getenv('SEARCH_FUZZY_THRESHOLD', '0.4'))
+# Trigram matches SQLite ranks before scoring the best of them for a fuzzy search
+SEARCH_FUZZY_CANDIDATES = int(os.getenv('SEARCH_FUZZY_CANDIDATES', '200'))
+# Word searches rank at most this many matches, the newest ones, so that
+# common words cost no more than rare ones
+SEARCH_RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', '1000'))
+
+def _words(text: str) -> list:
+    return re.findall(r'[^\W_]+', text.lower())
+
+def search_terms(query: str) -> list:
+    """Lowercase words of a query, split like both search indexes split text
+
+    Only letters and digits are kept, so the terms can be placed in FTS5 and
+    tsquery syntax without escaping.
+    """
+    return _words(query)[:SEARCH_MAX_TERMS]
+
+def fts5_query(terms, mode: str) -> str:
+    """FTS5 MATCH expression requiring every term, or every term as a prefix"""
+    suffix = '*' if mode == 'prefix' else ''
+    return ' '.join(f'"{term}"{suffix}' for term in terms)
+
+def tsquery(terms, mode: str) -> str:
+    """to_tsquery expression requiring every term, or every term as a prefix"""
+    suffix = ':*' if mode == 'prefix' else ''
+    return ' & '.join(f'{term}{suffix}' for term in terms)
+
+def trigrams(text: str) -> set:
+    """pg_trgm trigrams of text: each word padded with two spaces before and one after"""
+    result = set()
+    for word in _words(text):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+def fuzzy_candidate_trigrams(query_trigram_count: int, document_counts: dict) -> list:
+    """Query trigrams of which every fuzzy match contains at least one
+
+    ``document_counts`` maps the query's trigrams to the number of rows
+    containing them. A text reaching SEARCH_FUZZY_THRESHOLD shares at least
+    ``m = ceil(threshold * n)`` of the query's n trigrams, all of them
+    trigrams some row contains, so it contains one of any ``found - m + 1``
+    of those. Taking the rarest keeps the candidate rows few.
+    """
+    required = max(math.ceil(SEARCH_FUZZY_THRESHOLD * query_trigram_count - 1e-9), 1)
+    found = sorted((count, gram) for gram, count in document_counts.items() if count)
+    if len(found) < required:
+        return []
+    return [gram for _, gram in found[:len(found) - required + 1]]
+
+def fts5_any_query(grams) -> str:
+    """FTS5 MATCH expression for rows containing any of the trigrams"""
+    return ' OR '.join(f'"{gram}"' for gram in sorted(grams))
+
+def word_similarity(query: str, text: str) -> float:
+    """Similarity of ``query`` to the most similar run of words in ``text``
+
+    Mirrors pg_trgm's word_similarity: the share of the query's trigrams
+    found in the best matching extent of the text, where extents are runs of
+    up to as many consecutive words as the query has.
+    """
+    query_grams = trigrams(query)
+    if not query_grams:
+        return 0.0
+    words = _words(text or '')
+    width = len(_words(query))
+    best = 0
+    for start in range(len(words)):
+        for end in range(start + 1, min(start + width, len(words)) + 1):
+            best = max(best, len(query_grams & trigrams(' '.join(words[start:end]))))
+    return best / len(query_grams)
@@ -0,0 +1,64 @@
+"""
+Tests for re-extracting outdated records from their PDFs in S3.
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import database
+from backfill import Backfill
+from pdf_processor import EXTRACTOR_VERSION, process_sbc_pdf
+from s3_service import upload_to_s3
+
+def _store(name: str, data: bytes, extractor_version, **values) -> int:
+    """Upload a PDF and insert its record with the given stored results"""
+    s3_url = upload_to_s3(io.BytesIO(data), f'{name}.pdf', name) if data else None
+    record = {
+        'group_name': name, 'penalty_a': 'No', 'penalty_b': 'No', 'filename': f'{name}.pdf',
+        's3_url': s3_url, 'content_hash': name, 'extractor_version': extractor_version, **values
+    }
+    database.bulk_insert_records([record])
+    return database.get_record_by_hash(name)['id']
+
+def _run_backfill(**options) -> dict:
+    args = argparse.Namespace(download_concurrency=2, parse_workers=1, batch_size=2,
+                              limit=sys.maxsize, dry_run=False)
+    for name, value in options.items():
+        setattr(args, name, value)
+    return asyncio.run(Backfill(args).run())
+
+def test_backfill_rewrites_outdated_records(db, s3_bucket, make_sbc_pdf):
+    changed_pdf = make_sbc_pdf('Acme Delivery Company', 'Yes', 'No')
+    unchanged_pdf = make_sbc_pdf('Zeta Delivery Company', 'No', 'Yes')
+    expected = process_sbc_pdf(io.BytesIO(changed_pdf))
+    unchanged_result = process_sbc_pdf(io.BytesIO(unchanged_pdf))
+
+    changed_id = _store('changed', changed_pdf, 1)
+    unchanged_id = _store('unchanged', unchanged_pdf, None, group_name=unchanged_result['company_name'],
+                          penalty_a='No', penalty_b='Yes', plan_facts=unchanged_result['plan_facts'])
+    current_id = _store('current', changed_pdf, EXTRACTOR_VERSION)
+    no_pdf_id = _store('no-pdf', None, 1)
+
+    stats = _run_backfill()
+
+    assert (stats['checked'], stats['changed'], stats['unchanged'], stats['no_pdf'], stats['failed']) == (3, 1, 1, 1, 0)
+    changed = database.get_record_by_id(changed_id)
+    assert changed['extractor_version'] == EXTRACTOR_VERSION
+    assert (changed['group_name'], changed['penalty_a'], changed['penalty_b']) == (expected['company_name'], 'Yes', 'No')
+    assert changed['plan_facts'] == expected['plan_facts']
+    unchanged = database.get_record_by_id(unchanged_id)
+    assert unchanged['extractor_version'] == EXTRACTOR_VERSION and unchanged['penalty_b'] == 'Yes'
+    # Records of the current version, or without a stored PDF, are left alone
+    current = database.get_record_by_id(current_id)
+    assert (current['penalty_a'], current['group_name']) == ('No', 'current')
+    assert database.get_record_by_id(no_pdf_id)['extractor_version'] == 1
+
+    # Nothing is picked up twice
+    assert _run_backfill()['checked'] == 1
+
+def test_backfill_dry_run_writes_nothing(db, s3_bucket, make_sbc_pdf):
+    record_id = _store('changed', make_sbc_pdf(), 1)
+    assert _run_backfill(dry_run=True)['changed'] == 1
+    record = database.get_record_by_id(record_id)
+    assert (record['penalty_a'], record['extractor_version']) == ('No', 1)
@@ -0,0 +1,87 @@
+"""
+Tests for the NDJSON batch upload endpoint.
+"""
+
+import asyncio
+import io
+import json
+import os
+import tempfile
+import zipfile
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+import app as app_module
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    """Directory the spooled batch files are written to"""
+    path = tmp_path / 'spool'
+    path.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(path))
+    return path
+
+def _zip(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def test_batch_streams_a_line_per_file_and_a_summary(db, extraction_pool, spool_dir, make_sbc_pdf):
+    files = [
+        ('files', ('notes.txt', b'not a plan', 'text/plain')),
+        ('files', ('acme.pdf', make_sbc_pdf('Acme Delivery Company'), 'application/pdf')),
+        ('files', ('broken.pdf', b'not a pdf', 'application/pdf')),
+        ('files', ('plans.zip', _zip({'nested/zeta.pdf': make_sbc_pdf('Zeta Delivery Company', 'No', 'Yes')}),
+                   'application/zip')),
+    ]
+    response = TestClient(app_module.app).post('/api/upload/batch', files=files)
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Rejected files come first, the summary last
+    assert lines[0]['filename'] == 'notes.txt' and not lines[0]['success']
+    assert lines[-1] == {'done': True, 'total': 4, 'succeeded': 2, 'failed': 2}
+    results = {line['filename']: line for line in lines[1:-1]}
+    assert set(results) == {'acme.pdf', 'broken.pdf', 'zeta.pdf'}
+    assert results['acme.pdf']['success'] and results['acme.pdf']['data']['penalty_a'] == 'Yes'
+    assert results['zeta.pdf']['success'] and results['zeta.pdf']['data']['penalty_b'] == 'Yes'
+    assert not results['broken.pdf']['success'] and results['broken.pdf']['error'].startswith('Error processing file')
+    assert os.listdir(spool_dir) == []
+
+def test_batch_rejects_oversized_archive(db, spool_dir, monkeypatch, make_sbc_pdf):
+    archive = _zip({'acme.pdf': make_sbc_pdf()})
+    monkeypatch.setattr(app_module, 'MAX_ZIP_UPLOAD_BYTES', len(archive) - 1)
+    response = TestClient(app_module.app).post('/api/upload/batch', files=[('files', ('plans.zip', archive, 'application/zip'))])
+    assert response.status_code == 413
+    assert os.listdir(spool_dir) == []
+
+def test_batch_files_removed_when_client_disconnects(db, extraction_pool, spool_dir, make_sbc_pdf):
+    uploads = [UploadFile(io.BytesIO(b'not a plan'), filename='notes.txt')]
+    uploads += [UploadFile(io.BytesIO(make_sbc_pdf(f'Plan {index} Company')), filename=f'plan-{index}.pdf')
+                for index in range(6)]
+
+    async def disconnect_after_first_line():
+        response = await app_module.upload_batch(files=uploads, backend=None)
+        assert len(os.listdir(spool_dir)) == 6
+        sent = []
+        first_line = asyncio.Event()
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body'):
+                first_line.set()
+
+        async def receive():
+            await first_line.wait()
+            return {'type': 'http.disconnect'}
+
+        await response({'type': 'http'}, receive, send)
+        return [message['body'] for message in sent if message.get('body')]
+
+    bodies = asyncio.run(disconnect_after_first_line())
+    assert json.loads(bodies[0])['filename'] == 'notes.txt'
+    assert not any(b'"done"' in body for body in bodies)
+    assert os.listdir(spool_dir) == []
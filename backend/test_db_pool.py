@@ -0,0 +1,30 @@
+"""
+Tests for the per-worker database connection pool.
+"""
+
+import pytest
+import database
+from db_pool import ConnectionPool, PoolTimeout
+
+def test_connection_released_when_query_fails(sqlite_db):
+    with pytest.raises(Exception):
+        database.get_record_by_id(1)  # no tables yet
+    assert database.get_db_pool_stats()['in_use'] == 0
+
+    database.init_db()
+    record_id = database.insert_record('Acme', 'Yes', 'No', 'acme.pdf', content_hash='a')
+    assert database.get_record_by_id(record_id)['group_name'] == 'Acme'
+    assert database.get_db_pool_stats()['in_use'] == 0
+
+def test_pool_reuses_released_connections(tmp_path):
+    pool = ConnectionPool(lambda: database.PooledSqliteConnection(str(tmp_path / 'pool.db'), check_same_thread=False),
+                          min_size=1, max_size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    conn.close()
+    assert pool.acquire() is conn
+    assert pool.stats()['in_use'] == 1
+    conn.close()
+    assert pool.stats()['in_use'] == 0
+    pool.close()
@@ -0,0 +1,65 @@
+"""
+Tests for the streamed CSV and JSON Lines export of records.
+"""
+
+import csv
+import gzip
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+import app as app_module
+import database
+
+AWKWARD_NAME = 'Smith, "Jones" & Co.\nLine two'
+FACTS = {'plan_type': 'PPO', 'note': 'comma, "quote"\nnewline'}
+
+@pytest.fixture
+def records(db, monkeypatch):
+    # Several batches for a handful of records
+    monkeypatch.setattr(app_module, 'EXPORT_BATCH_SIZE', 2)
+    database.insert_record(AWKWARD_NAME, 'Yes', 'No', 'smith.pdf', content_hash='s', plan_facts=FACTS)
+    for index in range(4):
+        database.insert_record(f'Plan {index}', 'No', 'No', f'plan{index}.pdf', content_hash=str(index))
+    return [record for batch in database.iter_record_batches() for record in batch]
+
+def test_csv_export(records):
+    response = TestClient(app_module.app).get('/api/records/export')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'text/csv; charset=utf-8'
+    assert 'sbc_records.csv' in response.headers['content-disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.content.decode('utf-8'), newline='')))
+    assert [int(row['id']) for row in rows] == [record['id'] for record in records]
+    assert rows[0]['group_name'] == AWKWARD_NAME
+    assert json.loads(rows[0]['plan_facts']) == FACTS
+    # Missing values are empty fields
+    assert rows[1]['plan_facts'] == '' and rows[1]['s3_url'] == ''
+
+def test_jsonl_export_with_fields(records):
+    response = TestClient(app_module.app).get('/api/records/export', params={'format': 'jsonl', 'fields': 'group_name,plan_facts'})
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = response.content.decode('utf-8').splitlines()
+    assert len(lines) == len(records)
+    first = json.loads(lines[0])
+    assert first == {'group_name': AWKWARD_NAME, 'plan_facts': FACTS}
+    assert json.loads(lines[-1])['plan_facts'] is None
+
+def test_gzip_export(records):
+    response = TestClient(app_module.app).get('/api/records/export', params={'format': 'jsonl', 'gzip': 'true'})
+    assert response.headers['content-type'] == 'application/gzip'
+    lines = gzip.decompress(response.content).decode('utf-8').splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [record['id'] for record in records]
+
+def test_export_returns_pooled_connections_between_batches(records, monkeypatch):
+    monkeypatch.setattr(database, 'DB_POOL_MAX_SIZE', 1)
+    monkeypatch.setattr(database, 'DB_POOL_TIMEOUT', 0.05)
+    database.close_db_pool()
+    database._pool = None
+
+    batches = database.iter_record_batches(batch_size=2)
+    assert len(next(batches)) == 2
+    # The only connection is free for other requests while the export waits
+    assert database.get_db_pool_stats()['in_use'] == 0
+    assert database.get_record_by_id(records[-1]['id'])['group_name'] == 'Plan 3'
+    assert sum(len(batch) for batch in batches) == len(records) - 2
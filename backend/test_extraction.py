@@ -0,0 +1,109 @@
+"""
+Tests for reading documents in the targeted, stream and full extraction modes.
+
+PDFs are replaced by in-memory pages. Run with ``python -m pytest -q`` from
+the repository root.
+"""
+
+import re
+import pytest
+from pdf_processor import PAGE_SCAN_OVERLAP, _read_document, extract_plan_facts, scan_coverage_answers
+from text_backends import TextDocument
+
+class PagesDocument(TextDocument):
+    """A document whose page texts are given, with the question block found by its labels"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.page_count = len(pages)
+
+    def page_text(self, index: int) -> str:
+        return self.pages[index]
+
+    def region_text(self, index, labels, padding):
+        text = self.pages[index]
+        return text if any(re.search(label, text, re.IGNORECASE) for label in labels) else None
+
+HEADER = "Acme Delivery Company Employee Benefits Plan\nCoverage Period: 01/01/2025 - 12/31/2025\nIndemnity plan\n"
+IMPORTANT_QUESTIONS = (
+    "What is the overall deductible? $1,500 individual / $3,000 family deductible.\n"
+    "What is the out-of-pocket limit for this plan? out-of-pocket $6,000 individual $12,000 family\n"
+    "Common Medical Event\n"
+)
+QUESTIONS = (
+    "Does this plan provide Minimum Essential Coverage? Yes\n"
+    "Does this plan meet the Minimum Value Standards? No\n"
+)
+FILLER = "Services you may need. What you will pay. Limitations and exceptions.\n" * 40
+
+def _read(pages, mode):
+    extracted = _read_document(PagesDocument(pages), mode)
+    return extracted['answers'], extract_plan_facts(extracted['context']), extracted['pages_parsed']
+
+def _assert_modes_agree(pages, modes=('stream', 'targeted')):
+    full_answers, full_facts, _ = _read(pages, 'full')
+    for mode in modes:
+        answers, facts, _ = _read(pages, mode)
+        assert answers == full_answers, mode
+        assert facts == full_facts, mode
+    return full_answers, full_facts
+
+def test_modes_agree_on_standard_layout():
+    answers, facts = _assert_modes_agree([HEADER, IMPORTANT_QUESTIONS, FILLER, FILLER, QUESTIONS])
+    assert (answers['essential_coverage'], answers['essential_coverage_rule']) == ('Yes', 'mec_full_question')
+    assert (answers['value_standards'], answers['value_standards_rule']) == ('No', 'mv_full_question')
+    assert facts['deductible_individual'] == '$1,500'
+    assert facts['oop_limit'] == '$6,000 individual / $12,000 family'
+
+def test_stream_does_not_stop_on_lower_priority_answers():
+    """A label answer early on must not hide the full question on a later page"""
+    early = "Essential Coverage: No\nValue Standards: Yes\n"
+    pages = [HEADER, IMPORTANT_QUESTIONS + early, FILLER, FILLER, QUESTIONS]
+    answers, _ = _assert_modes_agree(pages)
+    assert answers['essential_coverage'] == 'Yes'
+    assert answers['value_standards'] == 'No'
+
+def test_answer_split_across_pages():
+    # Targeted mode reads the question block at the end, which answers differently here
+    pages = [HEADER, FILLER + "Does this plan provide Minimum Essential", "Coverage? No\n" + FILLER, QUESTIONS]
+    answers, _ = _assert_modes_agree(pages, modes=('stream',))
+    assert answers['essential_coverage'] == 'No'
+
+@pytest.mark.parametrize('label, plan_type', [
+    ('Indemnity', 'Indemnity Plan'),
+    ('PPO', 'PPO Plan'),
+    ('HMO', 'HMO Plan'),
+    ('HDHP', 'High Deductible Health Plan'),
+])
+def test_stream_stops_once_nothing_can_change(label, plan_type):
+    # The answers settle once PAGE_SCAN_OVERLAP characters follow them, on the third page
+    pages = [HEADER.replace('Indemnity', label), IMPORTANT_QUESTIONS + QUESTIONS] + [FILLER] * 8
+    _, facts = _assert_modes_agree(pages)
+    assert facts['plan_type'] == plan_type
+    assert _read(pages, 'stream')[2] == 3
+
+def test_targeted_stops_after_fact_sections():
+    """Targeted mode reads the question block, then the pages up to the end of the fact sections"""
+    # No deductible rule but the top one settles early, so stream mode reads every page
+    important_questions = IMPORTANT_QUESTIONS.replace(" family deductible.", " family.")
+    pages = [HEADER.replace('Indemnity', 'PPO'), important_questions, FILLER, FILLER, FILLER, QUESTIONS]
+    _, facts = _assert_modes_agree(pages)
+    assert facts['deductible_individual'] == '$1,500'
+    assert _read(pages, 'stream')[2] == len(pages)
+    assert _read(pages, 'targeted')[2] == 2
+
+def test_plan_type_prefers_header():
+    """The plan type named in the header wins; without one the top rule anywhere does"""
+    pages = [HEADER.replace('Indemnity', 'PPO'), IMPORTANT_QUESTIONS + QUESTIONS, FILLER, "indemnity coverage\n"]
+    _, facts = _assert_modes_agree(pages)
+    assert facts['plan_type'] == 'PPO Plan'
+
+    pages = [HEADER.replace('Indemnity plan\n', ''), IMPORTANT_QUESTIONS + QUESTIONS, "hmo network\n", "indemnity coverage\n"]
+    _, facts = _assert_modes_agree(pages, modes=('stream',))
+    assert facts['plan_type'] == 'Indemnity Plan'
+
+def test_scan_matches_joined_text_when_fed_by_page():
+    text = FILLER * 3 + "Essential Coverage: Yes\n" + FILLER + QUESTIONS
+    assert len(text) > 2 * PAGE_SCAN_OVERLAP
+    pages = [text[i:i + 700] for i in range(0, len(text), 700)]
+    assert _read(pages, 'stream')[0] == scan_coverage_answers(text)
@@ -0,0 +1,93 @@
+"""
+Tests for the background upload jobs: claiming, outcomes, retries and stale jobs.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+import pytest
+import database
+import jobs
+from upload_service import SpooledUpload
+
+@pytest.fixture
+def job_spool(tmp_path, monkeypatch):
+    path = tmp_path / 'jobs'
+    monkeypatch.setattr(jobs, 'JOB_SPOOL_DIR', str(path))
+    return path
+
+def _enqueue(data: bytes, filename: str = 'plan.pdf') -> int:
+    upload = SpooledUpload()
+    upload.write(data)
+    with upload.finish():
+        return asyncio.run(jobs.enqueue_upload(filename, upload))
+
+def _claim(stale_after: float = 0, max_attempts: int = jobs.JOB_MAX_ATTEMPTS):
+    """Claim the next job as if ``stale_after`` seconds had passed"""
+    return database.claim_next_job(jobs._utc_after(stale_after - jobs.JOB_STALE_SECONDS), max_attempts)
+
+def _seconds_until(timestamp: str) -> float:
+    return (datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S') - datetime.utcnow()).total_seconds()
+
+def test_job_succeeds(db, extraction_pool, job_spool, make_sbc_pdf):
+    job_id = _enqueue(make_sbc_pdf())
+    job = database.get_job(job_id)
+    assert job['status'] == 'queued' and os.path.exists(job['file_path'])
+
+    claimed = _claim()
+    assert (claimed['id'], claimed['status'], claimed['attempts']) == (job_id, 'running', 1)
+    assert _claim() is None
+
+    asyncio.run(jobs._run_job(claimed))
+    job = database.get_job(job_id)
+    assert job['status'] == 'succeeded' and job['finished_at']
+    assert database.get_record_by_id(job['record_id'])['filename'] == 'plan.pdf'
+    assert os.listdir(job_spool) == []
+
+def test_job_fails_on_unreadable_pdf(db, extraction_pool, job_spool):
+    job_id = _enqueue(b'not a pdf')
+    asyncio.run(jobs._run_job(_claim()))
+    job = database.get_job(job_id)
+    assert job['status'] == 'failed' and job['error'].startswith('Error processing file')
+    assert job['record_id'] is None
+    assert os.listdir(job_spool) == []
+
+def test_job_retried_with_backoff_after_unexpected_error(db, job_spool, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_RETRY_BASE_SECONDS', 10)
+    monkeypatch.setattr(jobs, 'JOB_MAX_ATTEMPTS', 3)
+    job_id = _enqueue(b'%PDF')
+    # A spooled file that cannot be opened is an unexpected error, not a bad upload
+    os.unlink(database.get_job(job_id)['file_path'])
+
+    for attempt, delay in ((1, 10), (2, 20)):
+        claimed = _claim()
+        assert claimed['attempts'] == attempt
+        asyncio.run(jobs._run_job(claimed))
+        job = database.get_job(job_id)
+        assert job['status'] == 'queued' and job['error'] and job['finished_at'] is None
+        assert delay - 2 <= _seconds_until(job['retry_at']) <= delay
+        # Not runnable again until the retry time
+        assert _claim() is None
+        conn = database.get_db_connection()
+        conn.execute("UPDATE extraction_jobs SET retry_at = ? WHERE id = ?", (jobs._utc_after(-1), job_id))
+        conn.commit()
+        conn.close()
+
+    asyncio.run(jobs._run_job(_claim()))
+    job = database.get_job(job_id)
+    assert (job['status'], job['attempts'], job['retry_at']) == ('failed', 3, None)
+
+def test_stale_job_reclaimed_then_failed(db, job_spool):
+    job_id = _enqueue(b'%PDF')
+    assert _claim(max_attempts=2)['attempts'] == 1
+
+    # The worker stopped without a heartbeat: another worker takes the job over
+    assert _claim(stale_after=5, max_attempts=2) is None
+    reclaimed = _claim(stale_after=jobs.JOB_STALE_SECONDS + 5, max_attempts=2)
+    assert (reclaimed['id'], reclaimed['attempts']) == (job_id, 2)
+
+    # Out of attempts: the job fails and its spooled file is removed
+    assert _claim(stale_after=jobs.JOB_STALE_SECONDS + 5, max_attempts=2) is None
+    job = database.get_job(job_id)
+    assert job['status'] == 'failed' and job['error'] == 'Worker stopped while processing the job'
+    assert os.listdir(job_spool) == []
@@ -0,0 +1,57 @@
+"""
+Tests for the versioned schema migrations.
+"""
+
+import sqlite3
+import database
+import migrations
+
+def test_migrations_apply_once(sqlite_db):
+    assert database.init_db() == [version for version, _, _ in migrations.MIGRATIONS]
+    assert database.init_db() == []
+    conn = database.get_db_connection()
+    try:
+        assert all(migration['applied_at'] for migration in migrations.migration_status(conn))
+    finally:
+        conn.close()
+
+def test_migrations_upgrade_unversioned_database(sqlite_db):
+    """A table created by init_db before migrations gains the later columns and keeps its rows"""
+    conn = sqlite3.connect(sqlite_db / 'sbc_records.db')
+    conn.execute('''
+        CREATE TABLE sbc_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_name TEXT NOT NULL,
+            upload_date TEXT NOT NULL,
+            penalty_a TEXT NOT NULL,
+            penalty_b TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            s3_url TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("""
+        INSERT INTO sbc_records (group_name, upload_date, penalty_a, penalty_b, filename)
+        VALUES ('Acme Health', '2024-05-01', 'Yes', 'No', 'acme.pdf')
+    """)
+    conn.commit()
+    conn.close()
+
+    assert database.init_db() == [version for version, _, _ in migrations.MIGRATIONS]
+    record = database.get_record_by_id(1)
+    assert (record['group_name'], record['penalty_a'], record['content_hash']) == ('Acme Health', 'Yes', None)
+    assert [r['group_name'] for r in database.search_records('acme')] == ['Acme Health']
+    assert database.insert_record('Zeta Care', 'No', 'No', 'zeta.pdf', content_hash='z') == 2
+
+def test_migrations_upgrade_existing_database(sqlite_db, monkeypatch):
+    """Records written before the search word-splitting migration are found after it"""
+    all_migrations = migrations.MIGRATIONS
+    monkeypatch.setattr(migrations, 'MIGRATIONS', all_migrations[:8])
+    monkeypatch.setattr(migrations, 'LATEST_VERSION', 8)
+    database.init_db()
+    database.insert_record('Plan (XYZ) Trust', 'Yes', 'No', 'plan.pdf', content_hash='p')
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', all_migrations)
+    monkeypatch.setattr(migrations, 'LATEST_VERSION', all_migrations[-1][0])
+    assert database.init_db() == [9]
+    assert [r['group_name'] for r in database.search_records('xyz', mode='fuzzy')] == ['Plan (XYZ) Trust']
@@ -0,0 +1,82 @@
+"""
+Tests for the record_stats summary that triggers keep current.
+"""
+
+import random
+from fastapi.testclient import TestClient
+import database
+from app import app
+
+PLAN_TYPES = ('PPO', 'HMO', None)
+ANSWERS = ('Yes', 'No')
+
+def _random_values(rng) -> dict:
+    plan_type = rng.choice(PLAN_TYPES)
+    return {
+        'upload_date': f'2025-03-0{rng.randint(1, 3)}',
+        'penalty_a': rng.choice(ANSWERS),
+        'penalty_b': rng.choice(ANSWERS),
+        'plan_facts': {'plan_type': plan_type} if plan_type else None,
+    }
+
+def _summary_rows() -> tuple:
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT upload_date, plan_type, penalty_a, penalty_b, records FROM record_stats
+            WHERE records > 0 ORDER BY 1, 2, 3, 4
+        ''')
+        summary = cursor.fetchall()
+        cursor.execute('''
+            SELECT upload_date, coalesce(json_extract(plan_facts, '$.plan_type'), ''), penalty_a, penalty_b, COUNT(*)
+            FROM sbc_records GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 3, 4
+        ''')
+        return summary, cursor.fetchall()
+    finally:
+        conn.close()
+
+def test_summary_follows_inserts_updates_and_deletes(db):
+    rng = random.Random(7)
+    database.bulk_insert_records(
+        {'group_name': f'Plan {index}', 'filename': f'plan{index}.pdf', 'content_hash': str(index), **_random_values(rng)}
+        for index in range(60)
+    )
+    database.insert_record('Single', 'Yes', 'No', 'single.pdf', content_hash='single', plan_facts={'plan_type': 'HMO'})
+    summary, grouped = _summary_rows()
+    assert summary == grouped
+
+    ids = [record['id'] for batch in database.iter_record_batches(('id',)) for record in batch]
+    # Answer updates, as the backfill writes them, and moves between dates and plan types
+    database.bulk_update_records(
+        [{'id': record_id, **_random_values(rng)} for record_id in rng.sample(ids, 30)],
+        ('upload_date', 'penalty_a', 'penalty_b', 'plan_facts')
+    )
+    database.bulk_update_records([{'id': record_id, 'penalty_b': 'Yes'} for record_id in ids[:10]], ('penalty_b',))
+    for record_id in rng.sample(ids, 15):
+        database.delete_record(record_id)
+    summary, grouped = _summary_rows()
+    assert summary == grouped
+
+    stats = database.get_record_stats(group_by=('upload_date', 'plan_type'))
+    assert stats['total'] == sum(row[4] for row in grouped) == len(ids) - 15
+    assert stats['penalty_a'] == {
+        answer: sum(row[4] for row in grouped if row[2] == answer) for answer in ANSWERS
+        if any(row[2] == answer for row in grouped)
+    }
+    assert sorted(
+        (group['upload_date'], group['plan_type'] or '', group['total']) for group in stats['groups']
+    ) == sorted(
+        (upload_date, plan_type, sum(row[4] for row in grouped if row[:2] == (upload_date, plan_type)))
+        for upload_date, plan_type in {row[:2] for row in grouped}
+    )
+
+def test_stats_endpoint(db):
+    database.insert_record('Acme', 'Yes', 'No', 'acme.pdf', content_hash='a', plan_facts={'plan_type': 'PPO'})
+    database.insert_record('Zeta', 'No', 'No', 'zeta.pdf', content_hash='z')
+    client = TestClient(app)
+
+    stats = client.get('/api/records/stats', params={'group_by': 'plan_type'}).json()
+    assert (stats['total'], stats['penalty_a'], stats['penalty_b']) == (2, {'No': 1, 'Yes': 1}, {'No': 2})
+    assert [(group['plan_type'], group['total']) for group in stats['groups']] == [(None, 1), ('PPO', 1)]
+    assert client.get('/api/records/stats', params={'group_by': 'group_name'}).status_code == 400
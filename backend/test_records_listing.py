@@ -0,0 +1,79 @@
+"""
+Tests for the keyset-paginated /api/records listing.
+"""
+
+import base64
+import pytest
+from fastapi.testclient import TestClient
+import database
+from app import app
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+def _insert(group_name, penalty_a='Yes', penalty_b='No', upload_date='2025-01-15', created_at='2025-01-15 10:00:00'):
+    record_id = database.insert_record(group_name, penalty_a, penalty_b, f'{group_name}.pdf', content_hash=group_name)
+    conn = database.get_db_connection()
+    conn.execute('UPDATE sbc_records SET upload_date = ?, created_at = ? WHERE id = ?',
+                 (upload_date, created_at, record_id))
+    conn.commit()
+    conn.close()
+    return record_id
+
+def _all_pages(client, **params):
+    """Follow next_cursor through every page and return the records"""
+    records, cursor = [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        page = client.get('/api/records', params=query).json()
+        records.extend(page['records'])
+        assert page['has_more'] == (page['next_cursor'] is not None)
+        if not page['has_more']:
+            return records
+        cursor = page['next_cursor']
+
+def test_pages_through_equal_created_at(client):
+    # Every record shares one timestamp, so only the id orders them
+    ids = [_insert(f'Plan {index}') for index in range(7)]
+    records = _all_pages(client, limit=3)
+    assert [record['id'] for record in records] == sorted(ids, reverse=True)
+
+def test_filters_combine_with_cursor(client):
+    expected = []
+    for index in range(6):
+        # Newest first: later timestamps are listed earlier
+        created_at = f'2025-02-0{index + 1} 09:00:00'
+        expected.append(_insert(f'Acme {index}', penalty_a='Yes', upload_date=created_at[:10], created_at=created_at))
+        _insert(f'Acme No {index}', penalty_a='No', upload_date=created_at[:10], created_at=created_at)
+        _insert(f'Zeta {index}', penalty_a='Yes', upload_date=created_at[:10], created_at=created_at)
+    _insert('Acme early', penalty_a='Yes', upload_date='2025-01-01', created_at='2025-01-01 09:00:00')
+
+    records = _all_pages(client, limit=2, penalty_a='Yes', group_name='acme', date_from='2025-02-01')
+    assert [record['id'] for record in records] == expected[::-1]
+
+def test_group_name_filter_matches_literally(client):
+    _insert('A_C Health')
+    _insert('ABC Health')
+    _insert('100% Care')
+    assert [r['group_name'] for r in _all_pages(client, group_name='a_c')] == ['A_C Health']
+    assert [r['group_name'] for r in _all_pages(client, group_name='0%')] == ['100% Care']
+
+def test_fields_projection(client):
+    _insert('Acme')
+    records = client.get('/api/records', params={'fields': 'group_name,penalty_a'}).json()['records']
+    assert set(records[0]) == {'id', 'created_at', 'group_name', 'penalty_a'}
+
+    response = client.get('/api/records', params={'fields': 'group_name,password'})
+    assert response.status_code == 400
+    assert 'Unknown fields: password' in response.json()['detail']
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    base64.urlsafe_b64encode(b'{"created_at": 1}').decode(),
+    base64.urlsafe_b64encode(b'["2025-01-01 00:00:00", "7"]').decode(),
+])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get('/api/records', params={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Invalid cursor'
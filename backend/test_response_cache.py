@@ -0,0 +1,70 @@
+"""
+Tests for conditional GETs and the response cache of the records listing.
+"""
+
+import time
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+import database
+from app import app
+from response_cache import http_date, is_not_modified, make_etag, version_datetime
+
+VERSION = 1_700_000_000_250_000_000  # 2023-11-14 22:13:20.25 UTC
+ETAG = make_etag(VERSION, 'limit=50')
+LAST_MODIFIED = http_date(VERSION)
+
+def _later(seconds: float) -> datetime:
+    return version_datetime(VERSION) + timedelta(seconds=seconds)
+
+def test_etag_takes_precedence():
+    assert is_not_modified(ETAG, VERSION, ETAG, None)
+    assert is_not_modified(ETAG, VERSION, f'"other", W/{ETAG}', None)
+    assert is_not_modified(ETAG, VERSION, '*', None)
+    # A stale ETag is not rescued by a matching date
+    assert not is_not_modified(ETAG, VERSION, make_etag(VERSION - 1, 'limit=50'), LAST_MODIFIED, now=_later(60))
+
+def test_date_alone_waits_for_the_second_to_pass():
+    assert not is_not_modified(ETAG, VERSION, None, LAST_MODIFIED, now=_later(0.5))
+    assert is_not_modified(ETAG, VERSION, None, LAST_MODIFIED, now=_later(1))
+    assert is_not_modified(ETAG, VERSION, None, http_date(VERSION + 5_000_000_000), now=_later(60))
+    assert not is_not_modified(ETAG, VERSION, None, http_date(VERSION - 1_000_000_000), now=_later(60))
+    assert not is_not_modified(ETAG, VERSION, None, 'not a date', now=_later(60))
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+def _set_version(version: int):
+    conn = database.get_db_connection()
+    conn.execute('UPDATE records_version SET version = ?', (version,))
+    conn.commit()
+    conn.close()
+
+def test_listing_revalidates_until_a_write(client):
+    database.insert_record('Acme', 'Yes', 'No', 'acme.pdf', content_hash='a')
+    # Pretend the last change was a minute ago, so Last-Modified is sent
+    _set_version(time.time_ns() - 60_000_000_000)
+
+    first = client.get('/api/records')
+    assert first.status_code == 200
+    etag, last_modified = first.headers['etag'], first.headers['last-modified']
+    assert client.get('/api/records', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/records', headers={'If-Modified-Since': last_modified}).status_code == 304
+    # The ETag depends on the query
+    assert client.get('/api/records', params={'limit': 1}, headers={'If-None-Match': etag}).status_code == 200
+
+    database.insert_record('Zeta', 'No', 'No', 'zeta.pdf', content_hash='z')
+    for headers in ({'If-None-Match': etag}, {'If-Modified-Since': last_modified}):
+        response = client.get('/api/records', headers=headers)
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+        assert [record['group_name'] for record in response.json()['records']] == ['Zeta', 'Acme']
+
+def test_last_modified_left_out_until_the_second_of_a_change_passed(client):
+    # A change stamped a few seconds ahead stays in its second for the whole request
+    _set_version(time.time_ns() + 5_000_000_000)
+    response = client.get('/api/records')
+    assert response.status_code == 200
+    assert 'last-modified' not in response.headers
+    assert client.get('/api/records', headers={'If-None-Match': response.headers['etag']}).status_code == 304
@@ -0,0 +1,122 @@
+"""
+Tests for the S3 upload outbox: uploads, retries, dropped records and spooled files.
+"""
+
+import asyncio
+import os
+import pytest
+import database
+import s3_outbox
+import s3_service
+from s3_service import download_from_s3, get_s3_client
+from upload_service import SpooledUpload
+
+@pytest.fixture
+def outbox_dir(tmp_path, monkeypatch):
+    path = tmp_path / 'outbox'
+    monkeypatch.setattr(s3_outbox, 'S3_OUTBOX_DIR', str(path))
+    return path
+
+def _queue(name: str, data: bytes = b'%PDF-1.4 plan') -> int:
+    """Insert a record with its PDF queued for upload, as a synchronous upload does"""
+    upload = SpooledUpload()
+    upload.write(data)
+    with upload.finish():
+        path = s3_outbox.spool_for_s3(upload)
+    return database.insert_record(name, 'Yes', 'No', f'{name}.pdf', content_hash=name, s3_outbox_path=path)
+
+def _claim():
+    return database.claim_s3_upload(s3_outbox._utc_after(s3_outbox.S3_OUTBOX_LEASE_SECONDS))
+
+def _outbox_rows() -> list:
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, attempts, error, next_attempt_at FROM s3_outbox')
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+def _make_due():
+    conn = database.get_db_connection()
+    conn.execute('UPDATE s3_outbox SET next_attempt_at = ?', (s3_outbox._utc_after(-1),))
+    conn.commit()
+    conn.close()
+
+def _bucket_keys(bucket) -> list:
+    return [item['Key'] for item in get_s3_client().list_objects_v2(Bucket=bucket).get('Contents', [])]
+
+def test_upload_stores_url_and_removes_spooled_file(db, s3_bucket, outbox_dir):
+    record_id = _queue('acme')
+    assert database.get_record_by_id(record_id)['s3_url'] is None
+    assert len(os.listdir(outbox_dir)) == 1
+
+    entry = _claim()
+    assert (entry['record_id'], entry['attempts']) == (record_id, 1)
+    assert _claim() is None
+    asyncio.run(s3_outbox._run_upload(entry))
+
+    s3_url = database.get_record_by_id(record_id)['s3_url']
+    assert download_from_s3(s3_url) == b'%PDF-1.4 plan'
+    assert _outbox_rows() == []
+    assert os.listdir(outbox_dir) == []
+
+def test_failed_upload_retried_later(db, s3_bucket, outbox_dir, monkeypatch):
+    record_id = _queue('acme')
+    # Uploads fail while the bucket does not exist
+    monkeypatch.setattr(s3_service, 'S3_BUCKET_NAME', 'missing-bucket')
+    asyncio.run(s3_outbox._run_upload(_claim()))
+
+    [(status, attempts, error, next_attempt_at)] = _outbox_rows()
+    assert (status, attempts, error) == ('pending', 1, 'S3 upload failed')
+    assert str(next_attempt_at) > s3_outbox._utc_after(0)
+    assert _claim() is None
+    assert len(os.listdir(outbox_dir)) == 1
+
+    monkeypatch.setattr(s3_service, 'S3_BUCKET_NAME', s3_bucket)
+    _make_due()
+    entry = _claim()
+    assert entry['attempts'] == 2
+    asyncio.run(s3_outbox._run_upload(entry))
+    assert database.get_record_by_id(record_id)['s3_url']
+    assert _outbox_rows() == [] and os.listdir(outbox_dir) == []
+
+def test_upload_given_up_after_max_attempts(db, s3_bucket, outbox_dir, monkeypatch):
+    record_id = _queue('acme')
+    monkeypatch.setattr(s3_service, 'S3_BUCKET_NAME', 'missing-bucket')
+    monkeypatch.setattr(s3_outbox, 'S3_OUTBOX_MAX_ATTEMPTS', 1)
+    asyncio.run(s3_outbox._run_upload(_claim()))
+
+    [(status, attempts, error, _)] = _outbox_rows()
+    assert (status, attempts, error) == ('failed', 1, 'S3 upload failed')
+    assert database.get_record_by_id(record_id)['s3_url'] is None
+    assert os.listdir(outbox_dir) == []
+
+def test_upload_of_deleted_record_dropped(db, s3_bucket, outbox_dir):
+    record_id = _queue('acme')
+    entry = _claim()
+    # The record is deleted while its upload is running
+    database.delete_record(record_id)
+    asyncio.run(s3_outbox._run_upload(entry))
+
+    assert _bucket_keys(s3_bucket) == []
+    assert _outbox_rows() == [] and os.listdir(outbox_dir) == []
+
+def test_upload_of_deleted_record_kept_for_a_new_record_of_the_same_pdf(db, s3_bucket, outbox_dir):
+    record_id = _queue('acme')
+    entry = _claim()
+    database.delete_record(record_id)
+    # The same PDF was uploaded again, so its content-addressed object is still needed
+    database.insert_record('acme again', 'Yes', 'No', 'acme.pdf', content_hash='acme')
+    asyncio.run(s3_outbox._run_upload(entry))
+
+    assert _bucket_keys(s3_bucket) == ['text-extraction-pdf/acme.pdf']
+    assert os.listdir(outbox_dir) == []
+
+def test_missing_spooled_file_gives_up(db, s3_bucket, outbox_dir):
+    _queue('acme')
+    entry = _claim()
+    os.unlink(entry['file_path'])
+    asyncio.run(s3_outbox._run_upload(entry))
+    [(status, _, error, _)] = _outbox_rows()
+    assert (status, error) == ('failed', 'Spooled file is no longer available')
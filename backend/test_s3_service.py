@@ -0,0 +1,83 @@
+"""
+Tests for the shared S3 client and the upload, download and delete helpers.
+"""
+
+import io
+import os
+import pytest
+from boto3.s3.transfer import TransferConfig
+import s3_service
+from s3_service import delete_from_s3, download_from_s3, get_s3_client, get_s3_stats, s3_key_from_url, upload_to_s3
+
+def _keys(bucket) -> list:
+    return [item['Key'] for item in get_s3_client().list_objects_v2(Bucket=bucket).get('Contents', [])]
+
+def test_upload_download_delete(s3_bucket, tmp_path):
+    path = tmp_path / 'plan.pdf'
+    path.write_bytes(b'%PDF from disk')
+    from_disk = upload_to_s3(str(path), 'plan.pdf', 'abc123')
+    from_memory = upload_to_s3(io.BytesIO(b'%PDF from memory'), 'other.pdf')
+
+    # Known hashes give content-addressed keys, others a unique one
+    assert s3_key_from_url(from_disk) == 'text-extraction-pdf/abc123.pdf'
+    assert sorted(_keys(s3_bucket)) == sorted([s3_key_from_url(from_disk), s3_key_from_url(from_memory)])
+    head = get_s3_client().head_object(Bucket=s3_bucket, Key=s3_key_from_url(from_disk))
+    assert head['ContentType'] == 'application/pdf'
+    assert download_from_s3(from_disk) == b'%PDF from disk'
+    assert download_from_s3(from_memory) == b'%PDF from memory'
+
+    assert delete_from_s3(from_disk)
+    assert _keys(s3_bucket) == [s3_key_from_url(from_memory)]
+    with pytest.raises(Exception):
+        download_from_s3(from_disk)
+
+    operations = get_s3_stats()['operations']
+    assert operations['upload']['calls'] >= 2 and operations['download']['errors'] >= 1
+
+def test_large_files_uploaded_in_parts(s3_bucket, monkeypatch):
+    megabyte = 1024 * 1024
+    monkeypatch.setattr(s3_service, 'TRANSFER_CONFIG', TransferConfig(
+        multipart_threshold=5 * megabyte, multipart_chunksize=5 * megabyte, max_concurrency=2
+    ))
+    data = os.urandom(11 * megabyte)
+    s3_url = upload_to_s3(io.BytesIO(data), 'large.pdf', 'large')
+    head = get_s3_client().head_object(Bucket=s3_bucket, Key=s3_key_from_url(s3_url))
+    # Multipart ETags end in the number of parts
+    assert head['ETag'].strip('"').endswith('-3')
+    assert download_from_s3(s3_url) == data
+
+def test_client_reused_within_a_process(s3_bucket):
+    client = get_s3_client()
+    assert get_s3_client() is client
+    upload_to_s3(io.BytesIO(b'%PDF'), 'plan.pdf', 'plan')
+    assert get_s3_client() is client
+    assert get_s3_stats()['client_ready']
+
+def test_client_rebuilt_after_fork(s3_bucket, monkeypatch):
+    client = get_s3_client()
+    # A client created by another process, as a forked worker inherits it
+    monkeypatch.setattr(s3_service, '_client_pid', os.getpid() + 1)
+    assert not get_s3_stats()['client_ready']
+    rebuilt = get_s3_client()
+    assert rebuilt is not client
+    assert get_s3_client() is rebuilt
+    assert upload_to_s3(io.BytesIO(b'%PDF'), 'plan.pdf', 'plan')
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_forked_child_gets_its_own_client(s3_bucket):
+    parent_client = get_s3_client()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            result = b'new' if get_s3_client() is not parent_client else b'inherited'
+        except BaseException:
+            result = b'error'
+        os.write(write_end, result)
+        os._exit(0)
+    os.close(write_end)
+    result = os.read(read_end, 16)
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    assert result == b'new'
+    assert get_s3_client() is parent_client
@@ -0,0 +1,55 @@
+"""
+Tests for full-text, prefix and fuzzy record search.
+"""
+
+import sqlite3
+import database
+import migrations
+from search import trigrams
+
+def _indexed_names(group_name: str) -> str:
+    """Text the SQLite trigram index holds for a record named group_name"""
+    conn = sqlite3.connect(':memory:')
+    try:
+        query = f"SELECT {migrations._word_padded_names_sql('r')} FROM (SELECT ? AS group_name, NULL AS filename) AS r"
+        return conn.execute(query, (group_name,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_names_indexed_by_the_words_of_queries():
+    for name in ("Smith & Co., Inc. (Ohio)_plan-2025", "O'Brien’s “Care” – 100%", 'A/B+C@D'):
+        text = _indexed_names(name).lower()
+        assert trigrams(name) <= {text[i:i + 3] for i in range(len(text) - 2)}
+
+def test_search_modes(db):
+    database.insert_record('Acme (Ohio) Health', 'Yes', 'No', 'acme_ohio.pdf', content_hash='a')
+    database.insert_record('Plan (XYZ) Trust', 'No', 'No', 'xyz.pdf', content_hash='b')
+    database.insert_record('Zeta/Omega Group', 'Yes', 'Yes', 'zeta.pdf', content_hash='c')
+
+    def names(query, mode):
+        return [record['group_name'] for record in database.search_records(query, mode=mode)]
+
+    assert names('ohio acme', 'fulltext') == ['Acme (Ohio) Health']
+    assert names('omeg', 'prefix') == ['Zeta/Omega Group']
+    assert names('omgea', 'fulltext') == []
+    assert names('omega', 'fuzzy') == ['Zeta/Omega Group']
+    assert names('xyz', 'fuzzy') == ['Plan (XYZ) Trust']
+
+def test_any_connection_can_write_records(db):
+    """The search triggers are plain SQL, so writes need no functions registered by database.py"""
+    conn = sqlite3.connect(db / 'sbc_records.db')
+    conn.execute("""
+        INSERT INTO sbc_records (group_name, upload_date, penalty_a, penalty_b, filename)
+        VALUES ('Plan (XYZ) Trust', '2025-01-15', 'Yes', 'No', 'plan.pdf')
+    """)
+    conn.execute("UPDATE sbc_records SET group_name = 'Plan (QRS) Trust'")
+    conn.commit()
+    conn.close()
+
+    assert database.search_records('xyz', mode='fuzzy') == []
+    assert [r['group_name'] for r in database.search_records('qrs', mode='fuzzy')] == ['Plan (QRS) Trust']
+    conn = sqlite3.connect(db / 'sbc_records.db')
+    conn.execute('DELETE FROM sbc_records')
+    conn.commit()
+    conn.close()
+    assert database.search_records('qrs', mode='fuzzy') == []
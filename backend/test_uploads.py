@@ -0,0 +1,55 @@
+"""
+Tests for deduplicating uploads by content hash.
+"""
+
+import asyncio
+import threading
+import database
+from upload_service import SpooledUpload, process_pdf_upload
+
+def _spool(data: bytes) -> SpooledUpload:
+    upload = SpooledUpload()
+    upload.write(data)
+    return upload.finish()
+
+def _record_count() -> int:
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM sbc_records')
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+def test_duplicate_upload_returns_stored_record(db, extraction_pool, make_sbc_pdf):
+    data = make_sbc_pdf()
+
+    async def upload_twice():
+        with _spool(data) as first, _spool(data) as second:
+            return await process_pdf_upload('plan.pdf', first), await process_pdf_upload('plan copy.pdf', second)
+
+    stored, duplicate = asyncio.run(upload_twice())
+    assert stored['success'] and 'duplicate' not in stored
+    assert duplicate['duplicate'] is True
+    assert duplicate['data']['id'] == stored['data']['id']
+    assert duplicate['data']['penalty_a'] == stored['data']['penalty_a'] == 'Yes'
+    assert duplicate['data']['filename'] == 'plan copy.pdf'
+    assert database.get_record_by_id(stored['data']['id'])['filename'] == 'plan.pdf'
+    assert _record_count() == 1
+
+def test_concurrent_inserts_of_one_hash_store_one_row(db):
+    barrier = threading.Barrier(4)
+    record_ids = []
+
+    def insert(index):
+        barrier.wait()
+        record_ids.append(database.insert_record('Acme', 'Yes', 'No', f'plan-{index}.pdf', content_hash='same'))
+
+    threads = [threading.Thread(target=insert, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(record_ids) == 4 and len(set(record_ids)) == 1 and record_ids[0] is not None
+    assert _record_count() == 1
@@ -0,0 +1,173 @@
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional
+import pdfplumber
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+# Which backend reads PDF text: 'pdfminer' (fast, no layout analysis),
+# 'pdfplumber' (full layout analysis) or 'auto' (pdfminer, falling back to
+# pdfplumber when it does not find the coverage answers)
+DEFAULT_TEXT_BACKEND = os.getenv('SBC_TEXT_BACKEND', 'auto')
+
+class TextDocument(ABC):
+    """An open PDF whose page text can be read one page at a time"""
+
+    page_count = 0
+
+    @abstractmethod
+    def page_text(self, index: int) -> str:
+        """Return the text of one page"""
+
+    @abstractmethod
+    def region_text(self, index: int, labels: List[str], padding: float) -> Optional[str]:
+        """Return the text around the given label patterns, or None if absent"""
+
+    def iter_page_texts(self) -> Iterator[str]:
+        """Lazily yield the text of each page in order"""
+        for index in range(self.page_count):
+            yield self.page_text(index)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _release_page(page):
+    """Drop the layout, character objects and text map pdfplumber cached on a page"""
+    page.close()
+    # Page.close() leaves the per-page text map cache in place
+    if hasattr(page.get_textmap, 'cache_clear'):
+        page.get_textmap.cache_clear()
+
+class PdfplumberDocument(TextDocument):
+    """Page text from pdfplumber's character-level layout analysis
+
+    Each page's caches are released as soon as its text is taken, so memory
+    does not grow with the number of pages read.
+    """
+
+    def __init__(self, source):
+        self.pdf = pdfplumber.open(source)
+        self.page_count = len(self.pdf.pages)
+
+    def page_text(self, index: int) -> str:
+        page = self.pdf.pages[index]
+        try:
+            return page.extract_text() or ""
+        finally:
+            _release_page(page)
+
+    def region_text(self, index: int, labels: List[str], padding: float) -> Optional[str]:
+        """Extract only the band of the page around the label matches"""
+        page = self.pdf.pages[index]
+        try:
+            hits = []
+            for label in labels:
+                hits.extend(page.search(label, regex=True, case=False))
+            if not hits:
+                return None
+
+            x0, page_top, x1, page_bottom = page.bbox
+            top = max(page_top, min(hit['top'] for hit in hits) - padding)
+            bottom = min(page_bottom, max(hit['bottom'] for hit in hits) + padding)
+            return page.crop((x0, top, x1, bottom)).extract_text() or ""
+        finally:
+            _release_page(page)
+
+    def close(self):
+        self.pdf.close()
+
+class _PlainTextDevice(PDFTextDevice):
+    """pdfminer device that writes characters in content-stream order
+
+    No layout objects are built. A newline is emitted when the baseline moves
+    and a space when there is a visible horizontal gap, which is enough for
+    simple, text-based SBCs.
+    """
+
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self.reset()
+
+    def reset(self):
+        self.chunks = []
+        self.last_x = None
+        self.last_y = None
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate):
+        try:
+            text = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            text = ""
+        advance = font.char_width(cid) * fontsize * scaling
+
+        a, b, c, d, x, y = matrix
+        size = fontsize * (abs(d) or 1)
+        if self.last_y is not None:
+            if abs(y - self.last_y) > size * 0.5:
+                self.chunks.append("\n")
+            elif x - self.last_x > size * 0.2 and self.chunks and not self.chunks[-1].isspace():
+                self.chunks.append(" ")
+        self.chunks.append(text)
+        self.last_x = x + advance * a
+        self.last_y = y
+        return advance
+
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+class PdfminerDocument(TextDocument):
+    """Page text straight from pdfminer's interpreter without layout analysis"""
+
+    def __init__(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            self.file = open(source, 'rb')
+            self.owns_file = True
+        else:
+            self.file = source
+            self.owns_file = False
+        self.pages = list(PDFPage.get_pages(self.file))
+        self.page_count = len(self.pages)
+        rsrcmgr = PDFResourceManager(caching=True)
+        self.device = _PlainTextDevice(rsrcmgr)
+        self.interpreter = PDFPageInterpreter(rsrcmgr, self.device)
+        self.texts = {}
+
+    def page_text(self, index: int) -> str:
+        if index not in self.texts:
+            self.device.reset()
+            self.interpreter.process_page(self.pages[index])
+            self.texts[index] = self.device.text()
+        return self.texts[index]
+
+    def region_text(self, index: int, labels: List[str], padding: float) -> Optional[str]:
+        """Without layout there are no coordinates, so the whole page is the region"""
+        text = self.page_text(index)
+        if any(re.search(label, text, re.IGNORECASE) for label in labels):
+            return text
+        return None
+
+    def close(self):
+        self.device.close()
+        if self.owns_file:
+            self.file.close()
+
+# Registered backends, fastest first
+TEXT_BACKENDS = {
+    'pdfminer': PdfminerDocument,
+    'pdfplumber': PdfplumberDocument,
+}
+
+def open_document(source, backend: str) -> TextDocument:
+    """Open a PDF path or binary file object with the named backend"""
+    if backend not in TEXT_BACKENDS:
+        raise ValueError(f"Unknown text backend '{backend}'")
+    return TEXT_BACKENDS[backend](source)
@@ -2,82 +2,55 @@
 """
 Script to update existing SBC records with smart explanations.
 This is needed because existing records were created before the explanation feature was added.
+
+Records that store plan facts are skipped: their explanations are rendered
+on request. Records are streamed and updated in batches; an interrupted run
+resumes from its checkpoint. Use --dry-run to count without writing.
 """
 
 import os
 import sys
-from datetime import datetime
 from dotenv import load_dotenv
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import get_all_records, get_db_connection
-from pdf_processor import generate_penalty_explanation
+from explanations import render_explanations
+from maintenance import batch_argument_parser, run_batched_update
 
 load_dotenv()
 
-def update_existing_records():
+def has_explanations(record):
+    return (record.get('penalty_a_explanation') and
+            record.get('penalty_b_explanation') and
+            len(record['penalty_a_explanation']) > 10 and
+            len(record['penalty_b_explanation']) > 10)
+
+def explain_record(record):
+    """Explanations for a record that has neither plan facts nor stored explanations"""
+    if record.get('plan_facts') or has_explanations(record):
+        return None
+    
+    # Since we don't have the original PDF text, we'll generate based on the known answers
+    return render_explanations(record['group_name'], record['penalty_a'], record['penalty_b'], None)
+
+def update_existing_records(args):
     """Update existing records with explanations"""
     try:
-        # Get all existing records
-        records = get_all_records()
-        print(f"Found {len(records)} existing records to update")
-        
-        if not records:
-            print("No records to update")
-            return
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        updated_count = 0
-        
-        for record in records:
-            # Skip records that already have explanations
-            if (record.get('penalty_a_explanation') and 
-                record.get('penalty_b_explanation') and 
-                len(record['penalty_a_explanation']) > 10 and 
-                len(record['penalty_b_explanation']) > 10):
-                print(f"Skipping record {record['id']} - already has explanations")
-                continue
-            
-            print(f"Updating record {record['id']}: {record['group_name']}")
-            
-            # Generate explanations based on the penalty values
-            # Since we don't have the original PDF text, we'll generate based on the known answers
-            explanations = generate_penalty_explanation(
-                record['group_name'],
-                record['penalty_a'],
-                record['penalty_b'],
-                f"Company: {record['group_name']}, Essential Coverage: {record['penalty_a']}, Value Standards: {record['penalty_b']}"
-            )
-            
-            # Update the record in the database
-            if hasattr(conn, 'execute'):  # SQLite
-                cursor.execute('''
-                    UPDATE sbc_records 
-                    SET penalty_a_explanation = ?, penalty_b_explanation = ?
-                    WHERE id = ?
-                ''', (explanations['penalty_a_explanation'], explanations['penalty_b_explanation'], record['id']))
-            else:  # PostgreSQL
-                cursor.execute('''
-                    UPDATE sbc_records 
-                    SET penalty_a_explanation = %s, penalty_b_explanation = %s
-                    WHERE id = %s
-                ''', (explanations['penalty_a_explanation'], explanations['penalty_b_explanation'], record['id']))
-            
-            updated_count += 1
-        
-        conn.commit()
-        conn.close()
-        
-        print(f"Successfully updated {updated_count} records with explanations")
+        processed, updated = run_batched_update(
+            'update_existing_records',
+            args,
+            read_columns=('group_name', 'penalty_a', 'penalty_b', 'penalty_a_explanation',
+                          'penalty_b_explanation', 'plan_facts'),
+            write_columns=('penalty_a_explanation', 'penalty_b_explanation'),
+            transform=explain_record
+        )
+        action = 'Would update' if args.dry_run else 'Successfully updated'
+        print(f"{action} {updated} of {processed} records with explanations")
         
     except Exception as e:
         print(f"Error updating records: {e}")
-        if 'conn' in locals():
-            conn.close()
+        sys.exit(1)
 
 if __name__ == "__main__":
-    update_existing_records()
+    update_existing_records(batch_argument_parser(__doc__.strip().splitlines()[0]).parse_args())
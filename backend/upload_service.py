@@ -0,0 +1,219 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+from async_db import insert_record, get_record_by_hash
+from explanations import record_explanations
+from extraction_service import extract_pdf, ExtractionQueueFull
+from s3_outbox import spool_for_s3
+from s3_service import s3_configured
+
+load_dotenv()
+
+# Size of the chunks read from uploads while spooling them
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Uploads up to this size stay in memory, larger ones spill to a temporary file
+UPLOAD_SPOOL_MEMORY_BYTES = int(float(os.getenv('UPLOAD_SPOOL_MEMORY_MB', '2')) * 1024 * 1024)
+# Largest PDF accepted, checked while the upload streams in
+MAX_UPLOAD_BYTES = int(float(os.getenv('MAX_UPLOAD_MB', '16')) * 1024 * 1024)
+
+class UploadTooLarge(Exception):
+    """Raised when more than the allowed number of bytes is written to a spool"""
+
+class SpooledUpload:
+    """One buffer holding an upload for hashing, extraction and S3
+
+    Data is kept in memory until it grows past ``max_memory`` bytes and then
+    moved to a named temporary file. The SHA-256 digest and the size limit are
+    applied as chunks are written, so the upload is read from the client once.
+    """
+
+    def __init__(self, max_memory: int = UPLOAD_SPOOL_MEMORY_BYTES, max_size: Optional[int] = MAX_UPLOAD_BYTES):
+        self.file = io.BytesIO()
+        self.path = None
+        self.size = 0
+        self.content_hash = None
+        self.max_memory = max_memory
+        self.max_size = max_size
+        self.owns_file = True
+        self._sha256 = hashlib.sha256()
+
+    @classmethod
+    def from_path(cls, path: str, content_hash: str) -> 'SpooledUpload':
+        """Wrap a file that is already on disk; closing it leaves the file in place"""
+        upload = cls()
+        upload.file = open(path, 'rb')
+        upload.path = path
+        upload.size = os.path.getsize(path)
+        upload.content_hash = content_hash
+        upload.owns_file = False
+        return upload
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise UploadTooLarge(f"File exceeds the {self.max_size / (1024 * 1024):g}MB upload limit")
+        self._sha256.update(chunk)
+        if self.path is None and self.size > self.max_memory:
+            self._rollover()
+        self.file.write(chunk)
+
+    def _rollover(self):
+        """Move the buffered bytes to a temporary file"""
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+        temp_file.write(self.file.getbuffer())
+        self.file.close()
+        self.file = temp_file
+        self.path = temp_file.name
+
+    def finish(self) -> 'SpooledUpload':
+        """Seal the buffer after the last chunk and rewind it for reading"""
+        self.content_hash = self._sha256.hexdigest()
+        self.file.flush()
+        self.file.seek(0)
+        return self
+
+    def extraction_source(self):
+        """What to hand the extraction pool: the file path, or the bytes while in memory"""
+        return self.path if self.path else self.file.getvalue()
+
+    def reader(self):
+        """The buffer rewound to its start"""
+        self.file.seek(0)
+        return self.file
+
+    def save_as(self, path: str):
+        """Store the upload at ``path``; the spool no longer owns a temporary file afterwards
+
+        Files wrapped with ``from_path`` are copied and stay in place.
+        """
+        if self.path and self.owns_file:
+            self.file.close()
+            shutil.move(self.path, path)
+            self.path = None
+        elif self.path:
+            shutil.copyfile(self.path, path)
+        else:
+            with open(path, 'wb') as target:
+                target.write(self.file.getbuffer())
+
+    def close(self):
+        self.file.close()
+        if self.owns_file and self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+async def spool_upload(file: UploadFile, max_memory: int = UPLOAD_SPOOL_MEMORY_BYTES,
+                       max_size: Optional[int] = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """Stream an upload into a SpooledUpload, rejecting it with 413 once it is too large"""
+    upload = SpooledUpload(max_memory, max_size)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            upload.write(chunk)
+    except UploadTooLarge as e:
+        upload.close()
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        upload.close()
+        raise
+    return upload.finish()
+
+async def process_pdf_upload(filename: str, upload: SpooledUpload,
+                             backend: Optional[str] = None, wait: bool = False) -> dict:
+    """Extract, store and describe one spooled PDF
+
+    Raises HTTPException when the file cannot be processed or, unless
+    ``wait`` is set, when the extraction queue is full.
+    """
+    content_hash = upload.content_hash
+    
+    # Reuse the stored result if this exact file was processed before
+    existing = await get_record_by_hash(content_hash)
+    if existing:
+        print(f"Duplicate upload of {filename}, reusing record {existing['id']}")
+        explanations = record_explanations(existing)
+        return {
+            'success': True,
+            'message': 'File was already processed, returning stored results.',
+            'duplicate': True,
+            'data': {
+                'id': existing['id'],
+                'company_name': existing['group_name'],
+                'penalty_a': existing['penalty_a'],
+                'penalty_b': existing['penalty_b'],
+                'penalty_a_explanation': explanations['penalty_a_explanation'],
+                'penalty_b_explanation': explanations['penalty_b_explanation'],
+                # The name of this upload; the record keeps the name it was first stored under
+                'filename': filename
+            }
+        }
+    
+    # Process the PDF with enhanced explanations in the extraction pool
+    try:
+        result = await extract_pdf(upload.extraction_source(), wait=wait, backend=backend)
+    except ExtractionQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy processing other files, please retry shortly. {e}",
+            headers={"Retry-After": "5"}
+        )
+    
+    if not result['success']:
+        if result.get('memory_exceeded'):
+            raise HTTPException(status_code=413, detail=f"File is too complex to process: {result['error']}")
+        raise HTTPException(status_code=400, detail=f"Error processing file: {result['error']}")
+    
+    # The PDF goes to S3 in the background; the record gets its s3_url then
+    s3_outbox_path = None
+    if s3_configured():
+        s3_outbox_path = spool_for_s3(upload)
+    else:
+        print("Warning: S3 is not configured, saving record without S3 URL")
+    
+    # Insert into database with the plan facts the explanations are rendered from
+    try:
+        record_id = await insert_record(
+            result['company_name'],
+            result['penalty_a'],
+            result['penalty_b'],
+            filename,
+            content_hash=content_hash,
+            plan_facts=result['plan_facts'],
+            extractor_version=result['extractor_version'],
+            s3_outbox_path=s3_outbox_path
+        )
+    except Exception:
+        if s3_outbox_path and os.path.exists(s3_outbox_path):
+            os.unlink(s3_outbox_path)
+        raise
+    
+    response_data = {
+        'success': True,
+        'message': 'File processed successfully!',
+        'data': {
+            'id': record_id,
+            'company_name': result['company_name'],
+            'penalty_a': result['penalty_a'],
+            'penalty_b': result['penalty_b'],
+            'penalty_a_explanation': result.get('penalty_a_explanation', ''),  # NEW
+            'penalty_b_explanation': result.get('penalty_b_explanation', ''), # NEW
+            'filename': filename
+        }
+    }
+    
+    if s3_outbox_path is None:
+        response_data['warning'] = 'File processed but S3 is not configured. Data saved locally.'
+    
+    return response_data
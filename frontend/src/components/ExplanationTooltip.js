@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useState } from 'react';
 import {
   Tooltip,
   Box,
@@ -6,29 +6,46 @@ import {
   Divider,
   Chip,
   Paper,
+  CircularProgress,
 } from '@mui/material';
 import {
   CheckCircle as CheckIcon,
   Cancel as CancelIcon,
   Info as InfoIcon,
 } from '@mui/icons-material';
+import { getRecordExplanation } from '../services/api';
 
 const ExplanationTooltip = ({ 
   children, 
-  penaltyAExplanation, 
-  penaltyBExplanation, 
+  recordId,
+  penaltyAExplanation: initialPenaltyAExplanation, 
+  penaltyBExplanation: initialPenaltyBExplanation, 
   penaltyA, 
   penaltyB,
   companyName 
 }) => {
-  // Debug logging
-  console.log('ExplanationTooltip props:', {
-    companyName,
-    penaltyA,
-    penaltyB,
-    penaltyAExplanation: penaltyAExplanation ? penaltyAExplanation.substring(0, 50) + '...' : 'null',
-    penaltyBExplanation: penaltyBExplanation ? penaltyBExplanation.substring(0, 50) + '...' : 'null'
-  });
+  // Explanations passed in are shown as-is; otherwise they are fetched for
+  // recordId the first time the tooltip opens
+  const [explanations, setExplanations] = useState(null);
+  const [loading, setLoading] = useState(false);
+
+  const penaltyAExplanation = initialPenaltyAExplanation || (explanations && explanations.penalty_a_explanation);
+  const penaltyBExplanation = initialPenaltyBExplanation || (explanations && explanations.penalty_b_explanation);
+
+  const handleOpen = async () => {
+    if (!recordId || explanations || loading || initialPenaltyAExplanation || initialPenaltyBExplanation) return;
+    try {
+      setLoading(true);
+      const response = await getRecordExplanation(recordId);
+      if (response.success) {
+        setExplanations(response.data);
+      }
+    } catch (err) {
+      console.error('Error fetching explanation:', err);
+    } finally {
+      setLoading(false);
+    }
+  };
 
   const formatExplanation = (explanation) => {
     if (!explanation) return '';
@@ -175,7 +192,13 @@ const ExplanationTooltip = ({
           </Box>
         )}
 
-        {!penaltyAExplanation && !penaltyBExplanation && (
+        {loading && (
+          <Box sx={{ textAlign: 'center', py: 2 }}>
+            <CircularProgress size={24} />
+          </Box>
+        )}
+
+        {!loading && !penaltyAExplanation && !penaltyBExplanation && (
           <Box sx={{ textAlign: 'center', py: 2 }}>
             <Typography variant="body2" color="text.secondary">
               No explanations available for this record.
@@ -189,6 +212,7 @@ const ExplanationTooltip = ({
   return (
     <Tooltip
       title={tooltipContent}
+      onOpen={handleOpen}
       placement="top-start"
       arrow
       PopperProps={{
@@ -17,24 +17,48 @@ import {
   Card,
   CardContent,
   Button,
+  TextField,
+  InputAdornment,
 } from '@mui/material';
 import {
   Delete as DeleteIcon,
   Refresh as RefreshIcon,
   Upload as UploadIcon,
   Info as InfoIcon,
+  Search as SearchIcon,
 } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
-import { getRecords, deleteRecord } from '../services/api';
+import { getRecords, getRecordStats, deleteRecord, searchRecords } from '../services/api';
 import ExplanationTooltip from '../components/ExplanationTooltip';
 
 const Dashboard = () => {
   const [records, setRecords] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [searchQuery, setSearchQuery] = useState('');
+  const [stats, setStats] = useState({ totalRecords: 0, penaltyARecords: 0, penaltyBRecords: 0 });
   const navigate = useNavigate();
 
+  // Totals over all records come from the server's summary table
+  const fetchStats = async () => {
+    try {
+      const response = await getRecordStats();
+      if (response.success) {
+        setStats({
+          totalRecords: response.total,
+          penaltyARecords: response.penalty_a.No || 0, // Count "No" answers as penalties
+          penaltyBRecords: response.penalty_b.No || 0, // Count "No" answers as penalties
+        });
+      }
+    } catch (err) {
+      console.error('Error fetching statistics:', err);
+    }
+  };
+
   const fetchRecords = async () => {
+    fetchStats();
     try {
       setLoading(true);
       const response = await getRecords();
@@ -42,6 +66,7 @@ const Dashboard = () => {
       if (response.success) {
         console.log('Records data:', response.records); // Debug log
         setRecords(response.records);
+        setNextCursor(response.next_cursor);
       } else {
         setError(response.error || 'Failed to fetch records');
       }
@@ -53,15 +78,71 @@ const Dashboard = () => {
     }
   };
 
+  const loadMoreRecords = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await getRecords({ cursor: nextCursor });
+      if (response.success) {
+        setRecords(current => [...current, ...response.records]);
+        setNextCursor(response.next_cursor);
+      } else {
+        setError(response.error || 'Failed to fetch records');
+      }
+    } catch (err) {
+      setError('Failed to load more records');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchRecords();
   }, []);
 
+  // Search as the user types; an empty query goes back to the full listing
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      return undefined;
+    }
+    // Ignore responses that arrive after the query changed again
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        let response = await searchRecords(query, 'prefix', { limit: 50 });
+        if (!cancelled && response.success && response.records.length === 0) {
+          // Nothing starts with the query; look for similar names instead
+          response = await searchRecords(query, 'fuzzy', { limit: 50 });
+        }
+        if (!cancelled && response.success) {
+          setRecords(response.records);
+          setNextCursor(null);
+        }
+      } catch (err) {
+        if (!cancelled) {
+          setError('Failed to search records');
+        }
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
+
+  const handleSearchChange = (event) => {
+    setSearchQuery(event.target.value);
+    if (!event.target.value.trim()) {
+      fetchRecords();
+    }
+  };
+
   const handleDelete = async (recordId) => {
     try {
       const response = await deleteRecord(recordId);
       if (response.success) {
         setRecords(records.filter(record => record.id !== recordId));
+        fetchStats();
       } else {
         setError(response.error || 'Failed to delete record');
       }
@@ -77,15 +158,6 @@ const Dashboard = () => {
     return 'warning';
   };
 
-  const getStatistics = () => {
-    const totalRecords = records.length;
-    const penaltyARecords = records.filter(r => r.penalty_a === 'No').length; // Count "No" answers as penalties
-    const penaltyBRecords = records.filter(r => r.penalty_b === 'No').length; // Count "No" answers as penalties
-    
-    return { totalRecords, penaltyARecords, penaltyBRecords };
-  };
-
-  const stats = getStatistics();
 
   if (loading) {
     return (
@@ -166,6 +238,22 @@ const Dashboard = () => {
         </Grid>
       </Grid>
 
+      <TextField
+        fullWidth
+        size="small"
+        placeholder="Search by group, filename or plan details"
+        value={searchQuery}
+        onChange={handleSearchChange}
+        sx={{ mb: 2 }}
+        InputProps={{
+          startAdornment: (
+            <InputAdornment position="start">
+              <SearchIcon />
+            </InputAdornment>
+          ),
+        }}
+      />
+
       {/* Records Table */}
       <Paper sx={{ width: '100%', overflow: 'hidden' }}>
         <TableContainer>
@@ -185,7 +273,7 @@ const Dashboard = () => {
                 <TableRow>
                   <TableCell colSpan={6} align="center">
                     <Typography variant="body1" color="textSecondary" sx={{ py: 4 }}>
-                      No SBC files have been processed yet.
+                      {searchQuery.trim() ? 'No records match your search.' : 'No SBC files have been processed yet.'}
                     </Typography>
                   </TableCell>
                 </TableRow>
@@ -194,8 +282,7 @@ const Dashboard = () => {
                   <TableRow key={record.id} hover>
                     <TableCell>
                       <ExplanationTooltip
-                        penaltyAExplanation={record.penalty_a_explanation}
-                        penaltyBExplanation={record.penalty_b_explanation}
+                        recordId={record.id}
                         penaltyA={record.penalty_a}
                         penaltyB={record.penalty_b}
                         companyName={record.group_name}
@@ -239,6 +326,18 @@ const Dashboard = () => {
             </TableBody>
           </Table>
         </TableContainer>
+        {nextCursor && (
+          <Box display="flex" justifyContent="center" py={2}>
+            <Button
+              variant="outlined"
+              onClick={loadMoreRecords}
+              disabled={loadingMore}
+              startIcon={loadingMore ? <CircularProgress size={16} /> : null}
+            >
+              Load More
+            </Button>
+          </Box>
+        )}
       </Paper>
     </Box>
   );
@@ -27,18 +27,42 @@ import {
 } from '@mui/icons-material';
 import { useDropzone } from 'react-dropzone';
 import { useNavigate } from 'react-router-dom';
-import { uploadFile } from '../services/api';
+import { uploadFile, uploadFiles } from '../services/api';
 import ExplanationTooltip from '../components/ExplanationTooltip';
 
 const Upload = () => {
   const [uploading, setUploading] = useState(false);
   const [uploadResult, setUploadResult] = useState(null);
+  const [batchResults, setBatchResults] = useState([]);
+  const [batchSummary, setBatchSummary] = useState(null);
   const [error, setError] = useState(null);
   const navigate = useNavigate();
 
   const onDrop = useCallback(async (acceptedFiles) => {
     if (acceptedFiles.length === 0) return;
 
+    // Several files or a ZIP archive go through the streaming batch endpoint
+    const isZip = acceptedFiles[0].name.toLowerCase().endsWith('.zip');
+    if (acceptedFiles.length > 1 || isZip) {
+      try {
+        setUploading(true);
+        setError(null);
+        setUploadResult(null);
+        setBatchResults([]);
+        setBatchSummary(null);
+
+        const summary = await uploadFiles(acceptedFiles, (result) => {
+          setBatchResults((previous) => [...previous, result]);
+        });
+        setBatchSummary(summary);
+      } catch (err) {
+        setError('Failed to upload files. Please try again.');
+      } finally {
+        setUploading(false);
+      }
+      return;
+    }
+
     const file = acceptedFiles[0];
     
     // Validate file type
@@ -79,9 +103,10 @@ const Upload = () => {
   const { getRootProps, getInputProps, isDragActive } = useDropzone({
     onDrop,
     accept: {
-      'application/pdf': ['.pdf']
+      'application/pdf': ['.pdf'],
+      'application/zip': ['.zip']
     },
-    multiple: false,
+    multiple: true,
     disabled: uploading
   });
 
@@ -156,10 +181,10 @@ const Upload = () => {
               <Box>
                 <CloudUploadIcon sx={{ fontSize: 60, color: 'primary.main', mb: 2 }} />
                 <Typography variant="h5" gutterBottom>
-                  {isDragActive ? 'Drop the PDF here' : 'Drag & drop a PDF file here'}
+                  {isDragActive ? 'Drop the PDFs here' : 'Drag & drop PDF files here'}
                 </Typography>
                 <Typography variant="body1" color="textSecondary" gutterBottom>
-                  or click to select a file
+                  or click to select files (several PDFs or a ZIP archive are processed as a batch)
                 </Typography>
                 <Typography variant="body2" color="textSecondary">
                   Maximum file size: 16MB
@@ -216,6 +241,51 @@ const Upload = () => {
             </CardContent>
           </Card>
 
+          {(batchResults.length > 0 || batchSummary) && (
+            <Card sx={{ mt: 2 }}>
+              <CardContent>
+                <Typography variant="h6" gutterBottom>
+                  Batch Results
+                  {batchSummary && ` (${batchSummary.succeeded} of ${batchSummary.total} processed)`}
+                </Typography>
+                <List dense>
+                  {batchResults.map((result, index) => (
+                    <ListItem key={index} disableGutters>
+                      <ListItemText
+                        primary={result.filename}
+                        secondary={result.success ? result.data.company_name : result.error}
+                      />
+                      {result.success && (
+                        <Box sx={{ display: 'flex', gap: 0.5 }}>
+                          <Chip
+                            label={result.data.penalty_a}
+                            color={getPenaltyColor(result.data.penalty_a)}
+                            size="small"
+                          />
+                          <Chip
+                            label={result.data.penalty_b}
+                            color={getPenaltyColor(result.data.penalty_b)}
+                            size="small"
+                          />
+                        </Box>
+                      )}
+                    </ListItem>
+                  ))}
+                </List>
+                {batchSummary && (
+                  <Button
+                    variant="contained"
+                    fullWidth
+                    onClick={handleViewResults}
+                    sx={{ mt: 1 }}
+                  >
+                    View All Results
+                  </Button>
+                )}
+              </CardContent>
+            </Card>
+          )}
+
           {uploadResult && (
             <Card sx={{ mt: 2 }}>
               <CardContent>
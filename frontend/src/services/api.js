@@ -21,8 +21,73 @@ export const uploadFile = async (file) => {
   return response.data;
 };
 
-export const getRecords = async () => {
-  const response = await api.get('/records');
+// Upload several PDFs (or ZIP archives) at once. The server streams one
+// NDJSON line per file; onResult is called for each file as it finishes and
+// the final summary line is returned.
+export const uploadFiles = async (files, onResult) => {
+  const formData = new FormData();
+  files.forEach((file) => formData.append('files', file));
+
+  // axios buffers the whole response in the browser, so read the stream with fetch
+  const response = await fetch(`${config.getApiUrl()}/upload/batch`, {
+    method: 'POST',
+    body: formData,
+  });
+  if (!response.ok) {
+    throw new Error(`Batch upload failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  let summary = null;
+
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    const result = JSON.parse(line);
+    if (result.done) {
+      summary = result;
+    } else {
+      onResult(result);
+    }
+  };
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffered);
+
+  return summary;
+};
+
+// One page of records; pass the previous page's next_cursor as params.cursor
+export const getRecords = async (params = {}) => {
+  const response = await api.get('/records', { params });
+  return response.data;
+};
+
+// Search records by group name, filename and plan facts; mode is
+// 'fulltext', 'prefix' or 'fuzzy'
+export const searchRecords = async (q, mode = 'prefix', params = {}) => {
+  const response = await api.get('/records/search', { params: { q, mode, ...params } });
+  return response.data;
+};
+
+// Record counts per penalty answer; params.group_by may be 'upload_date',
+// 'plan_type' or both, comma-separated
+export const getRecordStats = async (params = {}) => {
+  const response = await api.get('/records/stats', { params });
+  return response.data;
+};
+
+// Explanations are not part of the records listing; fetch them per record
+export const getRecordExplanation = async (recordId) => {
+  const response = await api.get(`/records/${recordId}/explanation`);
   return response.data;
 };
 